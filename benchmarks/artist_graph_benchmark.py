@@ -0,0 +1,49 @@
+"""
+Compares traemplist generation loading related artists from a stubbed Spotify client with a walk through
+a crawled local artist graph.
+
+Usage: python -m benchmarks.artist_graph_benchmark
+"""
+import shutil
+import time
+from tempfile import mkdtemp
+from traemplist.generator import TraemplistGenerator
+from traemplist.graph import SqLiteArtistGraph, ArtistGraphCrawler
+from traemplist.repository import InMemoryTracksRepository
+from benchmarks.stubs import LatencySpotifyClientStub, NullLogger, create_tracks_collection
+
+REQUEST_LATENCY = 0.01
+TRAEMPLIST_SIZE = 20
+INPUT_TRACKS_COUNT = 1000
+
+tmp_dir = mkdtemp()
+try:
+    artist_graph = SqLiteArtistGraph(f"{tmp_dir}/artist_graph.db")
+    started_at = time.perf_counter()
+    ArtistGraphCrawler(
+        client=LatencySpotifyClientStub(latency=0),
+        graph=artist_graph,
+        logger=NullLogger()
+    ).crawl(
+        list({track.artist for track in create_tracks_collection(INPUT_TRACKS_COUNT).get_tracks()}),
+        depth=1
+    )
+    print(f"crawl: {artist_graph.artists_count()} artists, time: {time.perf_counter() - started_at:.3f}s")
+    for name, client, workers_count in [
+        ("spotify client stub", LatencySpotifyClientStub(latency=REQUEST_LATENCY), 8),
+        ("artist graph", artist_graph, 1)
+    ]:
+        started_at = time.perf_counter()
+        traemplist = TraemplistGenerator(
+            client=client,
+            history=InMemoryTracksRepository(),
+            logger=NullLogger(),
+            workers_count=workers_count
+        ).generate(
+            input_tracks_collection=create_tracks_collection(INPUT_TRACKS_COUNT),
+            size=TRAEMPLIST_SIZE
+        )
+        print(f"{name}: tracks: {len(traemplist)}, time: {time.perf_counter() - started_at:.3f}s")
+    artist_graph.close()
+finally:
+    shutil.rmtree(tmp_dir)
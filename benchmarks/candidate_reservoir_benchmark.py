@@ -0,0 +1,34 @@
+"""
+Compares the related artists provider calls needed for a 200 tracks traemplist with and without
+the candidate reservoir.
+
+Usage: python -m benchmarks.candidate_reservoir_benchmark
+"""
+import time
+from traemplist.generator import TraemplistGenerator
+from traemplist.repository import InMemoryTracksRepository
+from benchmarks.stubs import LatencySpotifyClientStub, NullLogger, create_tracks_collection
+
+REQUEST_LATENCY = 0.002
+TRAEMPLIST_SIZE = 200
+
+for use_candidate_reservoir in [False, True]:
+    generator = TraemplistGenerator(
+        client=LatencySpotifyClientStub(latency=REQUEST_LATENCY),
+        history=InMemoryTracksRepository(),
+        logger=NullLogger(),
+        workers_count=8,
+        use_candidate_reservoir=use_candidate_reservoir
+    )
+    started_at = time.perf_counter()
+    traemplist = generator.generate(
+        input_tracks_collection=create_tracks_collection(5000),
+        size=TRAEMPLIST_SIZE
+    )
+    metrics = generator.get_metrics()
+    print(
+        f"candidate reservoir: {use_candidate_reservoir}, tracks: {len(traemplist)}, "
+        f"time: {time.perf_counter() - started_at:.3f}s, "
+        f"related artists calls: {metrics.related_artists_calls_count}, "
+        f"top tracks calls: {metrics.top_tracks_calls_count}"
+    )
@@ -0,0 +1,28 @@
+"""
+Compares the generation strategies by wall time and related artists provider calls per accepted track.
+
+Usage: python -m benchmarks.generation_strategy_benchmark
+"""
+import time
+from traemplist.generator import TraemplistGenerator, RandomWalkTraemplistGenerator
+from traemplist.repository import InMemoryTracksRepository
+from benchmarks.stubs import LatencySpotifyClientStub, NullLogger, create_tracks_collection
+
+REQUEST_LATENCY = 0.005
+TRAEMPLIST_SIZE = 50
+
+for name, create_generator in [
+    ("related artists", lambda client, history: TraemplistGenerator(client, history, NullLogger(), workers_count=8)),
+    ("random walk", lambda client, history: RandomWalkTraemplistGenerator(client, history, NullLogger()))
+]:
+    generator = create_generator(LatencySpotifyClientStub(latency=REQUEST_LATENCY), InMemoryTracksRepository())
+    started_at = time.perf_counter()
+    traemplist = generator.generate(
+        input_tracks_collection=create_tracks_collection(1000),
+        size=TRAEMPLIST_SIZE
+    )
+    metrics = generator.get_metrics()
+    print(
+        f"{name}: tracks: {len(traemplist)}, time: {time.perf_counter() - started_at:.3f}s, "
+        f"calls: {metrics.get_calls_count()}, calls per accepted track: {metrics.get_calls_per_accepted_track():.1f}"
+    )
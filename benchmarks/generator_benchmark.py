@@ -0,0 +1,31 @@
+"""
+Compares sequential and concurrent related artists' top tracks fetching of TraemplistGenerator, with and without
+prefetching the next start artists.
+
+Usage: python -m benchmarks.generator_benchmark
+"""
+import time
+from traemplist.generator import TraemplistGenerator
+from traemplist.repository import InMemoryTracksRepository
+from benchmarks.stubs import LatencySpotifyClientStub, NullLogger, create_tracks_collection
+
+REQUEST_LATENCY = 0.01
+TRAEMPLIST_SIZE = 20
+
+for workers_count, prefetch_count in [(1, 0), (4, 0), (8, 0), (20, 0), (8, 2), (8, 4)]:
+    generator = TraemplistGenerator(
+        client=LatencySpotifyClientStub(latency=REQUEST_LATENCY),
+        history=InMemoryTracksRepository(),
+        logger=NullLogger(),
+        workers_count=workers_count,
+        prefetch_count=prefetch_count
+    )
+    started_at = time.perf_counter()
+    traemplist = generator.generate(
+        input_tracks_collection=create_tracks_collection(1000),
+        size=TRAEMPLIST_SIZE
+    )
+    print(
+        f"workers: {workers_count:>2}, prefetch: {prefetch_count}, tracks: {len(traemplist)}, "
+        f"time: {time.perf_counter() - started_at:.3f}s, calls: {generator.get_metrics().get_calls_count()}"
+    )
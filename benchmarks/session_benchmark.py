@@ -0,0 +1,78 @@
+"""
+Measures per-request connection cost of a fresh Spotify session per request versus the pooled SpotifyClient session.
+
+A local HTTP server stands in for the Spotify API and counts the opened connections.
+
+Usage: python -m benchmarks.session_benchmark
+"""
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from spotipy.client import Spotify
+from traemplist.client import SpotifyClient
+from traemplist.scheduler import SpotifyRequestScheduler
+
+REQUESTS_COUNT = 500
+
+
+class SpotifyApiStubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    connections_count = 0
+
+    def setup(self):
+        super().setup()
+        SpotifyApiStubHandler.connections_count += 1
+
+    def do_GET(self):
+        body = json.dumps({"artists": []}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StaticAccessTokenProvider:
+
+    def get_access_token(self) -> str:
+        return "access_token"
+
+
+server = ThreadingHTTPServer(("127.0.0.1", 0), SpotifyApiStubHandler)
+Thread(target=server.serve_forever, daemon=True).start()
+api_prefix = f"http://127.0.0.1:{server.server_address[1]}/v1/"
+
+
+def fresh_session_request():
+    spotify = Spotify(auth="access_token")
+    spotify.prefix = api_prefix
+    spotify.artist_related_artists("artist")
+
+
+spotify_client = SpotifyClient(
+    access_token_provider=StaticAccessTokenProvider(),
+    request_scheduler=SpotifyRequestScheduler(rate=10 ** 6, burst=10 ** 6)
+)
+spotify_client._get_spotify_client().prefix = api_prefix
+
+for name, request in [
+    ("fresh session per request", fresh_session_request),
+    ("pooled SpotifyClient session", lambda: spotify_client.get_related_artists("artist"))
+]:
+    SpotifyApiStubHandler.connections_count = 0
+    started_at = time.perf_counter()
+    for _ in range(REQUESTS_COUNT):
+        request()
+    elapsed = time.perf_counter() - started_at
+    print(
+        f"{name}: {elapsed / REQUESTS_COUNT * 1000:.3f} ms/request, "
+        f"{SpotifyApiStubHandler.connections_count} connections for {REQUESTS_COUNT} requests"
+    )
+
+server.shutdown()
@@ -0,0 +1,62 @@
+import time
+from traemplist.client import Artist, Track, TracksCollection
+from traemplist.logger import Logger
+
+
+class LatencySpotifyClientStub:
+    """
+    Stands in for SpotifyClient, answering related artists and top tracks requests after a fixed delay.
+    """
+
+    def __init__(self, latency: float, related_artists_count: int = 20, top_tracks_count: int = 10):
+        self.latency = latency
+        self.related_artists_count = related_artists_count
+        self.top_tracks_count = top_tracks_count
+
+    def get_related_artists(self, artist_id: str) -> [Artist]:
+        time.sleep(self.latency)
+        return [
+            Artist(id=f"{artist_id}_{i}", name=f"{artist_id}_{i}")
+            for i in range(self.related_artists_count)
+        ]
+
+    def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
+        time.sleep(self.latency)
+        artist = Artist(id=artist_id, name=artist_id)
+        top_tracks = TracksCollection()
+        for i in range(self.top_tracks_count):
+            top_tracks.add_track(
+                Track(id=f"{artist_id}_track_{i}", name=f"{artist_id}_track_{i}", artist=artist)
+            )
+        return top_tracks
+
+
+class NullLogger(Logger):
+
+    def log_info(self, message: str):
+        pass
+
+    def log_error(self, message: str):
+        pass
+
+
+def create_tracks_collection(size: int, tracks_per_artist: int = 10) -> TracksCollection:
+    tracks = TracksCollection()
+    for i in range(size):
+        artist_id = f"artist_{i // tracks_per_artist}"
+        tracks.add_track(
+            Track(id=f"track_{i}", name=f"track_{i}", artist=Artist(id=artist_id, name=artist_id))
+        )
+    return tracks
+
+
+def create_track_responses(size: int, tracks_per_artist: int = 10) -> [dict]:
+    responses = []
+    for i in range(size):
+        artist_id = f"artist_{i // tracks_per_artist}"
+        responses.append({
+            "id": f"track_{i}",
+            "name": f"track_{i}",
+            "artists": [{"id": artist_id, "name": artist_id}]
+        })
+    return responses
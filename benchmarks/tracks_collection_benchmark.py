@@ -0,0 +1,28 @@
+"""
+Runs the generator's input collection workload (random pick, artist check and artist removal) against
+TracksCollection and IndexedTracksCollection, unseeded and seeded.
+
+Usage: python -m benchmarks.tracks_collection_benchmark
+"""
+import random
+import time
+from traemplist.client import TracksCollection, IndexedTracksCollection
+from benchmarks.stubs import create_tracks_collection
+
+ITERATIONS_COUNT = 200
+
+for size in [10000, 100000]:
+    source_tracks = create_tracks_collection(size)
+    for collection_class in [TracksCollection, IndexedTracksCollection]:
+        for rng in [None, random.Random(1)]:
+            collection = collection_class().add_tracks(source_tracks)
+            started_at = time.perf_counter()
+            for _ in range(ITERATIONS_COUNT):
+                track = collection.get_random_track(rng)
+                collection.contains_artist_track(track.artist)
+                collection.remove_artist_tracks(track.artist)
+            elapsed = time.perf_counter() - started_at
+            print(
+                f"{collection_class.__name__} ({size} tracks, {'seeded' if rng else 'unseeded'}): "
+                f"{elapsed / ITERATIONS_COUNT * 1000:.3f} ms/iteration"
+            )
@@ -0,0 +1,54 @@
+"""
+Measures the memory taken by a 100k tracks library loaded into TracksCollection from liked songs responses:
+plain dataclasses with an Artist per track (the previous representation) against slotted tracks with interned artists.
+
+Usage: python -m benchmarks.tracks_memory_benchmark
+"""
+import gc
+import tracemalloc
+from dataclasses import dataclass
+from traemplist.client import SpotifyClient, TracksCollection
+from benchmarks.stubs import create_track_responses
+
+TRACKS_COUNT = 100000
+
+
+@dataclass(frozen=True)
+class PlainArtist:
+    id: str
+    name: str
+
+
+@dataclass(frozen=True)
+class PlainTrack:
+    id: str
+    name: str
+    artist: PlainArtist
+
+
+def create_plain_track(response: dict) -> PlainTrack:
+    return PlainTrack(
+        id=response["id"],
+        name=response["name"],
+        artist=PlainArtist(id=response["artists"][0]["id"], name=response["artists"][0]["name"])
+    )
+
+
+def measure(create_track) -> int:
+    gc.collect()
+    tracemalloc.start()
+    tracks = TracksCollection()
+    for response in track_responses:
+        tracks.add_track(create_track(response))
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+track_responses = create_track_responses(TRACKS_COUNT)
+spotify_client = SpotifyClient(access_token_provider=None)
+for name, create_track in [
+    ("plain dataclasses", create_plain_track),
+    ("slotted, interned artists", spotify_client._create_track_from_response)
+]:
+    print(f"{name}: {measure(create_track) / 1024 / 1024:.1f} MiB for {TRACKS_COUNT} tracks")
@@ -0,0 +1,69 @@
+"""
+Runs the same workloads against SqLiteTracksRepository and InMemoryTracksRepository: importing 1M track records
+from a generator, importing them again (all of them already present), screening generator candidates
+with filter_unheard and single contains_track lookups. Reports time and peak traced memory.
+
+Usage: python -m benchmarks.tracks_repository_benchmark
+"""
+import shutil
+import time
+import tracemalloc
+from tempfile import mkdtemp
+from traemplist.repository import TrackRecord, TracksRepository, SqLiteTracksRepository, InMemoryTracksRepository
+
+TRACKS_COUNT = 1000000
+LOOKUPS_COUNT = 100000
+CANDIDATES_BATCH_SIZE = 200
+
+
+def track_id(i: int) -> str:
+    return f"track_{i:022d}"
+
+
+def track_records():
+    for i in range(TRACKS_COUNT):
+        yield TrackRecord(id=track_id(i))
+
+
+def import_tracks(repository: TracksRepository) -> str:
+    result = repository.save_tracks(track_records())
+    return f"inserted: {result.inserted_count}, existing: {result.existing_count}"
+
+
+def filter_unheard(repository: TracksRepository) -> str:
+    unheard_count = 0
+    for offset in range(0, LOOKUPS_COUNT, CANDIDATES_BATCH_SIZE):
+        unheard_count += len(repository.filter_unheard(
+            [track_id(2 * i) for i in range(offset, offset + CANDIDATES_BATCH_SIZE)]
+        ))
+    return f"unheard: {unheard_count} of {LOOKUPS_COUNT}"
+
+
+def contains_track(repository: TracksRepository) -> str:
+    heard_count = sum(repository.contains_track(track_id(2 * i)) for i in range(LOOKUPS_COUNT))
+    return f"heard: {heard_count} of {LOOKUPS_COUNT}"
+
+
+tmp_dir = mkdtemp()
+try:
+    for repository in [SqLiteTracksRepository(f"{tmp_dir}/benchmark.db"), InMemoryTracksRepository()]:
+        for name, workload in [
+            ("new tracks import", import_tracks),
+            ("existing tracks import", import_tracks),
+            ("filter_unheard", filter_unheard),
+            ("contains_track", contains_track)
+        ]:
+            tracemalloc.start()
+            started_at = time.perf_counter()
+            summary = workload(repository)
+            elapsed = time.perf_counter() - started_at
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(
+                f"{repository.__class__.__name__} {name}: {elapsed:.2f}s, {summary}, "
+                f"peak memory: {peak_memory / 1024 / 1024:.1f} MiB"
+            )
+        if isinstance(repository, SqLiteTracksRepository):
+            repository.close()
+finally:
+    shutil.rmtree(tmp_dir)
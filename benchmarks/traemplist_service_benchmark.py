@@ -0,0 +1,146 @@
+"""
+Measures TraemplistGeneratorService.generate_and_save_traemplist against recorded Spotify responses: wall time,
+Spotify API calls and allocated memory of a seeded generation, so the results of different commits are comparable.
+
+Record the responses once (generates the first configured traemplist as run_traemplist_generator.py does, without
+writing the playlist, and stores the responses and the traemplist settings without credentials into
+benchmarks/fixtures):
+
+    python -m benchmarks.traemplist_service_benchmark record
+
+Replay them offline, print the measurements and append them, along with the current commit, to
+benchmarks/results/traemplist_service_benchmark.jsonl:
+
+    python -m benchmarks.traemplist_service_benchmark
+
+The generation is seeded with BENCHMARK_SEED (default 1) and screens the tracks against an empty history both when
+recording and when replaying, so the replay makes the recorded requests. The playlist write requests are recorded
+with placeholder responses and never sent. A commit which changes the requests made for the same seed fails with
+FixtureNotFoundError until the responses are recorded again.
+"""
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider
+from traemplist.config import JsonConfig, TraemplistConfig, AccountConfig, PlaylistConfig, AccountCredentialsConfig
+from traemplist.fixtures import SpotifyResponseFixtures, RecordingSpotifyClient, ReplayingSpotifyClient
+from traemplist.generator import TraemplistGenerator
+from traemplist.repository import InMemoryTracksRepository
+from traemplist.service import TraemplistGeneratorService
+from benchmarks.stubs import NullLogger
+
+RUNS_COUNT = 5
+root_dir_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+fixtures_dir_path = f"{root_dir_path}/benchmarks/fixtures"
+results_file_path = f"{root_dir_path}/benchmarks/results/traemplist_service_benchmark.jsonl"
+responses_file_path = f"{fixtures_dir_path}/spotify_responses.json"
+traemplist_config_file_path = f"{fixtures_dir_path}/traemplist_config.json"
+seed = int(os.environ.get("BENCHMARK_SEED", 1))
+
+
+def run(client: SpotifyClient, traemplist_config: TraemplistConfig) -> None:
+    TraemplistGeneratorService(
+        config=traemplist_config,
+        client=client,
+        generator=TraemplistGenerator(
+            client=client,
+            history=InMemoryTracksRepository(),
+            logger=NullLogger(),
+            workers_count=8,
+            # Start artists prefetched when the generation ends may or may not be loaded, which would make the API
+            # calls count vary between runs, and replayed responses have no latency for prefetching to hide
+            prefetch_count=0,
+            use_candidate_reservoir=True,
+            rng=random.Random(seed)
+        ),
+        logger=NullLogger()
+    ).generate_and_save_traemplist()
+
+
+def record() -> None:
+    traemplist_config = JsonConfig(f"{root_dir_path}/config.json").get_traemplist_configs()[0]
+    fixtures = SpotifyResponseFixtures(responses_file_path)
+    run(
+        RecordingSpotifyClient(
+            access_token_provider=SpotifyAccessTokenProvider(traemplist_config.account.credentials),
+            fixtures=fixtures,
+            send_write_requests=False
+        ),
+        traemplist_config
+    )
+    os.makedirs(fixtures_dir_path, exist_ok=True)
+    fixtures.save()
+    with open(traemplist_config_file_path, "w") as traemplist_config_file:
+        json.dump(
+            {
+                "playlist_ids": [playlist.id for playlist in traemplist_config.account.playlists],
+                "traemplist_songs_count": traemplist_config.traemplist_songs_count,
+                "traemplist_id": traemplist_config.traemplist_id
+            },
+            traemplist_config_file
+        )
+    print(f"Recorded {fixtures.get_requests_count()} responses to {responses_file_path}")
+
+
+def replay() -> None:
+    with open(traemplist_config_file_path) as traemplist_config_file:
+        traemplist_config_data = json.load(traemplist_config_file)
+    traemplist_config = TraemplistConfig(
+        account=AccountConfig(
+            credentials=AccountCredentialsConfig(client_id="replay", client_secret="", refresh_token=""),
+            playlists=[PlaylistConfig(id=playlist_id) for playlist_id in traemplist_config_data["playlist_ids"]]
+        ),
+        traemplist_songs_count=traemplist_config_data["traemplist_songs_count"],
+        traemplist_id=traemplist_config_data["traemplist_id"]
+    )
+    fixtures = SpotifyResponseFixtures(responses_file_path).load()
+    times = []
+    for _ in range(RUNS_COUNT):
+        fixtures.reset_requests_counts()
+        started_at = time.perf_counter()
+        run(ReplayingSpotifyClient(fixtures), traemplist_config)
+        times.append(time.perf_counter() - started_at)
+    requests_counts = fixtures.get_requests_counts()
+    tracemalloc.start()
+    run(ReplayingSpotifyClient(fixtures), traemplist_config)
+    _, peak_allocated_size = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "commit": get_commit(),
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "seed": seed,
+        "min_time": round(min(times), 4),
+        "median_time": round(statistics.median(times), 4),
+        "api_calls": sum(requests_counts.values()),
+        "api_calls_by_endpoint": requests_counts,
+        "peak_allocated_mib": round(peak_allocated_size / 1024 / 1024, 2)
+    }
+    print(
+        f"commit: {result['commit']}, time: {result['min_time']:.3f}s (median {result['median_time']:.3f}s), "
+        f"API calls: {result['api_calls']}, peak allocated: {result['peak_allocated_mib']:.2f} MiB"
+    )
+    for endpoint, requests_count in sorted(requests_counts.items()):
+        print(f"  {endpoint}: {requests_count}")
+    os.makedirs(os.path.dirname(results_file_path), exist_ok=True)
+    with open(results_file_path, "a") as results_file:
+        results_file.write(json.dumps(result, sort_keys=True) + "\n")
+
+
+def get_commit() -> str:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=root_dir_path).decode().strip()
+        is_dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"], cwd=root_dir_path) != 0
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if is_dirty else commit
+
+
+if sys.argv[1:] == ["record"]:
+    record()
+else:
+    replay()
@@ -0,0 +1,37 @@
+"""
+Compares per-response validation of a liked songs page: jsonschema.validate, precompiled validators
+and trusted responses validators.
+
+Usage: python -m benchmarks.validation_benchmark
+"""
+import timeit
+import jsonschema
+from traemplist.client import SpotifyClient
+
+REPEATS = 200
+
+liked_songs_page = {
+    "items": [
+        {
+            "added_at": "2021-01-01T00:00:00Z",
+            "track": {
+                "id": f"track_{i}",
+                "name": f"track_{i}",
+                "popularity": 50,
+                "artists": [
+                    {"id": f"artist_{i}_{j}", "name": f"artist_{i}_{j}"} for j in range(3)
+                ]
+            }
+        }
+        for i in range(SpotifyClient.GET_USER_LIKED_SONGS_LIMIT)
+    ]
+}
+request_name = "current_user_saved_tracks"
+
+for name, validate in [
+    ("jsonschema.validate", lambda: jsonschema.validate(liked_songs_page, SpotifyClient.USER_LIKED_TRACKS_SCHEMA)),
+    ("precompiled", lambda: SpotifyClient.RESPONSE_VALIDATORS[request_name].is_valid(liked_songs_page)),
+    ("trusted", lambda: SpotifyClient.TRUSTED_RESPONSE_VALIDATORS[request_name].is_valid(liked_songs_page))
+]:
+    elapsed = timeit.timeit(validate, number=REPEATS)
+    print(f"{name}: {elapsed / REPEATS * 1000:.3f} ms/page")
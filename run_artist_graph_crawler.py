@@ -0,0 +1,58 @@
+import os
+import sys
+from traemplist.logger import StandardOutputLogger, Logger
+from traemplist.config import JsonConfig, TraemplistConfig
+from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider, AccountCredentialsConfig
+from traemplist.repository import SqLiteTracksRepository
+from traemplist.service import ArtistGraphService, LikedTracksService
+from traemplist.cache import EncryptedFileAccessTokenCache
+from traemplist.graph import SqLiteArtistGraph, ArtistGraphCrawler
+from traemplist.runner import AccountsRunner
+
+this_dir_path = os.path.dirname(os.path.abspath(__file__))
+logger = StandardOutputLogger()
+config = JsonConfig(f"{this_dir_path}/config.json")
+access_token_cache = EncryptedFileAccessTokenCache.create_if_supported(f"{this_dir_path}/storage", logger)
+artist_graph = SqLiteArtistGraph(f"{this_dir_path}/storage/artist_graph.db")
+crawl_depth = int(os.environ.get("ARTIST_GRAPH_DEPTH", 2))
+
+
+def crawl_artist_graph(traemplist_config: TraemplistConfig, account_logger: Logger):
+    account_credentials = traemplist_config.account.credentials
+    spotify_client = SpotifyClient(
+        access_token_provider=SpotifyAccessTokenProvider(
+            AccountCredentialsConfig(
+                client_id=account_credentials.client_id,
+                client_secret=account_credentials.client_secret,
+                refresh_token=account_credentials.refresh_token
+            ),
+            access_token_cache=access_token_cache
+        )
+    )
+    ArtistGraphService(
+        config=traemplist_config,
+        client=spotify_client,
+        crawler=ArtistGraphCrawler(
+            client=spotify_client,
+            graph=artist_graph,
+            logger=account_logger,
+            workers_count=8
+        ),
+        logger=account_logger,
+        liked_tracks_service=LikedTracksService(
+            client=spotify_client,
+            repository=SqLiteTracksRepository(
+                f"{this_dir_path}/storage/{account_credentials.client_id}_tracks.db"
+            ),
+            logger=account_logger
+        )
+    ).crawl_input_artists(depth=crawl_depth)
+
+
+results = AccountsRunner(
+    config=config,
+    logger=logger,
+    concurrency=int(os.environ.get("ACCOUNTS_CONCURRENCY", 4))
+).run(crawl_artist_graph)
+if any(result.is_failed() for result in results):
+    sys.exit(1)
@@ -1,16 +1,21 @@
 import os
-from traemplist.logger import StandardOutputLogger
-from traemplist.config import JsonConfig, AccountCredentialsConfig
+import sys
+from traemplist.logger import StandardOutputLogger, Logger
+from traemplist.config import JsonConfig, AccountCredentialsConfig, TraemplistConfig
 from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider
 from traemplist.repository import SqLiteTracksRepository
+from traemplist.cache import EncryptedFileAccessTokenCache
 from traemplist.service import TracksHistoryService
+from traemplist.runner import AccountsRunner
 
 
 this_dir_path = os.path.dirname(os.path.abspath(__file__))
 logger = StandardOutputLogger()
 config = JsonConfig(f"{this_dir_path}/config.json")
+access_token_cache = EncryptedFileAccessTokenCache.create_if_supported(f"{this_dir_path}/storage", logger)
 
-for traemplist_config in config.get_traemplist_configs():
+
+def save_recently_played_tracks(traemplist_config: TraemplistConfig, account_logger: Logger):
     account_credentials = traemplist_config.account.credentials
     spotify_client = SpotifyClient(
         access_token_provider=SpotifyAccessTokenProvider(
@@ -18,7 +23,8 @@ for traemplist_config in config.get_traemplist_configs():
                 client_id=account_credentials.client_id,
                 client_secret=account_credentials.client_secret,
                 refresh_token=account_credentials.refresh_token
-            )
+            ),
+            access_token_cache=access_token_cache
         )
     )
     TracksHistoryService(
@@ -26,5 +32,14 @@ for traemplist_config in config.get_traemplist_configs():
         repository=SqLiteTracksRepository(
             f"{this_dir_path}/storage/{account_credentials.client_id}_tracks.db"
         ),
-        logger=logger
+        logger=account_logger
     ).save_recently_played_tracks()
+
+
+results = AccountsRunner(
+    config=config,
+    logger=logger,
+    concurrency=int(os.environ.get("ACCOUNTS_CONCURRENCY", 4))
+).run(save_recently_played_tracks)
+if any(result.is_failed() for result in results):
+    sys.exit(1)
@@ -1,16 +1,48 @@
 import os
-from traemplist.logger import StandardOutputLogger
-from traemplist.config import JsonConfig
-from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider, AccountCredentialsConfig
-from traemplist.generator import TraemplistGenerator
-from traemplist.repository import SqLiteTracksRepository
-from traemplist.service import TraemplistGeneratorService
+import random
+import sys
+from traemplist.logger import StandardOutputLogger, Logger
+from traemplist.config import JsonConfig, TraemplistConfig
+from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider, AccountCredentialsConfig, \
+    RelatedArtistsProvider
+from traemplist.generator import GenerationStrategy, TraemplistGenerator, RandomWalkTraemplistGenerator
+from traemplist.repository import SqLiteTracksRepository, TracksRepository
+from traemplist.service import TraemplistGeneratorService, LikedTracksService
+from traemplist.cache import SqLiteResponseCache, EncryptedFileAccessTokenCache
+from traemplist.graph import SqLiteArtistGraph, ArtistGraphFallbackProvider
+from traemplist.runner import AccountsRunner
 
 this_dir_path = os.path.dirname(os.path.abspath(__file__))
 logger = StandardOutputLogger()
 config = JsonConfig(f"{this_dir_path}/config.json")
+access_token_cache = EncryptedFileAccessTokenCache.create_if_supported(f"{this_dir_path}/storage", logger)
+response_cache = SqLiteResponseCache(
+    db_file_path=f"{this_dir_path}/storage/responses_cache.db",
+    max_entries_count=100000
+)
+artist_graph = SqLiteArtistGraph(f"{this_dir_path}/storage/artist_graph.db")
+generation_strategy = os.environ.get("GENERATION_STRATEGY", "related_artists")
+generation_seed = os.environ.get("GENERATION_SEED")
+use_candidate_reservoir = os.environ.get("USE_CANDIDATE_RESERVOIR") == "1"
 
-for traemplist_config in config.get_traemplist_configs():
+
+def create_generator(client: RelatedArtistsProvider, history: TracksRepository, account_logger: Logger,
+                     workers_count: int, prefetch_count: int) -> GenerationStrategy:
+    rng = random.Random(int(generation_seed)) if generation_seed else None
+    if generation_strategy == "random_walk":
+        return RandomWalkTraemplistGenerator(client=client, history=history, logger=account_logger, rng=rng)
+    return TraemplistGenerator(
+        client=client,
+        history=history,
+        logger=account_logger,
+        workers_count=workers_count,
+        prefetch_count=prefetch_count,
+        use_candidate_reservoir=use_candidate_reservoir,
+        rng=rng
+    )
+
+
+def generate_traemplist(traemplist_config: TraemplistConfig, account_logger: Logger):
     account_credentials = traemplist_config.account.credentials
     spotify_client = SpotifyClient(
         access_token_provider=SpotifyAccessTokenProvider(
@@ -18,18 +50,55 @@ for traemplist_config in config.get_traemplist_configs():
                 client_id=account_credentials.client_id,
                 client_secret=account_credentials.client_secret,
                 refresh_token=account_credentials.refresh_token
-            )
-        )
+            ),
+            access_token_cache=access_token_cache
+        ),
+        response_cache=response_cache
+    )
+    if artist_graph.artists_count():
+        account_logger.log_info("Walking the local artist graph, loading the missing artists from Spotify")
+        related_artists_provider = ArtistGraphFallbackProvider(graph=artist_graph, client=spotify_client)
+        generator_workers_count = 8
+        generator_prefetch_count = 0
+    else:
+        account_logger.log_info("Artist graph is empty, loading related artists from Spotify")
+        related_artists_provider = spotify_client
+        generator_workers_count = 8
+        generator_prefetch_count = 2
+    tracks_repository = SqLiteTracksRepository(
+        f"{this_dir_path}/storage/{account_credentials.client_id}_tracks.db"
     )
     TraemplistGeneratorService(
         config=traemplist_config,
         client=spotify_client,
-        generator=TraemplistGenerator(
-            client=spotify_client,
-            history=SqLiteTracksRepository(
-                f"{this_dir_path}/storage/{account_credentials.client_id}_tracks.db"
-            ),
-            logger=logger
+        generator=create_generator(
+            client=related_artists_provider,
+            history=tracks_repository,
+            account_logger=account_logger,
+            workers_count=generator_workers_count,
+            prefetch_count=generator_prefetch_count
         ),
-        logger=logger
+        logger=account_logger,
+        liked_tracks_service=LikedTracksService(
+            client=spotify_client,
+            repository=tracks_repository,
+            logger=account_logger
+        )
     ).generate_and_save_traemplist()
+    account_logger.log_info(
+        f"Requests throttled: {spotify_client.request_scheduler.get_throttled_count()}, "
+        f"retried: {spotify_client.request_scheduler.get_retries_count()}"
+    )
+
+
+results = AccountsRunner(
+    config=config,
+    logger=logger,
+    concurrency=int(os.environ.get("ACCOUNTS_CONCURRENCY", 4))
+).run(generate_traemplist)
+response_cache.close()
+logger.log_info(
+    f"Responses cache hits: {response_cache.get_hits_count()}, misses: {response_cache.get_misses_count()}"
+)
+if any(result.is_failed() for result in results):
+    sys.exit(1)
@@ -0,0 +1,228 @@
+import shutil
+import os
+import sqlite3
+from unittest import TestCase, SkipTest, mock, skipUnless
+from tempfile import mkdtemp
+from typing import List
+from traemplist.config import AccountCredentialsConfig
+from traemplist.cache import ResponseCache, SqLiteResponseCache, InMemoryResponseCache, InvalidMaxEntriesCountError, \
+    AccessToken, EncryptedFileAccessTokenCache
+
+
+class ResponseCacheAbstractTest(TestCase):
+
+    MAX_ENTRIES_COUNT = 3
+
+    def setUp(self) -> None:
+        if type(self) is ResponseCacheAbstractTest:
+            raise SkipTest
+        self.cache = self._get_cache(self.MAX_ENTRIES_COUNT)
+
+    def _get_cache(self, max_entries_count: int) -> ResponseCache:
+        raise NotImplementedError
+
+    def test_set_and_get(self):
+        self.cache.set("a", {"artists": [{"id": "1", "name": "one"}]}, ttl=60)
+        self.assertEqual(self.cache.get("a"), {"artists": [{"id": "1", "name": "one"}]})
+        self.assertIsNone(self.cache.get("b"))
+        self.assertEqual(self.cache.get_hits_count(), 1)
+        self.assertEqual(self.cache.get_misses_count(), 1)
+
+    def test_overwrite(self):
+        self.cache.set("a", {"value": 1}, ttl=60)
+        self.cache.set("a", {"value": 2}, ttl=60)
+        self.assertEqual(self.cache.get("a"), {"value": 2})
+        self.assertEqual(self.cache.entries_count(), 1)
+
+    def test_ttl_expiration(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock:
+            time_mock.return_value = 1000
+            self.cache.set("a", {"value": 1}, ttl=60)
+            time_mock.return_value = 1059
+            self.assertEqual(self.cache.get("a"), {"value": 1})
+            time_mock.return_value = 1060
+            self.assertIsNone(self.cache.get("a"))
+            self.assertEqual(self.cache.entries_count(), 0)
+
+    def test_least_recently_used_eviction(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock:
+            for i, key in enumerate(["a", "b", "c"]):
+                time_mock.return_value = 1000 + i
+                self.cache.set(key, {"value": key}, ttl=60)
+            time_mock.return_value = 1003
+            self.cache.get("a")
+            time_mock.return_value = 1004
+            self.cache.set("d", {"value": "d"}, ttl=60)
+            self.assertEqual(self.cache.entries_count(), self.MAX_ENTRIES_COUNT)
+            self.assertIsNone(self.cache.get("b"))
+            self.assertEqual(self.cache.get("a"), {"value": "a"})
+            self.assertEqual(self.cache.get("d"), {"value": "d"})
+
+    def test_invalid_max_entries_count_error(self):
+        with self.assertRaises(InvalidMaxEntriesCountError):
+            self._get_cache(0)
+
+
+class SqLiteResponseCacheTest(ResponseCacheAbstractTest):
+
+    def setUp(self) -> None:
+        self.tmp_dir = mkdtemp()
+        super().setUp()
+
+    def tearDown(self) -> None:
+        self.cache.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _get_cache(self, max_entries_count: int) -> SqLiteResponseCache:
+        return SqLiteResponseCache(self.tmp_dir + "/cache.db", max_entries_count=max_entries_count)
+
+    def _get_accessed_at(self, key: str) -> float:
+        connection = sqlite3.connect(self.tmp_dir + "/cache.db")
+        try:
+            return connection.execute("SELECT accessed_at FROM responses WHERE key = ?", (key,)).fetchone()[0]
+        finally:
+            connection.close()
+
+    def _get_stored_keys(self) -> List[str]:
+        connection = sqlite3.connect(self.tmp_dir + "/cache.db")
+        try:
+            return [row[0] for row in connection.execute("SELECT key FROM responses ORDER BY key")]
+        finally:
+            connection.close()
+
+    def test_least_recently_used_eviction_after_reopening(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock:
+            for i, key in enumerate(["a", "b", "c"]):
+                time_mock.return_value = 1000 + i
+                self.cache.set(key, {"value": key}, ttl=60)
+            self.cache.close()
+            self.cache = self._get_cache(self.MAX_ENTRIES_COUNT)
+            time_mock.return_value = 1003
+            self.cache.set("d", {"value": "d"}, ttl=60)
+            self.assertEqual(self._get_stored_keys(), ["b", "c", "d"])
+
+    def test_expired_entries_sweep(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock, \
+                mock.patch.object(SqLiteResponseCache, "EXPIRED_ENTRIES_SWEEP_INTERVAL", 3):
+            time_mock.return_value = 1000
+            self.cache.set("a", {"value": "a"}, ttl=10)
+            self.cache.set("b", {"value": "b"}, ttl=60)
+            time_mock.return_value = 1010
+            self.cache.set("c", {"value": "c"}, ttl=60)
+            self.assertEqual(self._get_stored_keys(), ["b", "c"])
+            self.cache.set("d", {"value": "d"}, ttl=60)
+            self.assertEqual(self._get_stored_keys(), ["b", "c", "d"])
+
+    def test_accessed_at_batched_updates(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock:
+            time_mock.return_value = 1000
+            self.cache.set("a", {"value": "a"}, ttl=60)
+            time_mock.return_value = 1001
+            for _ in range(SqLiteResponseCache.ACCESSES_BATCH_SIZE - 1):
+                self.cache.get("a")
+            self.assertEqual(self._get_accessed_at("a"), 1000)
+            self.cache.set("b", {"value": "b"}, ttl=60)
+            self.assertEqual(self._get_accessed_at("a"), 1001)
+            time_mock.return_value = 1002
+            self.cache.get("a")
+            self.cache.close()
+            self.assertEqual(self._get_accessed_at("a"), 1002)
+            self.assertEqual(self.cache.get("a"), {"value": "a"})
+
+    def test_accessed_at_flushed_by_batch_size(self):
+        with mock.patch("traemplist.cache.time.time") as time_mock, \
+                mock.patch.object(SqLiteResponseCache, "ACCESSES_BATCH_SIZE", self.MAX_ENTRIES_COUNT):
+            time_mock.return_value = 1000
+            for key in ["a", "b", "c"]:
+                self.cache.set(key, {"value": key}, ttl=60)
+            time_mock.return_value = 1001
+            self.cache.get("a")
+            self.cache.get("a")
+            self.cache.get("b")
+            self.assertEqual([self._get_accessed_at(key) for key in ["a", "b", "c"]], [1000, 1000, 1000])
+            self.cache.get("c")
+            self.assertEqual([self._get_accessed_at(key) for key in ["a", "b", "c"]], [1001, 1001, 1001])
+
+
+class InMemoryResponseCacheTest(ResponseCacheAbstractTest):
+
+    def _get_cache(self, max_entries_count: int) -> InMemoryResponseCache:
+        return InMemoryResponseCache(max_entries_count=max_entries_count)
+
+
+class EncryptedFileAccessTokenCacheCreationTest(TestCase):
+
+    def test_create_without_cryptography(self):
+        logger_mock = mock.Mock()
+        with mock.patch("traemplist.cache.Fernet", None):
+            self.assertIsNone(EncryptedFileAccessTokenCache.create_if_supported("dir_path", logger_mock))
+        logger_mock.log_error.assert_called_once()
+
+    @skipUnless(EncryptedFileAccessTokenCache.is_supported(), "cryptography package is not installed")
+    def test_create_with_cryptography(self):
+        logger_mock = mock.Mock()
+        self.assertIsInstance(
+            EncryptedFileAccessTokenCache.create_if_supported("dir_path", logger_mock),
+            EncryptedFileAccessTokenCache
+        )
+        logger_mock.log_error.assert_not_called()
+
+
+@skipUnless(EncryptedFileAccessTokenCache.is_supported(), "cryptography package is not installed")
+class EncryptedFileAccessTokenCacheTest(TestCase):
+
+    CREDENTIALS_CONFIG = AccountCredentialsConfig(
+        client_id="client_id",
+        client_secret="client_secret",
+        refresh_token="refresh_token"
+    )
+
+    def setUp(self) -> None:
+        self.tmp_dir = mkdtemp()
+        self.cache = EncryptedFileAccessTokenCache(self.tmp_dir)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_save_and_get(self):
+        access_token = AccessToken(value="secret_access_token", expires_at=1234.5)
+        self.assertIsNone(self.cache.get(self.CREDENTIALS_CONFIG))
+        self.cache.save(self.CREDENTIALS_CONFIG, access_token)
+        self.assertEqual(self.cache.get(self.CREDENTIALS_CONFIG), access_token)
+        self.assertEqual(EncryptedFileAccessTokenCache(self.tmp_dir).get(self.CREDENTIALS_CONFIG), access_token)
+
+    def test_encrypted_at_rest(self):
+        self.cache.save(self.CREDENTIALS_CONFIG, AccessToken(value="secret_access_token", expires_at=1234.5))
+        file_paths = [os.path.join(self.tmp_dir, file_name) for file_name in os.listdir(self.tmp_dir)]
+        self.assertEqual(len(file_paths), 1)
+        with open(file_paths[0], "rb") as token_file:
+            self.assertNotIn(b"secret_access_token", token_file.read())
+        self.assertEqual(os.stat(file_paths[0]).st_mode & 0o777, 0o600)
+
+    def test_get_with_other_secret(self):
+        self.cache.save(self.CREDENTIALS_CONFIG, AccessToken(value="secret_access_token", expires_at=1234.5))
+        self.assertIsNone(
+            self.cache.get(
+                AccountCredentialsConfig(
+                    client_id="client_id",
+                    client_secret="other_client_secret",
+                    refresh_token="refresh_token"
+                )
+            )
+        )
+
+    def test_get_with_other_refresh_token(self):
+        self.cache.save(self.CREDENTIALS_CONFIG, AccessToken(value="secret_access_token", expires_at=1234.5))
+        other_credentials_config = AccountCredentialsConfig(
+            client_id="client_id",
+            client_secret="client_secret",
+            refresh_token="other_refresh_token"
+        )
+        self.assertIsNone(self.cache.get(other_credentials_config))
+        other_access_token = AccessToken(value="other_access_token", expires_at=1234.5)
+        self.cache.save(other_credentials_config, other_access_token)
+        self.assertEqual(self.cache.get(other_credentials_config), other_access_token)
+        self.assertEqual(
+            self.cache.get(self.CREDENTIALS_CONFIG),
+            AccessToken(value="secret_access_token", expires_at=1234.5)
+        )
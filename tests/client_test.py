@@ -1,18 +1,30 @@
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from copy import copy, deepcopy
+from dataclasses import FrozenInstanceError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from random import Random
+from threading import Thread
 from unittest import TestCase, mock
 from typing import Optional
 from uuid import uuid4
 from spotipy.oauth2 import SpotifyOauthError
 from spotipy.client import SpotifyException
 from traemplist.config import AccountCredentialsConfig
-from traemplist.client import Artist, Track, TracksCollection, EmptyTracksCollectionError, SpotifyAccessTokenProvider, \
-    SpotifyAccessTokenRequestError, SpotifyAccessTokenResponseDataError, SpotifyClient, SpotifyClientRequestError, \
-    SpotifyClientResponseDataError, Playlist
+from traemplist.cache import InMemoryResponseCache, AccessToken
+from traemplist.scheduler import SpotifyRequestScheduler
+from traemplist.client import Artist, Track, TracksCollection, IndexedTracksCollection, EmptyTracksCollectionError, \
+    SpotifyAccessTokenProvider, SpotifyAccessTokenRequestError, SpotifyAccessTokenResponseDataError, SpotifyClient, \
+    SpotifyClientRequestError, SpotifyClientResponseDataError, Playlist, PlaylistSnapshot, LikedTrack
 
 
 class TracksCollectionTest(TestCase):
 
+    COLLECTION_CLASS = TracksCollection
+
     def test_tracks_adding(self):
-        collection = TracksCollection()
+        collection = self.COLLECTION_CLASS()
         self.assertEqual(collection.get_tracks(), set())
         track_a = self._create_test_track()
         track_b = self._create_test_track()
@@ -22,7 +34,7 @@ class TracksCollectionTest(TestCase):
         track_c = self._create_test_track()
         track_d = self._create_test_track()
         collection.add_tracks(
-            TracksCollection().add_track(track_c).add_track(track_d)
+            self.COLLECTION_CLASS().add_track(track_c).add_track(track_d)
         )
         self.assertEqual(
             collection.get_tracks(),
@@ -32,15 +44,54 @@ class TracksCollectionTest(TestCase):
     def test_get_random_track(self):
         with self.subTest("From non-empty collection"):
             track = self._create_test_track()
-            collection = TracksCollection().add_track(track)
+            collection = self.COLLECTION_CLASS().add_track(track)
             self.assertEqual(collection.get_random_track(), track)
         with self.subTest("From empty collection"):
             with self.assertRaises(EmptyTracksCollectionError):
-                TracksCollection().get_random_track()
+                self.COLLECTION_CLASS().get_random_track()
+
+    def test_get_track_ids(self):
+        collection = self.COLLECTION_CLASS()
+        for track_id in ["c", "a", "b"]:
+            collection.add_track(Track(id=track_id, name=track_id, artist=Artist(id="artist", name="Artist")))
+        self.assertEqual(
+            collection.get_track_ids(),
+            ["c", "a", "b"] if self.COLLECTION_CLASS is IndexedTracksCollection else ["a", "b", "c"]
+        )
+
+    def test_get_random_track_with_seeded_rng(self):
+        collection = self.COLLECTION_CLASS()
+        for _ in range(20):
+            collection.add_track(self._create_test_track())
+        rng_a, rng_b = Random(2), Random(2)
+        self.assertEqual(
+            [collection.get_random_track(rng_a) for _ in range(10)],
+            [collection.get_random_track(rng_b) for _ in range(10)]
+        )
+
+    def test_get_random_track_with_seeded_rng_after_changes(self):
+        artists = [Artist(id=f"artist_{i}", name=f"artist_{i}") for i in range(4)]
+        tracks = [self._create_test_track(artist=artists[i % len(artists)]) for i in range(40)]
+        picks = []
+        for initial_tracks in [tracks[:2], tracks[1::-1]]:
+            rng = Random(3)
+            collection = self.COLLECTION_CLASS().add_tracks(TracksCollection().add_tracks(
+                self.COLLECTION_CLASS().add_track(initial_tracks[0]).add_track(initial_tracks[1])
+            ))
+            collection_picks = [collection.get_random_track(rng)]
+            for track in tracks[2:]:
+                collection.add_track(track)
+            collection_picks += [collection.get_random_track(rng) for _ in range(10)]
+            self.assertTrue(set(collection_picks[-10:]) - set(tracks[:2]))
+            collection.remove_artist_tracks(artists[0])
+            collection_picks += [collection.get_random_track(rng) for _ in range(10)]
+            self.assertNotIn(artists[0], {track.artist for track in collection_picks[-10:]})
+            picks.append(collection_picks)
+        self.assertEqual(picks[0], picks[1])
 
     def test_contains_artist_track(self):
         track = self._create_test_track()
-        collection = TracksCollection().add_track(track)
+        collection = self.COLLECTION_CLASS().add_track(track)
         self.assertTrue(
             collection.contains_artist_track(track.artist)
         )
@@ -51,7 +102,7 @@ class TracksCollectionTest(TestCase):
     def test_remove_artist_tracks(self):
         track_a = self._create_test_track()
         track_b = self._create_test_track(artist=Artist(id="new", name="new"))
-        collection = TracksCollection().add_track(track_a).add_track(track_b)
+        collection = self.COLLECTION_CLASS().add_track(track_a).add_track(track_b)
         collection.remove_artist_tracks(track_a.artist)
         self.assertFalse(collection.contains_artist_track(track_a.artist))
         self.assertTrue(collection.contains_artist_track(track_b.artist))
@@ -59,16 +110,48 @@ class TracksCollectionTest(TestCase):
     def test_contains(self):
         track_a = self._create_test_track()
         track_b = self._create_test_track()
-        collection = TracksCollection().add_track(track_a)
+        collection = self.COLLECTION_CLASS().add_track(track_a)
         self.assertTrue(track_a in collection)
         self.assertFalse(track_b in collection)
 
     def test_length(self):
-        collection = TracksCollection()
+        collection = self.COLLECTION_CLASS()
         self.assertEqual(len(collection), 0)
         collection.add_track(self._create_test_track())
         self.assertEqual(len(collection), 1)
 
+    def test_same_id_tracks_deduplicated(self):
+        for seed in range(20):
+            rng = Random(seed)
+            expected_track_ids = set()
+            collection = self.COLLECTION_CLASS()
+            other_collection = self.COLLECTION_CLASS()
+            for _ in range(200):
+                track = self._create_random_track(rng)
+                expected_track_ids.add(track.id)
+                rng.choice([collection, other_collection]).add_track(track)
+            collection.add_tracks(other_collection)
+            self.assertEqual({track.id for track in collection.get_tracks()}, expected_track_ids)
+            self.assertEqual(len(collection), len(expected_track_ids))
+            for track in other_collection.get_tracks():
+                self.assertIn(self._create_random_track(rng, track_id=track.id), collection)
+
+    def test_add_tracks_in_place(self):
+        collection = self.COLLECTION_CLASS().add_track(self._create_test_track())
+        tracks = collection.get_tracks()
+        collection.add_tracks(self.COLLECTION_CLASS().add_track(self._create_test_track()))
+        self.assertIs(collection.get_tracks(), tracks)
+        self.assertEqual(len(tracks), 2)
+
+    @staticmethod
+    def _create_random_track(rng: Random, track_id: Optional[str] = None) -> Track:
+        artist_id = f"artist_{rng.randint(0, 5)}"
+        return Track(
+            id=track_id or f"track_{rng.randint(0, 50)}",
+            name=f"name_{rng.randint(0, 5)}",
+            artist=Artist(id=artist_id, name=f"{artist_id}_name_{rng.randint(0, 1)}")
+        )
+
     @staticmethod
     def _create_test_track(artist: Optional[Artist] = None) -> Track:
         track_id = str(uuid4())
@@ -77,6 +160,67 @@ class TracksCollectionTest(TestCase):
         return Track(id=track_id, name=track_id, artist=artist)
 
 
+class IndexedTracksCollectionTest(TracksCollectionTest):
+
+    COLLECTION_CLASS = IndexedTracksCollection
+
+    def test_remove_artist_tracks_keeps_index_consistent(self):
+        artists = [Artist(id=f"artist_{i}", name=f"artist_{i}") for i in range(5)]
+        collection = IndexedTracksCollection()
+        for i in range(50):
+            collection.add_track(self._create_test_track(artist=artists[i % len(artists)]))
+        collection.remove_artist_tracks(artists[0])
+        collection.remove_artist_tracks(artists[3])
+        collection.remove_artist_tracks(Artist(id="unknown", name="unknown"))
+        self.assertEqual(len(collection), 30)
+        self.assertEqual(set(collection.tracks_list), collection.get_tracks())
+        for position, track in enumerate(collection.tracks_list):
+            self.assertEqual(collection.tracks_positions[track], position)
+        for _ in range(100):
+            self.assertIn(collection.get_random_track().artist, {artists[1], artists[2], artists[4]})
+        for artist in [artists[1], artists[2], artists[4]]:
+            collection.remove_artist_tracks(artist)
+        self.assertFalse(collection)
+        with self.assertRaises(EmptyTracksCollectionError):
+            collection.get_random_track()
+
+    def test_add_duplicate_track(self):
+        track = self._create_test_track()
+        collection = IndexedTracksCollection().add_track(track).add_track(track)
+        self.assertEqual(len(collection), 1)
+        self.assertEqual(collection.tracks_list, [track])
+
+
+class TrackTest(TestCase):
+
+    def test_slotted_representation(self):
+        track = Track(id="track_id", name="track_name", artist=Artist(id="artist_id", name="artist_name"))
+        self.assertFalse(hasattr(track, "__dict__"))
+        self.assertFalse(hasattr(track.artist, "__dict__"))
+        with self.assertRaises(FrozenInstanceError):
+            track.name = "other_name"
+
+    def test_identity_by_id(self):
+        for seed in range(20):
+            rng = Random(seed)
+            tracks = [
+                TracksCollectionTest._create_random_track(rng, track_id=f"track_{rng.randint(0, 3)}")
+                for _ in range(20)
+            ]
+            for track_a in tracks:
+                for track_b in tracks:
+                    self.assertEqual(track_a == track_b, track_a.id == track_b.id)
+                    if track_a == track_b:
+                        self.assertEqual(hash(track_a), hash(track_b))
+        self.assertNotEqual(Track(id="id", name="id", artist=Artist(id="id", name="id")), "id")
+
+    def test_copy_and_pickle(self):
+        track = Track(id="track_id", name="track_name", artist=Artist(id="artist_id", name="artist_name"))
+        for track_copy in [copy(track), deepcopy(track), pickle.loads(pickle.dumps(track))]:
+            self.assertEqual(track_copy.name, track.name)
+            self.assertEqual(track_copy.artist, track.artist)
+
+
 class SpotifyAccessTokenProviderTest(TestCase):
 
     CLIENT_ID = "test_client_id"
@@ -113,6 +257,63 @@ class SpotifyAccessTokenProviderTest(TestCase):
                 refresh_token=self.REFRESH_TOKEN
             )
 
+    def test_access_token_refreshed_before_expiration(self):
+        with mock.patch("traemplist.client.SpotifyOAuth") as oauth_mock, \
+                mock.patch("traemplist.client.time.time") as time_mock:
+            oauth_instance_mock = mock.Mock()
+            oauth_mock.side_effect = lambda *args, **kwargs: oauth_instance_mock
+            oauth_instance_mock.refresh_access_token.side_effect = [
+                {"access_token": "first_access_token", "expires_in": 3600},
+                {"access_token": "second_access_token", "expires_in": 3600}
+            ]
+            time_mock.return_value = 1000
+            self.assertEqual(self.provider.get_access_token(), "first_access_token")
+            time_mock.return_value = 1000 + 3600 - SpotifyAccessTokenProvider.EXPIRATION_MARGIN - 1
+            self.assertEqual(self.provider.get_access_token(), "first_access_token")
+            time_mock.return_value = 1000 + 3600 - SpotifyAccessTokenProvider.EXPIRATION_MARGIN
+            self.assertEqual(self.provider.get_access_token(), "second_access_token")
+            self.assertEqual(oauth_instance_mock.refresh_access_token.call_count, 2)
+
+    def test_access_token_refreshed_once_for_concurrent_callers(self):
+        with mock.patch("traemplist.client.SpotifyOAuth") as oauth_mock:
+            oauth_instance_mock = mock.Mock()
+            oauth_mock.side_effect = lambda *args, **kwargs: oauth_instance_mock
+            oauth_instance_mock.refresh_access_token.return_value = {
+                "access_token": "returned_access_token",
+                "expires_in": 3600
+            }
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                access_tokens = list(executor.map(lambda _: self.provider.get_access_token(), range(50)))
+            self.assertEqual(set(access_tokens), {"returned_access_token"})
+            oauth_instance_mock.refresh_access_token.assert_called_once()
+
+    def test_access_token_cache(self):
+        access_token_cache = mock.Mock()
+        provider = SpotifyAccessTokenProvider(
+            credentials_config=self.provider.credentials_config,
+            access_token_cache=access_token_cache
+        )
+        with mock.patch("traemplist.client.SpotifyOAuth") as oauth_mock:
+            with self.subTest("Valid cached token"):
+                access_token_cache.get.return_value = AccessToken(value="cached_access_token", expires_at=2 ** 40)
+                self.assertEqual(provider.get_access_token(), "cached_access_token")
+                oauth_mock.assert_not_called()
+                access_token_cache.save.assert_not_called()
+            with self.subTest("Expired cached token"):
+                provider.access_token = None
+                access_token_cache.get.return_value = AccessToken(value="cached_access_token", expires_at=0)
+                oauth_instance_mock = mock.Mock()
+                oauth_mock.side_effect = lambda *args, **kwargs: oauth_instance_mock
+                oauth_instance_mock.refresh_access_token.return_value = {
+                    "access_token": "returned_access_token",
+                    "expires_in": 3600
+                }
+                self.assertEqual(provider.get_access_token(), "returned_access_token")
+                access_token_cache.save.assert_called_once_with(
+                    self.provider.credentials_config,
+                    provider.access_token
+                )
+
     def test_access_token_request_error(self):
         with mock.patch("traemplist.client.SpotifyOAuth") as oauth_mock:
             oauth_instance_mock = mock.Mock()
@@ -155,6 +356,7 @@ class SpotifyClientTest(TestCase):
         name="track_name",
         artist=ARTIST_RESPONSE_OBJECT
     )
+    ADDED_AT = "2021-03-01T12:00:00Z"
 
     def setUp(self) -> None:
         self.token_provider = mock.Mock()
@@ -190,6 +392,18 @@ class SpotifyClientTest(TestCase):
                 )
             ])
 
+    def test_get_user_playlist_snapshots_success(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.current_user_playlists.return_value = {
+                "items": [{"id": "1", "snapshot_id": "snapshot_1"}, {"id": "2"}]
+            }
+            self.assertEqual(
+                list(self.client.get_user_playlist_snapshots()),
+                [PlaylistSnapshot(id="1", snapshot_id="snapshot_1"), PlaylistSnapshot(id="2", snapshot_id=None)]
+            )
+
     def test_get_user_playlist_ids_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
             client_instance_mock = mock.Mock()
@@ -214,6 +428,7 @@ class SpotifyClientTest(TestCase):
                 "id": "playlist_id",
                 "name": "playlist_name",
                 "tracks": {
+                    "total": 1,
                     "items": [
                         {
                             "track": self.TRACK_RESPONSE_DATA
@@ -221,19 +436,93 @@ class SpotifyClientTest(TestCase):
                     ]
                 }
             }
+            playlist = self.client.get_playlist(playlist_id="playlist_id")
             self.assertEqual(
-                self.client.get_playlist(playlist_id="playlist_id"),
+                playlist,
                 Playlist(
                     playlist_id="playlist_id",
                     name="playlist_name"
-                ).add_track(
-                    self.TRACK_RESPONSE_OBJECT
                 )
             )
+            self.assertEqual(playlist.get_tracks(), {self.TRACK_RESPONSE_OBJECT})
             client_instance_mock.playlist.assert_called_once_with(
                 playlist_id="playlist_id",
-                fields=["id, name, tracks.items(track(name, id, artists))"]
+                fields=f"id,name,tracks({SpotifyClient.PLAYLIST_TRACKS_FIELDS})"
             )
+            client_instance_mock.playlist_items.assert_not_called()
+
+    def test_get_playlist_all_pages(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            limit = SpotifyClient.GET_PLAYLIST_ITEMS_LIMIT
+            total = 2 * limit + 10
+            tracks_objects = [self._create_track_object(i) for i in range(total)]
+            items = [{"track": self._create_track_data(i)} for i in range(total)]
+            client_instance_mock.playlist.return_value = {
+                "id": "playlist_id",
+                "name": "playlist_name",
+                "tracks": {"total": total, "items": items[:limit]}
+            }
+            client_instance_mock.playlist_items.side_effect = \
+                lambda playlist_id, fields, limit, offset, additional_types: {
+                    "total": total,
+                    "items": items[offset:offset + limit]
+                }
+            self.assertEqual(
+                self.client.get_playlist(playlist_id="playlist_id").get_tracks(),
+                set(tracks_objects)
+            )
+            client_instance_mock.playlist_items.assert_has_calls([
+                mock.call(
+                    playlist_id="playlist_id",
+                    fields=SpotifyClient.PLAYLIST_TRACKS_FIELDS,
+                    limit=limit,
+                    offset=offset,
+                    additional_types=("track",)
+                )
+                for offset in [limit, 2 * limit]
+            ], any_order=True)
+            self.assertEqual(client_instance_mock.playlist_items.call_count, 2)
+
+    def test_get_playlist_tracks_success(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            limit = SpotifyClient.GET_PLAYLIST_ITEMS_LIMIT
+            total = limit + 1
+            items = [{"track": self._create_track_data(i)} for i in range(total)]
+            client_instance_mock.playlist_items.side_effect = \
+                lambda playlist_id, fields, limit, offset, additional_types: {
+                    "total": total,
+                    "items": items[offset:offset + limit]
+                }
+            tracks = self.client.get_playlist_tracks(playlist_id="playlist_id")
+            self.assertEqual(next(tracks), self._create_track_object(0))
+            self.assertEqual(client_instance_mock.playlist_items.call_count, 1)
+            self.assertEqual(
+                set(tracks),
+                {self._create_track_object(i) for i in range(1, total)}
+            )
+            self.assertEqual(client_instance_mock.playlist_items.call_count, 2)
+            client_instance_mock.playlist_items.assert_has_calls([
+                mock.call(
+                    playlist_id="playlist_id",
+                    fields=SpotifyClient.PLAYLIST_TRACKS_FIELDS,
+                    limit=limit,
+                    offset=offset,
+                    additional_types=("track",)
+                )
+                for offset in [0, limit]
+            ], any_order=True)
+
+    def test_get_playlist_tracks_request_error(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.playlist_items.side_effect = SpotifyException("error", "error", "error")
+            with self.assertRaises(SpotifyClientRequestError):
+                list(self.client.get_playlist_tracks(playlist_id="playlist_id"))
 
     def test_get_playlist_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
@@ -268,7 +557,45 @@ class SpotifyClientTest(TestCase):
                     self.TRACK_RESPONSE_OBJECT
                 )
             )
-            client_instance_mock.current_user_recently_played.assert_called_once()
+            client_instance_mock.current_user_recently_played.assert_called_once_with(
+                limit=SpotifyClient.GET_RECENTLY_PLAYED_LIMIT,
+                after=None
+            )
+
+    def test_get_recently_played_tracks_after_cursor(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            limit = SpotifyClient.GET_RECENTLY_PLAYED_LIMIT
+            client_instance_mock.current_user_recently_played.side_effect = [
+                {
+                    "items": [{"track": self._create_track_data(i)} for i in range(limit)],
+                    "cursors": {"after": "2000", "before": "1500"}
+                },
+                {
+                    "items": [{"track": self._create_track_data(limit)}],
+                    "cursors": {"after": "3000", "before": "3000"}
+                }
+            ]
+            recently_played_tracks = self.client.get_recently_played_tracks(after=1000)
+            self.assertEqual(
+                recently_played_tracks.get_tracks(),
+                {self._create_track_object(i) for i in range(limit + 1)}
+            )
+            self.assertEqual(recently_played_tracks.get_cursor(), 3000)
+            client_instance_mock.current_user_recently_played.assert_has_calls([
+                mock.call(limit=limit, after=1000),
+                mock.call(limit=limit, after=2000)
+            ])
+
+    def test_get_recently_played_tracks_without_new_plays(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.current_user_recently_played.return_value = {"items": [], "cursors": None}
+            recently_played_tracks = self.client.get_recently_played_tracks(after=1000)
+            self.assertFalse(recently_played_tracks)
+            self.assertEqual(recently_played_tracks.get_cursor(), 1000)
 
     def test_get_recently_played_tracks_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
@@ -338,6 +665,22 @@ class SpotifyClientTest(TestCase):
                 artist_id="artist_id"
             )
 
+    def test_artists_interned(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.artist_top_tracks.return_value = {
+                "tracks": [self._create_track_data(i) for i in range(3)]
+            }
+            client_instance_mock.artist_related_artists.return_value = {
+                "artists": [dict(self.ARTIST_RESPONSE_DATA)]
+            }
+            artists = [track.artist for track in self.client.get_artist_top_tracks(artist_id="artist_id").get_tracks()]
+            artists.extend(self.client.get_related_artists(artist_id="other_artist_id"))
+            self.assertEqual(len(artists), 4)
+            for artist in artists:
+                self.assertIs(artist, artists[0])
+
     def test_get_artist_top_tracks_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
             client_instance_mock = mock.Mock()
@@ -354,23 +697,164 @@ class SpotifyClientTest(TestCase):
             with self.assertRaises(SpotifyClientResponseDataError):
                 self.client.get_artist_top_tracks(artist_id="artist_id")
 
+    def test_get_related_artists_and_top_tracks_cached(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.artist_related_artists.return_value = {
+                "artists": [
+                    self.ARTIST_RESPONSE_DATA
+                ]
+            }
+            client_instance_mock.artist_top_tracks.return_value = {
+                "tracks": [
+                    self.TRACK_RESPONSE_DATA
+                ]
+            }
+            cache = InMemoryResponseCache(max_entries_count=10)
+            client = SpotifyClient(
+                access_token_provider=self.token_provider,
+                response_cache=cache
+            )
+            for _ in range(2):
+                self.assertEqual(
+                    client.get_related_artists(artist_id="artist_id"),
+                    [self.ARTIST_RESPONSE_OBJECT]
+                )
+                self.assertEqual(
+                    client.get_artist_top_tracks(artist_id="artist_id"),
+                    TracksCollection().add_track(
+                        self.TRACK_RESPONSE_OBJECT
+                    )
+                )
+            client_instance_mock.artist_related_artists.assert_called_once_with(artist_id="artist_id")
+            client_instance_mock.artist_top_tracks.assert_called_once_with(artist_id="artist_id")
+            self.assertEqual(cache.get_hits_count(), 2)
+            self.assertEqual(cache.get_misses_count(), 2)
+
+    def test_throttled_request_retried(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.artist_related_artists.side_effect = [
+                SpotifyException(429, -1, "throttled", headers={"Retry-After": "0"}),
+                {"artists": [self.ARTIST_RESPONSE_DATA]}
+            ]
+            self.assertEqual(
+                self.client.get_related_artists(artist_id="artist_id"),
+                [self.ARTIST_RESPONSE_OBJECT]
+            )
+            self.assertEqual(self.client.request_scheduler.get_throttled_count(), 1)
+
+    def test_spotify_session_reused(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.artist_related_artists.return_value = {"artists": []}
+            client_instance_mock.artist_top_tracks.return_value = {"tracks": []}
+            self.client.get_related_artists(artist_id="artist_id")
+            self.client.get_artist_top_tracks(artist_id="artist_id")
+            client_mock.assert_called_once()
+            self.assertEqual(client_mock.call_args.kwargs["auth"], self.ACCESS_TOKEN)
+            client_instance_mock.set_auth.assert_not_called()
+            self.token_provider.get_access_token.return_value = "refreshed_access_token"
+            self.client.get_related_artists(artist_id="artist_id")
+            client_mock.assert_called_once()
+            client_instance_mock.set_auth.assert_called_once_with("refreshed_access_token")
+
     def test_replace_playlist_tracks_success(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
             client_instance_mock = mock.Mock()
             client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
-            self.client.replace_playlist_tracks(
-                playlist_id="playlist_id",
-                new_track_ids=["track_a", "track_b"]
+            client_instance_mock.playlist_items.return_value = {"total": 0, "items": []}
+            self.assertTrue(
+                self.client.replace_playlist_tracks(
+                    playlist_id="playlist_id",
+                    new_track_ids=["track_a", "track_b"]
+                )
             )
             client_instance_mock.playlist_replace_items.assert_called_once_with(
                 playlist_id="playlist_id",
                 items=["track_a", "track_b"]
             )
+            client_instance_mock.playlist_add_items.assert_not_called()
+
+    def test_replace_playlist_tracks_in_chunks(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.playlist_items.return_value = {"total": 0, "items": []}
+            new_track_ids = [f"track_{i}" for i in range(250)]
+            self.assertTrue(
+                self.client.replace_playlist_tracks(
+                    playlist_id="playlist_id",
+                    new_track_ids=new_track_ids
+                )
+            )
+            client_instance_mock.playlist_replace_items.assert_called_once_with(
+                playlist_id="playlist_id",
+                items=new_track_ids[:100]
+            )
+            self.assertEqual(
+                client_instance_mock.playlist_add_items.call_args_list,
+                [
+                    mock.call(playlist_id="playlist_id", items=new_track_ids[100:200]),
+                    mock.call(playlist_id="playlist_id", items=new_track_ids[200:])
+                ]
+            )
+
+    def test_replace_playlist_tracks_unchanged(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            total = 150
+            items = [{"track": self._create_track_data(i)} for i in range(total)]
+            client_instance_mock.playlist_items.side_effect = \
+                lambda playlist_id, fields, limit, offset, additional_types: {
+                    "total": total,
+                    "items": items[offset:offset + limit]
+                }
+            track_ids = [f"track_{i}_id" for i in range(total)]
+            self.assertEqual(self.client.get_playlist_track_ids("playlist_id"), track_ids)
+            self.assertFalse(
+                self.client.replace_playlist_tracks(
+                    playlist_id="playlist_id",
+                    new_track_ids=track_ids
+                )
+            )
+            client_instance_mock.playlist_replace_items.assert_not_called()
+            self.assertTrue(
+                self.client.replace_playlist_tracks(
+                    playlist_id="playlist_id",
+                    new_track_ids=list(reversed(track_ids))
+                )
+            )
+            client_instance_mock.playlist_replace_items.assert_called_once()
+
+    def test_replace_playlist_tracks_server_errors(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock, \
+                mock.patch("traemplist.scheduler.time.sleep"):
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.playlist_items.return_value = {"total": 0, "items": []}
+            client_instance_mock.playlist_replace_items.side_effect = [
+                SpotifyException(502, -1, "bad gateway"),
+                {"snapshot_id": "snapshot"}
+            ]
+            client_instance_mock.playlist_add_items.side_effect = SpotifyException(502, -1, "bad gateway")
+            with self.assertRaises(SpotifyClientRequestError):
+                self.client.replace_playlist_tracks(
+                    playlist_id="playlist_id",
+                    new_track_ids=[f"track_{i}" for i in range(150)]
+                )
+            self.assertEqual(client_instance_mock.playlist_replace_items.call_count, 2)
+            client_instance_mock.playlist_add_items.assert_called_once()
 
     def test_replace_playlist_tracks_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
             client_instance_mock = mock.Mock()
             client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.playlist_items.return_value = {"total": 0, "items": []}
             client_instance_mock.playlist_replace_items.side_effect = SpotifyException("error", "error", "error")
             with self.assertRaises(SpotifyClientRequestError):
                 self.client.replace_playlist_tracks(
@@ -391,7 +875,7 @@ class SpotifyClientTest(TestCase):
                 track_data["id"] = track_id
                 track_data["name"] = track_name
                 tracks_data.append(
-                    {"track": track_data}
+                    {"added_at": self.ADDED_AT, "track": track_data}
                 )
                 tracks_objects.append(
                     Track(
@@ -426,6 +910,67 @@ class SpotifyClientTest(TestCase):
                 )
             ])
 
+    def test_get_user_liked_tracks_trusted_responses(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            track_data = dict(self.TRACK_RESPONSE_DATA)
+            track_data["artists"] = [self.ARTIST_RESPONSE_DATA, {"unread": "artist"}]
+            client_instance_mock.current_user_saved_tracks.return_value = {
+                "items": [{"added_at": self.ADDED_AT, "track": track_data}]
+            }
+            trusted_client = SpotifyClient(
+                access_token_provider=self.token_provider,
+                trusted_responses=True
+            )
+            self.assertEqual(
+                trusted_client.get_user_liked_tracks(),
+                TracksCollection().add_track(self.TRACK_RESPONSE_OBJECT)
+            )
+            with self.assertRaises(SpotifyClientResponseDataError):
+                self.client.get_user_liked_tracks()
+            client_instance_mock.current_user_saved_tracks.return_value = {
+                "items": [
+                    {"added_at": self.ADDED_AT, "track": {"id": "track_id", "artists": [self.ARTIST_RESPONSE_DATA]}}
+                ]
+            }
+            with self.assertRaises(SpotifyClientResponseDataError):
+                trusted_client.get_user_liked_tracks()
+
+    def test_get_user_liked_track_items_newest_first(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            limit = SpotifyClient.GET_USER_LIKED_SONGS_LIMIT
+            client_instance_mock.current_user_saved_tracks.side_effect = [
+                {
+                    "items": [
+                        {"added_at": f"2021-03-01T12:00:{59 - i:02}Z", "track": self._create_track_data(i)}
+                        for i in range(limit)
+                    ]
+                },
+                {
+                    "items": [{"added_at": "2021-02-01T12:00:00Z", "track": self._create_track_data(limit)}]
+                }
+            ]
+            liked_track_items = self.client.get_user_liked_track_items()
+            self.assertEqual(
+                next(liked_track_items),
+                LikedTrack(track=self._create_track_object(0), added_at="2021-03-01T12:00:59Z")
+            )
+            liked_track_items.close()
+            client_instance_mock.current_user_saved_tracks.assert_called_once_with(limit=limit, offset=0)
+
+    def test_get_user_liked_tracks_without_added_at(self):
+        with mock.patch("traemplist.client.Spotify") as client_mock:
+            client_instance_mock = mock.Mock()
+            client_mock.side_effect = lambda *args, **kwargs: client_instance_mock
+            client_instance_mock.current_user_saved_tracks.return_value = {
+                "items": [{"track": self.TRACK_RESPONSE_DATA}]
+            }
+            with self.assertRaises(SpotifyClientResponseDataError):
+                self.client.get_user_liked_tracks()
+
     def test_get_user_liked_tracks_request_error(self):
         with mock.patch("traemplist.client.Spotify") as client_mock:
             client_instance_mock = mock.Mock()
@@ -441,3 +986,65 @@ class SpotifyClientTest(TestCase):
             client_instance_mock.current_user_saved_tracks.return_value = {"invalid_data"}
             with self.assertRaises(SpotifyClientResponseDataError):
                 self.client.get_user_liked_tracks()
+
+    def _create_track_data(self, i: int) -> dict:
+        track_data = dict(self.TRACK_RESPONSE_DATA)
+        track_data["id"] = f"track_{i}_id"
+        track_data["name"] = f"track_{i}_name"
+        return track_data
+
+    def _create_track_object(self, i: int) -> Track:
+        return Track(
+            id=f"track_{i}_id",
+            name=f"track_{i}_name",
+            artist=self.ARTIST_RESPONSE_OBJECT
+        )
+
+
+class _ThrottlingSpotifyApiHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    requests_count = 0
+
+    def do_GET(self):
+        _ThrottlingSpotifyApiHandler.requests_count += 1
+        body = json.dumps({"error": {"status": 429, "message": "API rate limit exceeded"}}).encode()
+        self.send_response(429)
+        self.send_header("Retry-After", "7")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SpotifyClientSessionTest(TestCase):
+
+    def setUp(self) -> None:
+        _ThrottlingSpotifyApiHandler.requests_count = 0
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _ThrottlingSpotifyApiHandler)
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def tearDown(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retry_after_reaches_scheduler(self):
+        access_token_provider_mock = mock.Mock()
+        access_token_provider_mock.get_access_token.return_value = "access_token"
+        request_scheduler = SpotifyRequestScheduler(max_retries=1)
+        spotify_client = SpotifyClient(
+            access_token_provider=access_token_provider_mock,
+            request_scheduler=request_scheduler
+        )
+        spotify_client._get_spotify_client().prefix = f"http://127.0.0.1:{self.server.server_address[1]}/v1/"
+        handled_errors = []
+        with mock.patch.object(request_scheduler, "_handle_retry", lambda error, attempt: handled_errors.append(error)):
+            with self.assertRaises(SpotifyClientRequestError):
+                spotify_client.get_related_artists("artist_id")
+        self.assertEqual(_ThrottlingSpotifyApiHandler.requests_count, 2)
+        self.assertEqual(len(handled_errors), 1)
+        self.assertEqual(handled_errors[0].http_status, 429)
+        self.assertEqual(request_scheduler._get_retry_after(handled_errors[0]), 7)
@@ -0,0 +1,97 @@
+import shutil
+from unittest import TestCase, mock
+from tempfile import mkdtemp
+from spotipy.client import Spotify
+from traemplist.client import Artist
+from traemplist.fixtures import SpotifyResponseFixtures, RecordingSpotifyClient, ReplayingSpotifyClient, \
+    FixtureNotFoundError, FixturesFileNotFoundError, InvalidFixturesFileError
+
+
+class SpotifyResponseFixturesTest(TestCase):
+
+    def setUp(self) -> None:
+        self.tmp_dir = mkdtemp()
+        self.fixtures_file_path = self.tmp_dir + "/responses.json"
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.tmp_dir)
+
+    def test_record_and_replay(self):
+        fixtures = SpotifyResponseFixtures(self.fixtures_file_path)
+        access_token_provider_mock = mock.Mock()
+        access_token_provider_mock.get_access_token.return_value = "access_token"
+        recording_client = RecordingSpotifyClient(access_token_provider=access_token_provider_mock, fixtures=fixtures)
+        with mock.patch.object(Spotify, "_internal_call") as internal_call_mock:
+            internal_call_mock.side_effect = lambda method, url, payload, params: {
+                "artists": [{"id": f"{url.split('/')[-2]}_related", "name": "related"}]
+            }
+            self.assertEqual(
+                recording_client.get_related_artists("artist_a"),
+                [Artist(id="artist_a_related", name="related")]
+            )
+            recording_client.get_related_artists("artist_b")
+        fixtures.save()
+        self.assertEqual(fixtures.get_requests_counts(), {"GET artists/{id}/related-artists": 2})
+        replayed_fixtures = SpotifyResponseFixtures(self.fixtures_file_path).load()
+        replaying_client = ReplayingSpotifyClient(replayed_fixtures)
+        with mock.patch.object(Spotify, "_internal_call") as internal_call_mock:
+            self.assertEqual(
+                replaying_client.get_related_artists("artist_a"),
+                [Artist(id="artist_a_related", name="related")]
+            )
+            internal_call_mock.assert_not_called()
+        self.assertEqual(replayed_fixtures.get_requests_count(), 1)
+        with self.assertRaises(FixtureNotFoundError):
+            replaying_client.get_related_artists("artist_c")
+        replayed_fixtures.reset_requests_counts()
+        self.assertEqual(replayed_fixtures.get_requests_count(), 0)
+
+    def test_replay_write_requests_regardless_of_payload(self):
+        fixtures = SpotifyResponseFixtures(self.fixtures_file_path)
+        access_token_provider_mock = mock.Mock()
+        access_token_provider_mock.get_access_token.return_value = "access_token"
+        with mock.patch.object(Spotify, "_internal_call") as internal_call_mock:
+            internal_call_mock.side_effect = lambda method, url, payload, params: {
+                "total": 0,
+                "items": []
+            } if method == "GET" else {"snapshot_id": "snapshot"}
+            RecordingSpotifyClient(access_token_provider=access_token_provider_mock, fixtures=fixtures) \
+                .replace_playlist_tracks("traemplist", ["recorded_track"])
+        fixtures.reset_requests_counts()
+        self.assertTrue(ReplayingSpotifyClient(fixtures).replace_playlist_tracks("traemplist", ["replayed_track"]))
+        self.assertEqual(
+            fixtures.get_requests_counts(),
+            {"GET playlists/{id}/tracks": 1, "PUT playlists/{id}/tracks": 1}
+        )
+
+    def test_record_without_sending_write_requests(self):
+        fixtures = SpotifyResponseFixtures(self.fixtures_file_path)
+        access_token_provider_mock = mock.Mock()
+        access_token_provider_mock.get_access_token.return_value = "access_token"
+        with mock.patch.object(Spotify, "_internal_call") as internal_call_mock:
+            internal_call_mock.return_value = {"total": 0, "items": []}
+            self.assertTrue(
+                RecordingSpotifyClient(
+                    access_token_provider=access_token_provider_mock,
+                    fixtures=fixtures,
+                    send_write_requests=False
+                ).replace_playlist_tracks("traemplist", [f"track_{i}" for i in range(150)])
+            )
+            self.assertEqual([call.args[0] for call in internal_call_mock.mock_calls], ["GET"])
+        self.assertEqual(
+            fixtures.get_requests_counts(),
+            {"GET playlists/{id}/tracks": 1, "PUT playlists/{id}/tracks": 1, "POST playlists/{id}/tracks": 1}
+        )
+        fixtures.reset_requests_counts()
+        self.assertTrue(
+            ReplayingSpotifyClient(fixtures).replace_playlist_tracks("traemplist", [f"track_{i}" for i in range(150)])
+        )
+        self.assertEqual(fixtures.get_requests_count(), 3)
+
+    def test_load_errors(self):
+        with self.assertRaises(FixturesFileNotFoundError):
+            SpotifyResponseFixtures(self.fixtures_file_path).load()
+        with open(self.fixtures_file_path, "w") as fixtures_file:
+            fixtures_file.write("{")
+        with self.assertRaises(InvalidFixturesFileError):
+            SpotifyResponseFixtures(self.fixtures_file_path).load()
@@ -1,8 +1,13 @@
+import os
+import subprocess
+import sys
+from random import Random
 from unittest import TestCase, mock
 
-from traemplist.client import TracksCollection, Track, Artist
+from traemplist.client import TracksCollection, IndexedTracksCollection, Track, Artist
 from traemplist.repository import InMemoryTracksRepository, TrackRecord
-from traemplist.generator import TraemplistGenerator, InvalidTraemplistSizeError
+from traemplist.generator import TraemplistGenerator, InvalidTraemplistSizeError, InvalidWorkersCountError, \
+    RandomWalkTraemplistGenerator, GenerationMetrics, InvalidRandomWalkParametersError, InvalidPrefetchCountError
 
 
 class TraemplistGeneratorTest(TestCase):
@@ -74,6 +79,226 @@ class TraemplistGeneratorTest(TestCase):
             )
         ])
 
+    def test_generate_with_concurrent_workers(self):
+        client_mock = mock.Mock()
+        related_artists = [Artist(id=f"related_artist_{i}", name=f"related_artist_{i}") for i in range(10)]
+        client_mock.get_related_artists.return_value = related_artists
+        client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection().add_track(
+            self._create_track(track_id=f"{artist_id}_top_track")
+        )
+        input_tracks_collection = TracksCollection().add_track(self._create_track(track_id="input_track"))
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            workers_count=4
+        ).generate(
+            input_tracks_collection=input_tracks_collection,
+            size=100
+        )
+        self.assertEqual(len(traemplist), 1)
+        self.assertIn(
+            traemplist.get_random_track().id,
+            [f"{artist.id}_top_track" for artist in related_artists]
+        )
+        client_mock.get_artist_top_tracks.assert_has_calls(
+            [mock.call(artist_id=artist.id) for artist in related_artists],
+            any_order=True
+        )
+
+    def test_generate_screens_candidates_in_batch(self):
+        client_mock = mock.Mock()
+        history_mock = mock.Mock()
+        history_mock.filter_unheard.side_effect = lambda track_ids: [
+            track_id for track_id in track_ids if track_id != "heard_track"
+        ]
+        client_mock.get_related_artists.return_value = [Artist(id="related_artist", name="related_artist")]
+        client_mock.get_artist_top_tracks.return_value = TracksCollection() \
+            .add_track(self._create_track(track_id="heard_track")) \
+            .add_track(self._create_track(track_id="unheard_track"))
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=history_mock,
+            logger=mock.Mock()
+        ).generate(
+            input_tracks_collection=TracksCollection().add_track(self._create_track(track_id="input_track")),
+            size=100
+        )
+        self.assertEqual(traemplist, TracksCollection().add_track(self._create_track(track_id="unheard_track")))
+        history_mock.filter_unheard.assert_called_once()
+        self.assertEqual(
+            set(history_mock.filter_unheard.call_args.args[0]),
+            {"heard_track", "unheard_track"}
+        )
+        history_mock.contains_track.assert_not_called()
+
+    def test_generate_with_prefetch(self):
+        client_mock = mock.Mock()
+        client_mock.get_related_artists.side_effect = lambda artist_id: [
+            Artist(id=f"{artist_id}_related", name=f"{artist_id}_related")
+        ]
+        client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection().add_track(
+            self._create_track(track_id=f"{artist_id}_top_track")
+        )
+        input_tracks_collection = IndexedTracksCollection()
+        for i in range(20):
+            input_tracks_collection.add_track(self._create_track(track_id=f"input_track_{i}"))
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            prefetch_count=3
+        ).generate(
+            input_tracks_collection=input_tracks_collection,
+            size=20
+        )
+        self.assertEqual(len(traemplist), 20)
+        loaded_artist_ids = [call.kwargs["artist_id"] for call in client_mock.get_related_artists.call_args_list]
+        self.assertEqual(len(loaded_artist_ids), 20, "every prefetched start artist is used exactly once")
+        self.assertEqual(len(set(loaded_artist_ids)), 20)
+
+    def test_generate_keeps_unused_prefetched_artists(self):
+        client_mock = mock.Mock()
+        client_mock.get_related_artists.return_value = []
+        input_tracks_collection = IndexedTracksCollection()
+        for i in range(10):
+            input_tracks_collection.add_track(self._create_track(track_id=f"input_track_{i}"))
+        generator = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            prefetch_count=4
+        )
+        generator.generate(input_tracks_collection=input_tracks_collection, size=1)
+        self.assertEqual(len(input_tracks_collection), 0)
+        self.assertEqual(client_mock.get_related_artists.call_count, 10)
+
+    def test_generate_keeps_iterating_while_iterations_are_productive(self):
+        client_mock = self._create_related_artists_client_mock(related_artists_count=5)
+        input_tracks_collection = IndexedTracksCollection()
+        for i in range(10):
+            input_tracks_collection.add_track(self._create_track(track_id=f"input_track_{i}"))
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            use_candidate_reservoir=True
+        ).generate(
+            input_tracks_collection=input_tracks_collection,
+            size=10
+        )
+        self.assertEqual(len(traemplist), 10)
+        self.assertEqual(len({track.artist.id for track in traemplist.get_tracks()}), 10)
+        self.assertEqual(client_mock.get_related_artists.call_count, 10)
+        self.assertEqual(client_mock.get_artist_top_tracks.call_count, 50)
+
+    def test_generate_fills_slots_from_candidate_reservoir_once_iterations_are_unproductive(self):
+        client_mock = self._create_related_artists_client_mock(related_artists_count=3)
+        first_related_artists = [Artist(id=f"related_{i}", name=f"related_{i}") for i in range(3)]
+        client_mock.get_related_artists.side_effect = \
+            lambda artist_id: [] if client_mock.get_related_artists.call_count > 1 else first_related_artists
+        input_tracks_collection = IndexedTracksCollection()
+        for i in range(20):
+            input_tracks_collection.add_track(self._create_track(track_id=f"input_track_{i}"))
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            use_candidate_reservoir=True
+        ).generate(
+            input_tracks_collection=input_tracks_collection,
+            size=10
+        )
+        self.assertEqual(
+            {track.artist.id for track in traemplist.get_tracks()},
+            {artist.id for artist in first_related_artists}
+        )
+        self.assertEqual(
+            client_mock.get_related_artists.call_count,
+            1 + TraemplistGenerator.MAX_UNPRODUCTIVE_ITERATIONS_COUNT
+        )
+
+    def test_generate_fills_slots_from_candidate_reservoir_once_input_is_exhausted(self):
+        client_mock = self._create_related_artists_client_mock(related_artists_count=3)
+        history = InMemoryTracksRepository()
+        history.save_tracks([TrackRecord(id="track_input_track_artist_id_related_0_top_track_0")])
+        traemplist = TraemplistGenerator(
+            client=client_mock,
+            history=history,
+            logger=mock.Mock(),
+            use_candidate_reservoir=True
+        ).generate(
+            input_tracks_collection=TracksCollection().add_track(self._create_track(track_id="input_track")),
+            size=10
+        )
+        self.assertEqual(len(traemplist), 3)
+        self.assertNotIn(
+            "track_input_track_artist_id_related_0_top_track_0",
+            {track.id for track in traemplist.get_tracks()}
+        )
+
+    def test_generation_metrics(self):
+        client_mock = mock.Mock()
+        client_mock.get_related_artists.return_value = [
+            Artist(id=f"related_artist_{i}", name=f"related_artist_{i}") for i in range(3)
+        ]
+        client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection().add_track(
+            self._create_track(track_id=f"{artist_id}_top_track")
+        )
+        generator = TraemplistGenerator(
+            client=client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock()
+        )
+        generator.generate(
+            input_tracks_collection=TracksCollection().add_track(self._create_track(track_id="input_track")),
+            size=100
+        )
+        self.assertEqual(
+            generator.get_metrics(),
+            GenerationMetrics(related_artists_calls_count=1, top_tracks_calls_count=3, accepted_tracks_count=1)
+        )
+        self.assertEqual(generator.get_metrics().get_calls_per_accepted_track(), 4)
+
+    def test_generate_with_seeded_rng(self):
+        traemplists = []
+        for _ in range(2):
+            input_tracks_collection = IndexedTracksCollection()
+            for i in range(30):
+                input_tracks_collection.add_track(self._create_track(track_id=f"input_track_{i}"))
+            traemplists.append(
+                TraemplistGenerator(
+                    client=self._create_related_artists_client_mock(related_artists_count=3),
+                    history=InMemoryTracksRepository(),
+                    logger=mock.Mock(),
+                    use_candidate_reservoir=True,
+                    rng=Random(7)
+                ).generate(
+                    input_tracks_collection=input_tracks_collection,
+                    size=10
+                )
+            )
+        self.assertEqual(len(traemplists[0]), 10)
+        self.assertEqual(traemplists[0].tracks_list, traemplists[1].tracks_list)
+
+    def test_invalid_workers_count_error(self):
+        with self.assertRaises(InvalidWorkersCountError):
+            TraemplistGenerator(
+                client=mock.Mock(),
+                history=mock.Mock(),
+                logger=mock.Mock(),
+                workers_count=0
+            )
+
+    def test_invalid_prefetch_count_error(self):
+        with self.assertRaises(InvalidPrefetchCountError):
+            TraemplistGenerator(
+                client=mock.Mock(),
+                history=mock.Mock(),
+                logger=mock.Mock(),
+                prefetch_count=-1
+            )
+
     def test_invalid_size_error(self):
         with self.assertRaises(InvalidTraemplistSizeError):
             TraemplistGenerator(
@@ -85,6 +310,18 @@ class TraemplistGeneratorTest(TestCase):
                 size=-1
             )
 
+    @staticmethod
+    def _create_related_artists_client_mock(related_artists_count: int) -> mock.Mock:
+        client_mock = mock.Mock()
+        client_mock.get_related_artists.side_effect = lambda artist_id: [
+            Artist(id=f"{artist_id}_related_{i}", name=f"{artist_id}_related_{i}")
+            for i in range(related_artists_count)
+        ]
+        client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection() \
+            .add_track(Track(id=f"{artist_id}_top_track_0", name="top_track_0", artist=Artist(artist_id, artist_id))) \
+            .add_track(Track(id=f"{artist_id}_top_track_1", name="top_track_1", artist=Artist(artist_id, artist_id)))
+        return client_mock
+
     @staticmethod
     def _create_track(track_id: str) -> Track:
         return Track(
@@ -95,3 +332,181 @@ class TraemplistGeneratorTest(TestCase):
                 name=f"track_{track_id}_artist_name",
             )
         )
+
+
+class RandomWalkTraemplistGeneratorTest(TestCase):
+
+    def setUp(self) -> None:
+        self.client_mock = mock.Mock()
+        self.client_mock.get_related_artists.side_effect = lambda artist_id: [
+            self._create_artist(f"{artist_id}_{i}") for i in range(3)
+        ]
+        self.client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection() \
+            .add_track(self._create_track(f"{artist_id}_top_track_a", artist_id)) \
+            .add_track(self._create_track(f"{artist_id}_top_track_b", artist_id))
+        self.input_tracks_collection = TracksCollection() \
+            .add_track(self._create_track("input_track_a", "input_artist_a")) \
+            .add_track(self._create_track("input_track_b", "input_artist_b"))
+
+    def test_generate_multi_hop(self):
+        history = InMemoryTracksRepository()
+        history.save_tracks([TrackRecord(id="input_artist_a_0_top_track_a")])
+        generator = RandomWalkTraemplistGenerator(
+            client=self.client_mock,
+            history=history,
+            logger=mock.Mock(),
+            walk_length=3,
+            restart_probability=0,
+            rng=Random(1)
+        )
+        traemplist = generator.generate(
+            input_tracks_collection=self.input_tracks_collection,
+            size=10
+        )
+        self.assertEqual(len(traemplist), 10)
+        for track in traemplist.get_tracks():
+            self.assertEqual(track.artist.id.count("_"), 5, "every walk makes 3 hops")
+            self.assertNotEqual(track.id, "input_artist_a_0_top_track_a")
+        self.assertEqual(len({track.artist.id for track in traemplist.get_tracks()}), 10)
+        metrics = generator.get_metrics()
+        self.assertEqual(metrics.accepted_tracks_count, 10)
+        self.assertLessEqual(metrics.get_calls_count(), RandomWalkTraemplistGenerator.DEFAULT_MAX_CALLS_PER_TRACK * 10)
+
+    def test_generate_loads_every_artist_once(self):
+        generator = RandomWalkTraemplistGenerator(
+            client=self.client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock(),
+            walk_length=1,
+            rng=Random(1)
+        )
+        traemplist = generator.generate(
+            input_tracks_collection=self.input_tracks_collection,
+            size=100
+        )
+        self.assertEqual(len(traemplist), 6)
+        related_artists_calls = [
+            call.kwargs["artist_id"] for call in self.client_mock.get_related_artists.call_args_list
+        ]
+        top_tracks_calls = [call.kwargs["artist_id"] for call in self.client_mock.get_artist_top_tracks.call_args_list]
+        self.assertEqual(sorted(related_artists_calls), ["input_artist_a", "input_artist_b"])
+        self.assertEqual(len(top_tracks_calls), len(set(top_tracks_calls)))
+        self.assertEqual(generator.get_metrics().get_calls_count(), 8)
+
+    def test_generate_stops_at_calls_limit(self):
+        history_mock = mock.Mock()
+        history_mock.filter_unheard.return_value = []
+        generator = RandomWalkTraemplistGenerator(
+            client=self.client_mock,
+            history=history_mock,
+            logger=mock.Mock(),
+            max_calls_per_track=5
+        )
+        traemplist = generator.generate(
+            input_tracks_collection=self.input_tracks_collection,
+            size=2
+        )
+        self.assertEqual(len(traemplist), 0)
+        self.assertLess(
+            generator.get_metrics().get_calls_count(),
+            10 + RandomWalkTraemplistGenerator.DEFAULT_WALKS_PER_BATCH
+            * RandomWalkTraemplistGenerator.DEFAULT_WALK_LENGTH
+        )
+        self.assertIsNone(generator.get_metrics().get_calls_per_accepted_track())
+
+    def test_generate_with_seeded_rng(self):
+        traemplists = [
+            RandomWalkTraemplistGenerator(
+                client=self.client_mock,
+                history=InMemoryTracksRepository(),
+                logger=mock.Mock(),
+                rng=Random(7)
+            ).generate(
+                input_tracks_collection=self.input_tracks_collection,
+                size=5
+            )
+            for _ in range(2)
+        ]
+        self.assertEqual(traemplists[0].tracks_list, traemplists[1].tracks_list)
+
+    def test_generate_from_empty_input(self):
+        traemplist = RandomWalkTraemplistGenerator(
+            client=self.client_mock,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock()
+        ).generate(
+            input_tracks_collection=TracksCollection(),
+            size=10
+        )
+        self.assertEqual(len(traemplist), 0)
+        self.client_mock.get_related_artists.assert_not_called()
+
+    def test_invalid_parameters_error(self):
+        for parameters in [{"walk_length": 0}, {"restart_probability": 1}, {"walks_per_batch": 0}]:
+            with self.assertRaises(InvalidRandomWalkParametersError):
+                RandomWalkTraemplistGenerator(
+                    client=self.client_mock,
+                    history=InMemoryTracksRepository(),
+                    logger=mock.Mock(),
+                    **parameters
+                )
+
+    @staticmethod
+    def _create_artist(artist_id: str) -> Artist:
+        return Artist(id=artist_id, name=f"{artist_id}_name")
+
+    def _create_track(self, track_id: str, artist_id: str) -> Track:
+        return Track(id=track_id, name=f"{track_id}_name", artist=self._create_artist(artist_id))
+
+
+class SeededGenerationTest(TestCase):
+
+    GENERATION_SCRIPT = """
+import json
+from random import Random
+from unittest import mock
+from traemplist.client import TracksCollection, Track, Artist
+from traemplist.repository import InMemoryTracksRepository
+from traemplist.generator import TraemplistGenerator, RandomWalkTraemplistGenerator
+
+
+def create_input_tracks_collection():
+    input_tracks_collection = TracksCollection()
+    for i in range(60):
+        artist = Artist(id=f"input_artist_{i // 2}", name="input_artist")
+        input_tracks_collection.add_track(Track(id=f"input_track_{i}", name="input_track", artist=artist))
+    return input_tracks_collection
+
+
+client_mock = mock.Mock()
+client_mock.get_related_artists.side_effect = lambda artist_id: [
+    Artist(id=f"{artist_id}_{i}", name="related_artist") for i in range(4)
+]
+client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection().add_tracks(
+    TracksCollection()
+    .add_track(Track(id=f"{artist_id}_top_track_a", name="top_track", artist=Artist(artist_id, "related_artist")))
+    .add_track(Track(id=f"{artist_id}_top_track_b", name="top_track", artist=Artist(artist_id, "related_artist")))
+)
+traemplists = [
+    generator.generate(input_tracks_collection=create_input_tracks_collection(), size=10)
+    for generator in [
+        TraemplistGenerator(client_mock, InMemoryTracksRepository(), mock.Mock(), rng=Random(1)),
+        TraemplistGenerator(
+            client_mock, InMemoryTracksRepository(), mock.Mock(), use_candidate_reservoir=True, rng=Random(1)
+        ),
+        RandomWalkTraemplistGenerator(client_mock, InMemoryTracksRepository(), mock.Mock(), rng=Random(1))
+    ]
+]
+print(json.dumps([[track.id for track in traemplist.tracks_list] for traemplist in traemplists]))
+"""
+
+    def test_seeded_generation_does_not_depend_on_hash_seed(self):
+        outputs = {
+            subprocess.check_output(
+                [sys.executable, "-c", self.GENERATION_SCRIPT],
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                env=dict(os.environ, PYTHONHASHSEED=hash_seed)
+            )
+            for hash_seed in ["1", "2", "3"]
+        }
+        self.assertEqual(len(outputs), 1)
@@ -0,0 +1,177 @@
+import shutil
+from unittest import TestCase, SkipTest, mock
+from tempfile import mkdtemp
+from traemplist.client import TracksCollection, Track, Artist
+from traemplist.repository import InMemoryTracksRepository
+from traemplist.generator import TraemplistGenerator
+from traemplist.graph import ArtistGraph, SqLiteArtistGraph, InMemoryArtistGraph, ArtistGraphCrawler, \
+    ArtistGraphCrawlResult, InvalidCrawlDepthError, InvalidCrawlWorkersCountError, ArtistGraphFallbackProvider
+
+
+class ArtistGraphAbstractTest(TestCase):
+
+    def setUp(self) -> None:
+        if type(self) is ArtistGraphAbstractTest:
+            raise SkipTest
+        self.graph = self._get_graph()
+
+    def _get_graph(self) -> ArtistGraph:
+        raise NotImplementedError
+
+    def test_related_artists(self):
+        artist = _create_artist("a")
+        self.assertEqual(self.graph.get_related_artists("a"), [])
+        self.assertIsNone(self.graph.get_related_artists_updated_at("a"))
+        self.graph.save_related_artists(artist, [_create_artist("b"), _create_artist("c")])
+        self.graph.save_related_artists(artist, [_create_artist("c"), _create_artist("d")])
+        self.assertEqual(self.graph.get_related_artists("a"), [_create_artist("c"), _create_artist("d")])
+        self.assertIsNotNone(self.graph.get_related_artists_updated_at("a"))
+        self.assertIsNone(self.graph.get_related_artists_updated_at("c"))
+        self.assertEqual(self.graph.artists_count(), 4)
+
+    def test_artist_top_tracks(self):
+        artist = _create_artist("a")
+        self.assertEqual(self.graph.get_artist_top_tracks("a"), TracksCollection())
+        self.assertIsNone(self.graph.get_artist_top_tracks_updated_at("a"))
+        top_tracks = TracksCollection() \
+            .add_track(_create_track("a_1", artist)) \
+            .add_track(_create_track("b_1", _create_artist("b")))
+        self.graph.save_artist_top_tracks(artist, top_tracks)
+        saved_top_tracks = self.graph.get_artist_top_tracks("a")
+        self.assertEqual(saved_top_tracks, top_tracks)
+        self.assertEqual(
+            {(track.name, track.artist) for track in saved_top_tracks.get_tracks()},
+            {(track.name, track.artist) for track in top_tracks.get_tracks()}
+        )
+        self.assertIsNotNone(self.graph.get_artist_top_tracks_updated_at("a"))
+        self.assertEqual(self.graph.get_related_artists("a"), [])
+
+
+class SqLiteArtistGraphTest(ArtistGraphAbstractTest):
+
+    def setUp(self) -> None:
+        self.tmp_dir = mkdtemp()
+        super().setUp()
+
+    def tearDown(self) -> None:
+        self.graph.close()
+        shutil.rmtree(self.tmp_dir)
+
+    def _get_graph(self) -> SqLiteArtistGraph:
+        return SqLiteArtistGraph(self.tmp_dir + "/graph.db")
+
+
+class InMemoryArtistGraphTest(ArtistGraphAbstractTest):
+
+    def _get_graph(self) -> InMemoryArtistGraph:
+        return InMemoryArtistGraph()
+
+
+class ArtistGraphCrawlerTest(TestCase):
+
+    RELATED_ARTIST_IDS = {
+        "a": ["b", "c"],
+        "b": ["a", "d"],
+        "c": ["d"],
+        "d": ["e"]
+    }
+
+    def setUp(self) -> None:
+        self.client_mock = mock.Mock()
+        self.client_mock.get_related_artists.side_effect = lambda artist_id: [
+            _create_artist(related_artist_id) for related_artist_id in self.RELATED_ARTIST_IDS.get(artist_id, [])
+        ]
+        self.client_mock.get_artist_top_tracks.side_effect = lambda artist_id: TracksCollection().add_track(
+            _create_track(f"{artist_id}_top", _create_artist(artist_id))
+        )
+        self.graph = InMemoryArtistGraph()
+
+    def test_crawl_to_depth(self):
+        for workers_count in [1, 4]:
+            with self.subTest(workers_count=workers_count):
+                self.setUp()
+                result = ArtistGraphCrawler(
+                    client=self.client_mock,
+                    graph=self.graph,
+                    logger=mock.Mock(),
+                    workers_count=workers_count
+                ).crawl([_create_artist("a")], depth=2)
+                self.assertEqual(
+                    result,
+                    ArtistGraphCrawlResult(related_artists_fetched_count=3, top_tracks_fetched_count=4)
+                )
+                self.assertEqual(
+                    sorted(call.kwargs["artist_id"] for call in self.client_mock.get_related_artists.call_args_list),
+                    ["a", "b", "c"]
+                )
+                self.assertEqual(self.graph.get_related_artists("d"), [])
+                self.assertEqual(len(self.graph.get_artist_top_tracks("d")), 1)
+                self.assertEqual(len(self.graph.get_artist_top_tracks("e")), 0)
+
+    def test_crawl_skips_fresh_artists(self):
+        crawler = ArtistGraphCrawler(client=self.client_mock, graph=self.graph, logger=mock.Mock())
+        crawler.crawl([_create_artist("a")], depth=1)
+        self.client_mock.reset_mock()
+        self.assertEqual(
+            crawler.crawl([_create_artist("a")], depth=2),
+            ArtistGraphCrawlResult(related_artists_fetched_count=2, top_tracks_fetched_count=2)
+        )
+        self.client_mock.get_related_artists.assert_has_calls(
+            [mock.call(artist_id="b"), mock.call(artist_id="c")],
+            any_order=True
+        )
+
+    def test_generate_from_graph_without_network(self):
+        ArtistGraphCrawler(client=self.client_mock, graph=self.graph, logger=mock.Mock()).crawl(
+            [_create_artist("a")],
+            depth=1
+        )
+        traemplist = TraemplistGenerator(
+            client=self.graph,
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock()
+        ).generate(
+            input_tracks_collection=TracksCollection().add_track(_create_track("input", _create_artist("a"))),
+            size=1
+        )
+        self.assertEqual(len(traemplist), 1)
+        self.assertIn(next(iter(traemplist.get_tracks())).id, {"b_top", "c_top"})
+
+    def test_generate_falls_back_to_client_for_missing_artists(self):
+        self.graph.save_related_artists(_create_artist("x"), [_create_artist("y")])
+        self.graph.save_artist_top_tracks(_create_artist("y"), TracksCollection())
+        traemplist = TraemplistGenerator(
+            client=ArtistGraphFallbackProvider(graph=self.graph, client=self.client_mock),
+            history=InMemoryTracksRepository(),
+            logger=mock.Mock()
+        ).generate(
+            input_tracks_collection=TracksCollection().add_track(_create_track("input", _create_artist("a"))),
+            size=1
+        )
+        self.assertEqual(len(traemplist), 1)
+        self.assertIn(next(iter(traemplist.get_tracks())).id, {"b_top", "c_top"})
+        self.client_mock.get_related_artists.assert_called_once_with(artist_id="a")
+
+    def test_fallback_provider_prefers_graph(self):
+        self.graph.save_related_artists(_create_artist("a"), [_create_artist("z")])
+        self.graph.save_artist_top_tracks(_create_artist("a"), TracksCollection())
+        provider = ArtistGraphFallbackProvider(graph=self.graph, client=self.client_mock)
+        self.assertEqual(provider.get_related_artists("a"), [_create_artist("z")])
+        self.assertEqual(len(provider.get_artist_top_tracks("a")), 0)
+        self.assertEqual(len(provider.get_artist_top_tracks("b")), 1)
+        self.client_mock.get_related_artists.assert_not_called()
+        self.client_mock.get_artist_top_tracks.assert_called_once_with(artist_id="b")
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(InvalidCrawlWorkersCountError):
+            ArtistGraphCrawler(client=self.client_mock, graph=self.graph, logger=mock.Mock(), workers_count=0)
+        with self.assertRaises(InvalidCrawlDepthError):
+            ArtistGraphCrawler(client=self.client_mock, graph=self.graph, logger=mock.Mock()).crawl([], depth=0)
+
+
+def _create_artist(artist_id: str) -> Artist:
+    return Artist(id=artist_id, name=f"{artist_id}_name")
+
+
+def _create_track(track_id: str, artist: Artist) -> Track:
+    return Track(id=track_id, name=f"{track_id}_name", artist=artist)
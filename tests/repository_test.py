@@ -1,19 +1,31 @@
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from unittest import TestCase, SkipTest
 from tempfile import mkdtemp
-from traemplist.repository import TrackRecord, TracksRepository, SqLiteTracksRepository, InMemoryTracksRepository
+from traemplist.repository import TrackRecord, SaveTracksResult, TracksRepository, SqLiteTracksRepository, InMemoryTracksRepository, \
+    LikedTrackRecord
 
 
 class TracksRepositoryAbstractTest(TestCase):
 
     def setUp(self) -> None:
-        if isinstance(self, TracksRepositoryAbstractTest):
+        if type(self) is TracksRepositoryAbstractTest:
             raise SkipTest
         self.repository = self._get_repository()
 
     def _get_repository(self) -> TracksRepository:
         raise NotImplementedError
 
+    @staticmethod
+    def _create_liked_track_record(track_id: str, added_at: str) -> LikedTrackRecord:
+        return LikedTrackRecord(
+            id=track_id,
+            name=f"{track_id} name",
+            artist_id=f"{track_id} artist_id",
+            artist_name=f"{track_id} artist_name",
+            added_at=added_at
+        )
+
     def test_save_and_contains(self):
         track_a = TrackRecord(id="a")
         track_b = TrackRecord(id="b")
@@ -30,6 +42,84 @@ class TracksRepositoryAbstractTest(TestCase):
         self.assertTrue(self.repository.contains_track(track_id=track_a.id))
 
 
+    def test_save_tracks_result(self):
+        self.assertEqual(
+            self.repository.save_tracks(TrackRecord(id=str(i)) for i in range(10)),
+            SaveTracksResult(inserted_count=10, existing_count=0)
+        )
+        self.assertEqual(
+            self.repository.save_tracks(TrackRecord(id=str(i)) for i in range(5, 15)),
+            SaveTracksResult(inserted_count=5, existing_count=5)
+        )
+        self.assertEqual(
+            self.repository.save_tracks([]),
+            SaveTracksResult(inserted_count=0, existing_count=0)
+        )
+        self.assertEqual(self.repository.tracks_total_count(), 15)
+
+    def test_save_tracks_escaping(self):
+        track_id = "it's'); DROP TABLE tracks; --"
+        self.repository.save_tracks([TrackRecord(id=track_id)])
+        self.assertTrue(self.repository.contains_track(track_id))
+        self.assertEqual(self.repository.filter_unheard([track_id, "other"]), ["other"])
+
+    def test_recently_played_cursor(self):
+        self.assertIsNone(self.repository.get_recently_played_cursor())
+        self.repository.save_recently_played_cursor(1617000000000)
+        self.repository.save_recently_played_cursor(1618000000000)
+        self.assertEqual(self.repository.get_recently_played_cursor(), 1618000000000)
+
+    def test_playlist_snapshot_id(self):
+        self.assertIsNone(self.repository.get_playlist_snapshot_id("playlist"))
+        self.repository.save_playlist_snapshot_id("playlist", "snapshot_1")
+        self.repository.save_playlist_snapshot_id("playlist", "snapshot_2")
+        self.assertEqual(self.repository.get_playlist_snapshot_id("playlist"), "snapshot_2")
+        self.assertIsNone(self.repository.get_playlist_snapshot_id("other_playlist"))
+
+    def test_liked_tracks_mirror(self):
+        self.assertEqual(self.repository.get_liked_tracks(), [])
+        self.repository.save_liked_tracks([
+            self._create_liked_track_record("a", "2021-01-01T00:00:00Z"),
+            self._create_liked_track_record("b", "2021-01-02T00:00:00Z")
+        ])
+        self.repository.save_liked_tracks([
+            self._create_liked_track_record("c", "2021-01-03T00:00:00Z"),
+            self._create_liked_track_record("a", "2021-01-04T00:00:00Z")
+        ])
+        self.assertEqual(
+            [track.id for track in self.repository.get_liked_tracks()],
+            ["a", "c", "b"]
+        )
+        self.assertTrue(self.repository.contains_liked_track("a", "2021-01-04T00:00:00Z"))
+        self.assertFalse(self.repository.contains_liked_track("a", "2021-01-01T00:00:00Z"))
+        self.assertFalse(self.repository.contains_liked_track("d", "2021-01-01T00:00:00Z"))
+        self.repository.replace_liked_tracks([self._create_liked_track_record("d", "2021-01-05T00:00:00Z")])
+        self.assertEqual(
+            self.repository.get_liked_tracks(),
+            [self._create_liked_track_record("d", "2021-01-05T00:00:00Z")]
+        )
+
+    def test_liked_tracks_reconciled_at(self):
+        self.assertIsNone(self.repository.get_liked_tracks_reconciled_at())
+        self.repository.save_liked_tracks_reconciled_at(1617000000.5)
+        self.assertEqual(self.repository.get_liked_tracks_reconciled_at(), 1617000000.5)
+
+    def test_filter_unheard(self):
+        self.repository.save_tracks([TrackRecord(id="a"), TrackRecord(id="c")])
+        self.assertEqual(
+            self.repository.filter_unheard(["a", "b", "c", "d"]),
+            ["b", "d"]
+        )
+        self.assertEqual(self.repository.filter_unheard([]), [])
+
+    def test_filter_unheard_many_tracks(self):
+        self.repository.save_tracks([TrackRecord(id=str(i)) for i in range(0, 2000, 2)])
+        self.assertEqual(
+            self.repository.filter_unheard([str(i) for i in range(2000)]),
+            [str(i) for i in range(1, 2000, 2)]
+        )
+
+
 class SqLiteTracksRepositoryTest(TracksRepositoryAbstractTest):
 
     def setUp(self) -> None:
@@ -37,13 +127,47 @@ class SqLiteTracksRepositoryTest(TracksRepositoryAbstractTest):
         super().setUp()
 
     def tearDown(self) -> None:
+        self.repository.close()
         shutil.rmtree(self.tmp_dir)
 
     def _get_repository(self) -> SqLiteTracksRepository:
         return SqLiteTracksRepository(self.tmp_dir + "/test.db")
 
+    def test_save_tracks_in_chunks(self):
+        self.repository.SAVE_TRACKS_CHUNK_SIZE = 3
+        self.assertEqual(
+            self.repository.save_tracks(TrackRecord(id=str(i % 8)) for i in range(10)),
+            SaveTracksResult(inserted_count=8, existing_count=2)
+        )
+        self.assertEqual(self.repository.tracks_total_count(), 8)
+
+    def test_wal_journal_mode(self):
+        connection = self.repository._get_connection()
+        self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertIs(self.repository._get_connection(), connection)
+
+    def test_concurrent_threads_access(self):
+        self.repository.save_tracks([TrackRecord(id=str(i)) for i in range(100)])
+
+        def save_and_read(i: int) -> bool:
+            self.repository.save_tracks([TrackRecord(id=f"thread_{i}")])
+            return self.repository.contains_track(f"thread_{i}") and self.repository.contains_track(str(i))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertTrue(all(executor.map(save_and_read, range(50))))
+        self.assertEqual(self.repository.tracks_total_count(), 150)
+        self.assertLessEqual(self.repository.connections.count(), 9)
+
 
 class InMemoryTracksRepositoryTest(TracksRepositoryAbstractTest):
 
     def _get_repository(self) -> InMemoryTracksRepository:
         return InMemoryTracksRepository()
+
+    def test_insertion_order_kept(self):
+        self.repository.save_tracks([TrackRecord(id="c"), TrackRecord(id="a")])
+        self.repository.save_tracks([TrackRecord(id="b"), TrackRecord(id="c")])
+        self.assertEqual(
+            list(self.repository.tracks.values()),
+            [TrackRecord(id="c"), TrackRecord(id="a"), TrackRecord(id="b")]
+        )
@@ -0,0 +1,93 @@
+from unittest import TestCase, mock
+
+from traemplist.config import TraemplistConfig, AccountConfig, AccountCredentialsConfig, PlaylistConfig
+from traemplist.logger import Logger, BufferedLogger
+from traemplist.runner import AccountsRunner, AccountRunResult, InvalidConcurrencyError
+
+
+class AccountsRunnerTest(TestCase):
+
+    def setUp(self) -> None:
+        self.config_mock = mock.Mock()
+        self.config_mock.get_traemplist_configs.return_value = [
+            self._create_traemplist_config("account_a"),
+            self._create_traemplist_config("account_b"),
+            self._create_traemplist_config("account_c")
+        ]
+        self.logger_mock = mock.Mock()
+
+    def test_run_success(self):
+        def account_job(traemplist_config: TraemplistConfig, account_logger: Logger):
+            account_logger.log_info(f"processing {traemplist_config.traemplist_id}")
+
+        results = AccountsRunner(
+            config=self.config_mock,
+            logger=self.logger_mock,
+            concurrency=2
+        ).run(account_job)
+        self.assertEqual(
+            results,
+            [
+                AccountRunResult(client_id="account_a", error=None),
+                AccountRunResult(client_id="account_b", error=None),
+                AccountRunResult(client_id="account_c", error=None)
+            ]
+        )
+        self.logger_mock.log_info.assert_has_calls([
+            mock.call("[account_a] processing account_a_traemplist"),
+            mock.call("[account_b] processing account_b_traemplist"),
+            mock.call("[account_c] processing account_c_traemplist")
+        ], any_order=True)
+        self.logger_mock.log_error.assert_not_called()
+
+    def test_run_with_failed_account(self):
+        error = RuntimeError("error")
+
+        def account_job(traemplist_config: TraemplistConfig, account_logger: Logger):
+            if traemplist_config.account.credentials.client_id == "account_b":
+                raise error
+
+        results = AccountsRunner(
+            config=self.config_mock,
+            logger=self.logger_mock,
+            concurrency=3
+        ).run(account_job)
+        self.assertEqual(
+            [result.is_failed() for result in results],
+            [False, True, False]
+        )
+        self.assertIs(results[1].error, error)
+        self.logger_mock.log_error.assert_called_with("Failed accounts: account_b")
+
+    def test_invalid_concurrency_error(self):
+        with self.assertRaises(InvalidConcurrencyError):
+            AccountsRunner(config=self.config_mock, logger=self.logger_mock, concurrency=0)
+
+    @staticmethod
+    def _create_traemplist_config(client_id: str) -> TraemplistConfig:
+        return TraemplistConfig(
+            account=AccountConfig(
+                credentials=AccountCredentialsConfig(
+                    client_id=client_id,
+                    client_secret="client_secret",
+                    refresh_token="refresh_token"
+                ),
+                playlists=[PlaylistConfig(id="playlist_id")]
+            ),
+            traemplist_songs_count=10,
+            traemplist_id=f"{client_id}_traemplist"
+        )
+
+
+class BufferedLoggerTest(TestCase):
+
+    def test_flush(self):
+        buffered_logger = BufferedLogger()
+        buffered_logger.log_info("info")
+        buffered_logger.log_error("error")
+        logger_mock = mock.Mock()
+        buffered_logger.flush(logger_mock, prefix="> ")
+        logger_mock.log_info.assert_called_once_with("> info")
+        logger_mock.log_error.assert_called_once_with("> error")
+        buffered_logger.flush(logger_mock)
+        logger_mock.log_info.assert_called_once()
@@ -0,0 +1,107 @@
+import time
+from threading import Thread, Event
+from unittest import TestCase, mock
+from spotipy.client import SpotifyException
+from traemplist.scheduler import SpotifyRequestScheduler, InvalidRateError
+
+
+class SpotifyRequestSchedulerTest(TestCase):
+
+    def test_execute_success(self):
+        scheduler = SpotifyRequestScheduler()
+        self.assertEqual(scheduler.execute(lambda: "response"), "response")
+        self.assertEqual(scheduler.get_queue_depth(), 0)
+
+    def test_rate_limit(self):
+        scheduler = SpotifyRequestScheduler(rate=100, burst=1)
+        started_at = time.monotonic()
+        for _ in range(11):
+            scheduler.execute(lambda: None)
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.09)
+
+    def test_retry_after_throttling(self):
+        scheduler = SpotifyRequestScheduler()
+        request = mock.Mock(side_effect=[
+            SpotifyException(429, -1, "throttled", headers={"Retry-After": "0.05"}),
+            "response"
+        ])
+        started_at = time.monotonic()
+        self.assertEqual(scheduler.execute(request), "response")
+        self.assertGreaterEqual(time.monotonic() - started_at, 0.05)
+        self.assertEqual(scheduler.get_throttled_count(), 1)
+        self.assertEqual(scheduler.get_retries_count(), 1)
+
+    def test_server_error_backoff(self):
+        scheduler = SpotifyRequestScheduler(backoff_base=0.01)
+        request = mock.Mock(side_effect=[
+            SpotifyException(503, -1, "unavailable"),
+            SpotifyException(502, -1, "bad gateway"),
+            "response"
+        ])
+        with mock.patch("traemplist.scheduler.time.sleep") as sleep_mock:
+            self.assertEqual(scheduler.execute(request), "response")
+        self.assertEqual(sleep_mock.call_count, 2)
+        self.assertLessEqual(sleep_mock.call_args_list[0].args[0], 0.01)
+        self.assertLessEqual(sleep_mock.call_args_list[1].args[0], 0.02)
+        self.assertEqual(scheduler.get_throttled_count(), 0)
+        self.assertEqual(scheduler.get_retries_count(), 2)
+
+    def test_not_retried_errors(self):
+        scheduler = SpotifyRequestScheduler(max_retries=2, backoff_base=0)
+        with self.subTest("Client error"):
+            request = mock.Mock(side_effect=SpotifyException(404, -1, "not found"))
+            with self.assertRaises(SpotifyException):
+                scheduler.execute(request)
+            request.assert_called_once()
+        with self.subTest("Retries exhausted"):
+            request = mock.Mock(side_effect=SpotifyException(500, -1, "error"))
+            with self.assertRaises(SpotifyException):
+                scheduler.execute(request)
+            self.assertEqual(request.call_count, 3)
+        self.assertEqual(scheduler.get_queue_depth(), 0)
+
+    def test_server_errors_not_retried_without_retry_server_errors(self):
+        scheduler = SpotifyRequestScheduler(backoff_base=0)
+        with self.subTest("Server error"):
+            request = mock.Mock(side_effect=[SpotifyException(502, -1, "bad gateway"), "response"])
+            with self.assertRaises(SpotifyException):
+                scheduler.execute(request, retry_server_errors=False)
+            request.assert_called_once()
+        with self.subTest("Throttled"):
+            request = mock.Mock(side_effect=[
+                SpotifyException(429, -1, "throttled", headers={"Retry-After": "0"}),
+                "response"
+            ])
+            self.assertEqual(scheduler.execute(request, retry_server_errors=False), "response")
+            self.assertEqual(request.call_count, 2)
+
+    def test_write_requests_prioritized(self):
+        scheduler = SpotifyRequestScheduler(rate=20, burst=1)
+        scheduler.execute(lambda: None)
+        executed = []
+        readers_started = Event()
+
+        def read(i: int):
+            readers_started.set()
+            scheduler.execute(lambda: executed.append(f"read_{i}"))
+
+        readers = [Thread(target=read, args=(i,)) for i in range(3)]
+        for reader in readers:
+            reader.start()
+        readers_started.wait()
+        while scheduler.get_queue_depth() < 3:
+            time.sleep(0.001)
+        writer = Thread(
+            target=lambda: scheduler.execute(
+                lambda: executed.append("write"),
+                priority=SpotifyRequestScheduler.WRITE_PRIORITY
+            )
+        )
+        writer.start()
+        for thread in readers + [writer]:
+            thread.join()
+        self.assertLessEqual(executed.index("write"), 1)
+
+    def test_invalid_rate_error(self):
+        with self.assertRaises(InvalidRateError):
+            SpotifyRequestScheduler(rate=0)
@@ -1,9 +1,13 @@
+import time
 from unittest import TestCase, mock
 
 from traemplist.config import TraemplistConfig, AccountConfig, AccountCredentialsConfig, PlaylistConfig, Config
-from traemplist.client import TracksCollection, Track, Artist, Playlist
-from traemplist.repository import TrackRecord
-from traemplist.service import TracksHistoryService, TraemplistGeneratorService
+from traemplist.client import TracksCollection, Track, Artist, Playlist, RecentlyPlayedTracks, \
+    PlaylistSnapshot, LikedTrack, IndexedTracksCollection, SpotifyClient
+from traemplist.repository import TrackRecord, InMemoryTracksRepository, SaveTracksResult
+from traemplist.service import TracksHistoryService, TraemplistGeneratorService, LikedTracksService, \
+    ArtistGraphService
+from traemplist.writer import TracksWriter
 
 
 class TracksHistoryServiceTest(TestCase):
@@ -18,32 +22,77 @@ class TracksHistoryServiceTest(TestCase):
         )
 
     def test_save_recently_played_tracks_success(self):
-        recently_played_tracks = TracksCollection()
+        recently_played_tracks = RecentlyPlayedTracks(cursor=2000)
         recently_played_tracks.add_track(self._create_test_track("test_track"))
+        self.tracks_repository_mock.get_recently_played_cursor.return_value = 1000
         self.spotify_client_mock.get_recently_played_tracks.return_value = recently_played_tracks
         self.tracks_history_service.save_recently_played_tracks()
+        self.spotify_client_mock.get_recently_played_tracks.assert_called_once_with(after=1000)
         self.tracks_repository_mock.save_tracks.assert_called_once_with(
             [TrackRecord(id=track.id) for track in recently_played_tracks.get_tracks()]
         )
+        self.tracks_repository_mock.save_recently_played_cursor.assert_called_once_with(2000)
+
+    def test_save_recently_played_tracks_without_new_plays(self):
+        self.tracks_repository_mock.get_recently_played_cursor.return_value = None
+        self.spotify_client_mock.get_recently_played_tracks.return_value = RecentlyPlayedTracks()
+        self.tracks_history_service.save_recently_played_tracks()
+        self.spotify_client_mock.get_recently_played_tracks.assert_called_once_with(after=None)
+        self.tracks_repository_mock.save_recently_played_cursor.assert_not_called()
 
     def test_save_all_user_playlists_tracks_success(self):
-        self.spotify_client_mock.get_user_playlist_ids.return_value = ["10", "20"]
-        playlist_a = Playlist(playlist_id="a", name="playlist A").add_track(self._create_test_track("test_track_a"))
-        playlist_b = Playlist(playlist_id="b", name="playlist B").add_track(self._create_test_track("test_track_b"))
-        self.spotify_client_mock.get_playlist.side_effect = [playlist_a, playlist_b]
+        self.spotify_client_mock.get_user_playlist_snapshots.return_value = [
+            PlaylistSnapshot(id="10", snapshot_id="s10"),
+            PlaylistSnapshot(id="20", snapshot_id=None)
+        ]
+        self.tracks_repository_mock.get_playlist_snapshot_id.return_value = None
+        self.tracks_repository_mock.save_tracks.return_value = SaveTracksResult(inserted_count=1, existing_count=0)
+        self.spotify_client_mock.get_playlist_tracks.side_effect = lambda playlist_id: iter([
+            self._create_test_track(f"test_track_{playlist_id}")
+        ])
         self.tracks_history_service.save_all_user_playlists_tracks()
         self.tracks_repository_mock.save_tracks.assert_has_calls([
-            mock.call(
-                [TrackRecord(id=track.id) for track in playlist_a.get_tracks()]
-            ),
-            mock.call(
-                [TrackRecord(id=track.id) for track in playlist_b.get_tracks()]
-            )
+            mock.call([TrackRecord(id="test_track_10")]),
+            mock.call([TrackRecord(id="test_track_20")])
         ])
-        self.spotify_client_mock.get_playlist.assert_has_calls([
+        self.spotify_client_mock.get_playlist_tracks.assert_has_calls([
             mock.call("10"),
             mock.call("20")
         ])
+        self.tracks_repository_mock.save_playlist_snapshot_id.assert_called_once_with("10", "s10")
+
+    def test_save_all_user_playlists_tracks_in_batches(self):
+        repository = InMemoryTracksRepository()
+        tracks_history_service = TracksHistoryService(
+            client=self.spotify_client_mock,
+            repository=repository,
+            logger=mock.Mock()
+        )
+        tracks_count = TracksWriter.DEFAULT_BATCH_SIZE * 2 + 1
+        self.spotify_client_mock.get_user_playlist_snapshots.return_value = [
+            PlaylistSnapshot(id="10", snapshot_id="s10")
+        ]
+        self.spotify_client_mock.get_playlist_tracks.return_value = (
+            self._create_test_track(f"test_track_{i}") for i in range(tracks_count)
+        )
+        tracks_history_service.save_all_user_playlists_tracks()
+        self.assertEqual(repository.tracks_total_count(), tracks_count)
+        self.assertEqual(repository.get_playlist_snapshot_id("10"), "s10")
+
+    def test_save_all_user_playlists_tracks_skips_unchanged_playlists(self):
+        self.spotify_client_mock.get_user_playlist_snapshots.return_value = [
+            PlaylistSnapshot(id="10", snapshot_id="s10"),
+            PlaylistSnapshot(id="20", snapshot_id="s20_new")
+        ]
+        self.tracks_repository_mock.get_playlist_snapshot_id.side_effect = lambda playlist_id: {
+            "10": "s10",
+            "20": "s20_old"
+        }[playlist_id]
+        self.tracks_repository_mock.save_tracks.return_value = SaveTracksResult(inserted_count=0, existing_count=0)
+        self.spotify_client_mock.get_playlist_tracks.return_value = iter([])
+        self.tracks_history_service.save_all_user_playlists_tracks()
+        self.spotify_client_mock.get_playlist_tracks.assert_called_once_with("20")
+        self.tracks_repository_mock.save_playlist_snapshot_id.assert_called_once_with("20", "s20_new")
 
     @staticmethod
     def _create_test_track(track_id: str) -> Track:
@@ -57,6 +106,78 @@ class TracksHistoryServiceTest(TestCase):
         )
 
 
+class LikedTracksServiceTest(TestCase):
+
+    def setUp(self) -> None:
+        self.spotify_client_mock = mock.Mock()
+        self.repository = InMemoryTracksRepository()
+        self.liked_tracks_service = LikedTracksService(
+            client=self.spotify_client_mock,
+            repository=self.repository,
+            logger=mock.Mock(),
+            reconcile_interval=3600
+        )
+
+    def test_first_sync_reconciles(self):
+        self.spotify_client_mock.get_user_liked_track_items.return_value = iter([
+            self._create_liked_track("b", "2021-01-02T00:00:00Z"),
+            self._create_liked_track("a", "2021-01-01T00:00:00Z")
+        ])
+        self.assertEqual(
+            self.liked_tracks_service.get_liked_tracks(),
+            TracksCollection().add_track(self._create_test_track("a")).add_track(self._create_test_track("b"))
+        )
+        self.assertIsNotNone(self.repository.get_liked_tracks_reconciled_at())
+
+    def test_delta_sync_stops_at_first_known_track(self):
+        self.repository.save_liked_tracks_reconciled_at(time.time())
+        self.repository.save_liked_tracks([
+            LikedTracksService._liked_track_to_record(self._create_liked_track("a", "2021-01-01T00:00:00Z"))
+        ])
+        consumed_track_ids = []
+
+        def liked_track_items():
+            for liked_track in [
+                self._create_liked_track("c", "2021-01-03T00:00:00Z"),
+                self._create_liked_track("b", "2021-01-02T00:00:00Z"),
+                self._create_liked_track("a", "2021-01-01T00:00:00Z"),
+                self._create_liked_track("z", "2020-01-01T00:00:00Z")
+            ]:
+                consumed_track_ids.append(liked_track.track.id)
+                yield liked_track
+
+        self.spotify_client_mock.get_user_liked_track_items.side_effect = liked_track_items
+        self.liked_tracks_service.sync_liked_tracks()
+        self.assertEqual(consumed_track_ids, ["c", "b", "a"])
+        self.assertEqual([track.id for track in self.repository.get_liked_tracks()], ["c", "b", "a"])
+
+    def test_reconcile_drops_unliked_tracks(self):
+        self.repository.save_liked_tracks_reconciled_at(time.time() - 7200)
+        self.repository.save_liked_tracks([
+            LikedTracksService._liked_track_to_record(self._create_liked_track("a", "2021-01-01T00:00:00Z")),
+            LikedTracksService._liked_track_to_record(self._create_liked_track("b", "2021-01-02T00:00:00Z"))
+        ])
+        self.spotify_client_mock.get_user_liked_track_items.return_value = iter([
+            self._create_liked_track("a", "2021-01-01T00:00:00Z")
+        ])
+        self.liked_tracks_service.sync_liked_tracks()
+        self.assertEqual([track.id for track in self.repository.get_liked_tracks()], ["a"])
+
+    def _create_liked_track(self, track_id: str, added_at: str) -> LikedTrack:
+        return LikedTrack(track=self._create_test_track(track_id), added_at=added_at)
+
+    @staticmethod
+    def _create_test_track(track_id: str) -> Track:
+        return Track(
+            id=track_id,
+            name=f"{track_id} name",
+            artist=Artist(
+                id=f"{track_id} artist_id",
+                name=f"{track_id} artist_name"
+            )
+        )
+
+
 class TraemplistGeneratorServiceTest(TestCase):
 
     def setUp(self) -> None:
@@ -101,6 +222,67 @@ class TraemplistGeneratorServiceTest(TestCase):
             new_track_ids=["playlist_track"]
         )
 
+    def test_generate_and_save_unchanged_traemplist_skips_upload(self):
+        traemplist = IndexedTracksCollection()
+        for i in [3, 1, 2]:
+            traemplist.add_track(self._create_test_track(f"traemplist_track_{i}"))
+        self.traemplist_generator_mock.generate.return_value = traemplist
+        with mock.patch("traemplist.client.Spotify") as spotify_mock:
+            spotify_instance_mock = mock.Mock()
+            spotify_mock.return_value = spotify_instance_mock
+            spotify_instance_mock.current_user_saved_tracks.return_value = {"items": []}
+            spotify_instance_mock.playlist_items.return_value = {
+                "total": 3,
+                "items": [
+                    {"track": {"id": track.id, "name": track.name, "artists": [{"id": "a", "name": "a"}]}}
+                    for track in traemplist.tracks_list
+                ]
+            }
+            access_token_provider_mock = mock.Mock()
+            access_token_provider_mock.get_access_token.return_value = "access_token"
+            TraemplistGeneratorService(
+                config=TraemplistConfig(
+                    account=AccountConfig(
+                        credentials=self.account_credentials,
+                        playlists=[
+                            PlaylistConfig(id=Config.LIKED_SONGS_PLAYLIST_ID)
+                        ]
+                    ),
+                    traemplist_songs_count=3,
+                    traemplist_id="traemplist_id"
+                ),
+                client=SpotifyClient(access_token_provider=access_token_provider_mock),
+                generator=self.traemplist_generator_mock,
+                logger=mock.Mock()
+            ).generate_and_save_traemplist()
+            spotify_instance_mock.playlist_replace_items.assert_not_called()
+            spotify_instance_mock.playlist_add_items.assert_not_called()
+
+    def test_generate_and_save_empty_traemplist_skips_upload(self):
+        self.spotify_client_mock.get_playlist.return_value = Playlist(
+            playlist_id="playlist_id",
+            name="playlist_name"
+        ).add_track(self._create_test_track("playlist_track"))
+        self.traemplist_generator_mock.generate.return_value = TracksCollection()
+        logger_mock = mock.Mock()
+        TraemplistGeneratorService(
+            config=TraemplistConfig(
+                account=AccountConfig(
+                    credentials=self.account_credentials,
+                    playlists=[
+                        PlaylistConfig(id="playlist_id")
+                    ]
+                ),
+                traemplist_songs_count=2,
+                traemplist_id="traemplist_id"
+            ),
+            client=self.spotify_client_mock,
+            generator=self.traemplist_generator_mock,
+            logger=logger_mock
+        ).generate_and_save_traemplist()
+        self.spotify_client_mock.replace_playlist_tracks.assert_not_called()
+        logger_mock.log_error.assert_called_once()
+
     def test_generate_and_save_traemplist_from_liked_songs(self):
         playlist_track = self._create_test_track("playlist_track")
         self.spotify_client_mock.get_user_liked_tracks.return_value = Playlist(
@@ -134,6 +316,33 @@ class TraemplistGeneratorServiceTest(TestCase):
             new_track_ids=["playlist_track"]
         )
 
+    def test_generate_and_save_traemplist_from_liked_tracks_mirror(self):
+        liked_track = self._create_test_track("liked_track")
+        liked_tracks_service_mock = mock.Mock()
+        liked_tracks_service_mock.get_liked_tracks.return_value = TracksCollection().add_track(liked_track)
+        self.traemplist_generator_mock.generate.return_value = TracksCollection().add_track(liked_track)
+        TraemplistGeneratorService(
+            config=TraemplistConfig(
+                account=AccountConfig(
+                    credentials=self.account_credentials,
+                    playlists=[
+                        PlaylistConfig(id=Config.LIKED_SONGS_PLAYLIST_ID)
+                    ]
+                ),
+                traemplist_songs_count=2,
+                traemplist_id="traemplist_id"
+            ),
+            client=self.spotify_client_mock,
+            generator=self.traemplist_generator_mock,
+            logger=mock.Mock(),
+            liked_tracks_service=liked_tracks_service_mock
+        ).generate_and_save_traemplist()
+        self.traemplist_generator_mock.generate.assert_called_once_with(
+            input_tracks_collection=TracksCollection().add_track(liked_track),
+            size=2
+        )
+        self.spotify_client_mock.get_user_liked_tracks.assert_not_called()
+
     @staticmethod
     def _create_test_track(track_id: str) -> Track:
         return Track(
@@ -144,3 +353,32 @@ class TraemplistGeneratorServiceTest(TestCase):
                 name=f"{track_id} artist_name"
             )
         )
+
+
+class ArtistGraphServiceTest(TestCase):
+
+    def test_crawl_input_artists(self):
+        spotify_client_mock = mock.Mock()
+        crawler_mock = mock.Mock()
+        artist = Artist(id="artist_id", name="artist_name")
+        spotify_client_mock.get_playlist.return_value = Playlist(playlist_id="playlist_id", name="playlist") \
+            .add_track(Track(id="track_a", name="track_a", artist=artist)) \
+            .add_track(Track(id="track_b", name="track_b", artist=artist))
+        ArtistGraphService(
+            config=TraemplistConfig(
+                account=AccountConfig(
+                    credentials=AccountCredentialsConfig(
+                        client_id="client_id",
+                        client_secret="client_secret",
+                        refresh_token="refresh_token"
+                    ),
+                    playlists=[PlaylistConfig(id="playlist_id")]
+                ),
+                traemplist_songs_count=2,
+                traemplist_id="traemplist_id"
+            ),
+            client=spotify_client_mock,
+            crawler=crawler_mock,
+            logger=mock.Mock()
+        ).crawl_input_artists(depth=2)
+        crawler_mock.crawl.assert_called_once_with([artist], depth=2)
@@ -0,0 +1,71 @@
+from threading import get_ident
+from unittest import TestCase, mock
+
+from traemplist.repository import TrackRecord, SaveTracksResult, InMemoryTracksRepository
+from traemplist.writer import TracksWriter, InvalidBufferSizeError
+
+
+class TracksWriterTest(TestCase):
+
+    def test_write_in_batches(self):
+        repository = InMemoryTracksRepository()
+        repository.save_tracks([TrackRecord(id="track_0")])
+        on_written_mock = mock.Mock()
+        with TracksWriter(repository, batch_size=2, queue_size=1) as tracks_writer:
+            tracks_writer.write(
+                (TrackRecord(id=f"track_{i}") for i in range(5)),
+                on_written=on_written_mock
+            )
+        self.assertEqual(repository.tracks_total_count(), 5)
+        on_written_mock.assert_called_once_with(SaveTracksResult(inserted_count=4, existing_count=1))
+
+    def test_write_from_single_thread_in_order(self):
+        repository_mock = mock.Mock()
+        saved_batches = []
+        writer_thread_ids = set()
+
+        def save_tracks(tracks):
+            writer_thread_ids.add(get_ident())
+            saved_batches.append([track.id for track in tracks])
+            return SaveTracksResult(inserted_count=len(tracks), existing_count=0)
+
+        repository_mock.save_tracks.side_effect = save_tracks
+        written_results = []
+        with TracksWriter(repository_mock, batch_size=2) as tracks_writer:
+            tracks_writer.write(
+                [TrackRecord(id="a"), TrackRecord(id="b"), TrackRecord(id="c")],
+                on_written=written_results.append
+            )
+            tracks_writer.write([TrackRecord(id="d")], on_written=written_results.append)
+            tracks_writer.write([], on_written=written_results.append)
+        self.assertEqual(saved_batches, [["a", "b"], ["c"], ["d"]])
+        self.assertEqual(len(writer_thread_ids), 1)
+        self.assertNotIn(get_ident(), writer_thread_ids)
+        self.assertEqual(
+            written_results,
+            [
+                SaveTracksResult(inserted_count=3, existing_count=0),
+                SaveTracksResult(inserted_count=1, existing_count=0),
+                SaveTracksResult(inserted_count=0, existing_count=0)
+            ]
+        )
+
+    def test_write_error(self):
+        repository_mock = mock.Mock()
+        error = RuntimeError("error")
+        repository_mock.save_tracks.side_effect = error
+        on_written_mock = mock.Mock()
+        with self.assertRaises(RuntimeError) as context:
+            with TracksWriter(repository_mock, batch_size=1, queue_size=1) as tracks_writer:
+                tracks_writer.write(
+                    (TrackRecord(id=f"track_{i}") for i in range(100)),
+                    on_written=on_written_mock
+                )
+        self.assertIs(context.exception, error)
+        on_written_mock.assert_not_called()
+
+    def test_invalid_buffer_size_error(self):
+        with self.assertRaises(InvalidBufferSizeError):
+            TracksWriter(InMemoryTracksRepository(), batch_size=0)
+        with self.assertRaises(InvalidBufferSizeError):
+            TracksWriter(InMemoryTracksRepository(), queue_size=0)
@@ -0,0 +1,349 @@
+import base64
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Optional, Tuple, Dict
+
+from traemplist.config import AccountCredentialsConfig
+from traemplist.logger import Logger
+from traemplist.sqlite import SqLiteConnections
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+
+class ResponseCache(ABC):
+
+    def __init__(self):
+        self.hits_count = 0
+        self.misses_count = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[object]:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: object, ttl: int) -> None:
+        pass
+
+    @abstractmethod
+    def entries_count(self) -> int:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def get_hits_count(self) -> int:
+        return self.hits_count
+
+    def get_misses_count(self) -> int:
+        return self.misses_count
+
+    def _count_lookup(self, value: Optional[object]) -> Optional[object]:
+        if value is None:
+            self.misses_count += 1
+        else:
+            self.hits_count += 1
+        return value
+
+
+class SqLiteResponseCache(ResponseCache):
+    """
+    Reads don't write: the access times of hits are kept in memory and stored in batches of ACCESSES_BATCH_SIZE,
+    before the least recently used entries are evicted and on close(). The entries are counted in memory, so set()
+    evicts only the surplus least recently used entries. Expired entries are swept, and the entries recounted, every
+    EXPIRED_ENTRIES_SWEEP_INTERVAL sets.
+    """
+
+    ACCESSES_BATCH_SIZE = 100
+    EXPIRED_ENTRIES_SWEEP_INTERVAL = 1000
+
+    def __init__(self, db_file_path: str, max_entries_count: int):
+        """
+        :raises ResponseCacheException
+        """
+        super().__init__()
+        if max_entries_count < 1:
+            raise InvalidMaxEntriesCountError
+        self.db_file_path = db_file_path
+        self.max_entries_count = max_entries_count
+        self.lock = Lock()
+        self.pending_accessed_at: Dict[str, float] = {}
+        self.connections = SqLiteConnections(db_file_path)
+        self.stored_entries_count = 0
+        self.sets_count = 0
+        self._init_responses_table()
+
+    def get(self, key: str) -> Optional[object]:
+        now = time.time()
+        row = self._get_connection().execute(
+            "SELECT value, expires_at FROM responses WHERE key = ?",
+            (key,)
+        ).fetchone()
+        value = json.loads(row[0]) if row is not None and row[1] > now else None
+        self.lock.acquire()
+        try:
+            if value is not None:
+                self.pending_accessed_at[key] = now
+                if len(self.pending_accessed_at) >= self.ACCESSES_BATCH_SIZE:
+                    self._flush_accessed_at()
+            return self._count_lookup(value)
+        finally:
+            self.lock.release()
+
+    def set(self, key: str, value: object, ttl: int) -> None:
+        self.lock.acquire()
+        try:
+            self.pending_accessed_at.pop(key, None)
+            self._flush_accessed_at()
+            with self._get_connection() as connection:
+                cursor = connection.cursor()
+                now = time.time()
+                is_new_key = cursor.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone() is None
+                cursor.execute(
+                    """
+                    INSERT INTO responses(key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = excluded.value,
+                        expires_at = excluded.expires_at,
+                        accessed_at = excluded.accessed_at
+                    """,
+                    (key, json.dumps(value), now + ttl, now)
+                )
+                if is_new_key:
+                    self.stored_entries_count += 1
+                self.sets_count += 1
+                if self.sets_count % self.EXPIRED_ENTRIES_SWEEP_INTERVAL == 0:
+                    self._sweep_expired_entries(cursor, now)
+                if self.stored_entries_count > self.max_entries_count:
+                    cursor.execute(
+                        """
+                        DELETE FROM responses WHERE key IN (
+                            SELECT key FROM responses ORDER BY accessed_at ASC LIMIT ?
+                        )
+                        """,
+                        (self.stored_entries_count - self.max_entries_count,)
+                    )
+                    self.stored_entries_count -= cursor.rowcount
+        finally:
+            self.lock.release()
+
+    def entries_count(self) -> int:
+        return self._get_connection().execute(
+            "SELECT COUNT(*) FROM responses WHERE expires_at > ?",
+            (time.time(),)
+        ).fetchone()[0]
+
+    def close(self) -> None:
+        self.lock.acquire()
+        try:
+            self._flush_accessed_at()
+            self.connections.close()
+        finally:
+            self.lock.release()
+
+    def _sweep_expired_entries(self, cursor: sqlite3.Cursor, now: float) -> None:
+        """
+        Also recounts the entries, which other processes sharing the database file may have changed.
+        """
+        cursor.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+        self.stored_entries_count = cursor.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _flush_accessed_at(self) -> None:
+        if not self.pending_accessed_at:
+            return
+        with self._get_connection() as connection:
+            connection.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self.pending_accessed_at.items()]
+            )
+        self.pending_accessed_at = {}
+
+    def _init_responses_table(self):
+        self.lock.acquire()
+        try:
+            with self._get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses(accessed_at)"
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS responses_expires_at ON responses(expires_at)"
+                )
+                self._sweep_expired_entries(cursor, time.time())
+        finally:
+            self.lock.release()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self.connections.get()
+
+
+class InMemoryResponseCache(ResponseCache):
+
+    def __init__(self, max_entries_count: int):
+        """
+        :raises ResponseCacheException
+        """
+        super().__init__()
+        if max_entries_count < 1:
+            raise InvalidMaxEntriesCountError
+        self.max_entries_count = max_entries_count
+        self.entries: "OrderedDict[str, Tuple[object, float]]" = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key: str) -> Optional[object]:
+        self.lock.acquire()
+        try:
+            entry = self.entries.get(key)
+            if entry is None:
+                return self._count_lookup(None)
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return self._count_lookup(None)
+            self.entries.move_to_end(key)
+            return self._count_lookup(value)
+        finally:
+            self.lock.release()
+
+    def set(self, key: str, value: object, ttl: int) -> None:
+        self.lock.acquire()
+        try:
+            self.entries[key] = (value, time.time() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries_count:
+                self.entries.popitem(last=False)
+        finally:
+            self.lock.release()
+
+    def entries_count(self) -> int:
+        self.lock.acquire()
+        try:
+            return len(self.entries)
+        finally:
+            self.lock.release()
+
+
+@dataclass(frozen=True)
+class AccessToken:
+    value: str
+    expires_at: float
+
+    def is_valid(self, expiration_margin: int) -> bool:
+        return time.time() < self.expires_at - expiration_margin
+
+
+class AccessTokenCache(ABC):
+
+    @abstractmethod
+    def get(self, credentials_config: AccountCredentialsConfig) -> Optional[AccessToken]:
+        pass
+
+    @abstractmethod
+    def save(self, credentials_config: AccountCredentialsConfig, access_token: AccessToken) -> None:
+        pass
+
+
+class EncryptedFileAccessTokenCache(AccessTokenCache):
+    """
+    Keeps one file per account, named after the client ID and a hash of the refresh token, and encrypted with a key
+    derived from the client secret and the refresh token, so accounts sharing app credentials never get each other's
+    access tokens. Requires the optional cryptography package.
+    """
+
+    def __init__(self, dir_path: str):
+        """
+        :raises AccessTokenCacheException
+        """
+        if not self.is_supported():
+            raise EncryptionNotSupportedError
+        self.dir_path = dir_path
+
+    @staticmethod
+    def is_supported() -> bool:
+        return Fernet is not None
+
+    @classmethod
+    def create_if_supported(cls, dir_path: str, logger: Logger) -> Optional["EncryptedFileAccessTokenCache"]:
+        """
+        Returns None, logging it, when the cryptography package is not installed.
+        """
+        if not cls.is_supported():
+            logger.log_error("The cryptography package is not installed, access tokens cache is disabled")
+            return None
+        return cls(dir_path)
+
+    def get(self, credentials_config: AccountCredentialsConfig) -> Optional[AccessToken]:
+        try:
+            with open(self._get_file_path(credentials_config), "rb") as token_file:
+                token_data = json.loads(
+                    self._get_fernet(credentials_config).decrypt(token_file.read())
+                )
+            return AccessToken(
+                value=token_data["value"],
+                expires_at=token_data["expires_at"]
+            )
+        except (OSError, InvalidToken, ValueError, KeyError, TypeError):
+            return None
+
+    def save(self, credentials_config: AccountCredentialsConfig, access_token: AccessToken) -> None:
+        encrypted_token = self._get_fernet(credentials_config).encrypt(
+            json.dumps(asdict(access_token)).encode()
+        )
+        with NamedTemporaryFile(dir=self.dir_path, delete=False) as token_file:
+            token_file.write(encrypted_token)
+        os.chmod(token_file.name, 0o600)
+        os.replace(token_file.name, self._get_file_path(credentials_config))
+
+    def _get_file_path(self, credentials_config: AccountCredentialsConfig) -> str:
+        refresh_token_hash = hashlib.sha256(credentials_config.refresh_token.encode()).hexdigest()[:16]
+        return f"{self.dir_path}/{credentials_config.client_id}_{refresh_token_hash}_access_token"
+
+    @staticmethod
+    def _get_fernet(credentials_config: AccountCredentialsConfig) -> "Fernet":
+        return Fernet(
+            base64.urlsafe_b64encode(
+                hashlib.sha256(
+                    f"{credentials_config.client_secret}\n{credentials_config.refresh_token}".encode()
+                ).digest()
+            )
+        )
+
+
+class ResponseCacheException(Exception):
+    pass
+
+
+class InvalidMaxEntriesCountError(ResponseCacheException):
+
+    def __str__(self) -> str:
+        return "Max entries count must be a positive integer"
+
+
+class AccessTokenCacheException(Exception):
+    pass
+
+
+class EncryptionNotSupportedError(AccessTokenCacheException):
+
+    def __str__(self) -> str:
+        return "Access token cache encryption requires the cryptography package"
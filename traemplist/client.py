@@ -1,54 +1,115 @@
+import time
+from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Set, Iterator
-from random import randint
+from typing import Set, Iterator, Optional, Callable, Dict, List
+import random
+from threading import Lock
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import jsonschema
+import requests
+import urllib3
 from spotipy.client import Spotify, SpotifyException
 from spotipy.oauth2 import SpotifyOAuth, SpotifyOauthError
 
 from traemplist.config import AccountCredentialsConfig
+from traemplist.cache import ResponseCache, AccessTokenCache, AccessToken
+from traemplist.scheduler import SpotifyRequestScheduler
+
+
+def compile_schema(schema: dict) -> jsonschema.Draft7Validator:
+    validator_class = jsonschema.validators.validator_for(schema)
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def compile_schemas(schemas: Dict[str, dict]) -> Dict[str, jsonschema.Draft7Validator]:
+    return {name: compile_schema(schema) for name, schema in schemas.items()}
+
+
+class _FrozenSlots:
+    """
+    Keeps the frozen slotted dataclasses copyable and picklable, which the default slots state restoring breaks.
+    """
+
+    __slots__ = ()
+
+    def __getstate__(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state: tuple) -> None:
+        for name, value in zip(self.__slots__, state):
+            object.__setattr__(self, name, value)
 
 
 @dataclass(frozen=True)
-class Artist:
+class Artist(_FrozenSlots):
+    __slots__ = ("id", "name")
+
     id: str
     name: str
 
 
-@dataclass(frozen=True)
-class Track:
+@dataclass(frozen=True, eq=False)
+class Track(_FrozenSlots):
+    """
+    Tracks are identified by their ID alone, both equality and hash ignore the name and the artist.
+    """
+
+    __slots__ = ("id", "name", "artist")
+
     id: str
     name: str
     artist: Artist
 
-    def __eq__(self, other: "Track") -> bool:
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Track):
+            return NotImplemented
         return self.id == other.id
 
+    def __hash__(self) -> int:
+        return hash(self.id)
+
 
 class TracksCollection:
 
     def __init__(self):
         self.tracks = set()
+        self.sorted_tracks: Optional[List[Track]] = None
 
     def add_track(self, track: Track) -> "TracksCollection":
         self.tracks.add(track)
+        self.sorted_tracks = None
         return self
 
     def get_tracks(self) -> Set[Track]:
         return self.tracks
 
     def add_tracks(self, tracks: "TracksCollection") -> "TracksCollection":
-        self.tracks = self.tracks.union(tracks.get_tracks())
+        self.tracks.update(tracks.get_tracks())
+        self.sorted_tracks = None
         return self
 
-    def get_random_track(self) -> Track:
+    def get_track_ids(self) -> [str]:
+        """
+        Returns the track IDs in ID order.
+        """
+        return sorted(track.id for track in self.tracks)
+
+    def get_random_track(self, rng: Optional[random.Random] = None) -> Track:
         """
+        With rng, picks from the tracks sorted by ID, so seeded picks don't depend on the set iteration order.
+        The sorted tracks are kept until tracks are added.
         :raises EmptyTracksCollectionError
         """
         if not self:
             raise EmptyTracksCollectionError
-        tracks_list = list(self.tracks)
-        return tracks_list[randint(0, len(tracks_list) - 1)]
+        if rng is None:
+            tracks_list = list(self.tracks)
+            return tracks_list[random.randint(0, len(tracks_list) - 1)]
+        if self.sorted_tracks is None:
+            self.sorted_tracks = sorted(self.tracks, key=lambda track: track.id)
+        return self.sorted_tracks[rng.randint(0, len(self.sorted_tracks) - 1)]
 
     def contains_artist_track(self, artist: Artist) -> bool:
         for track in self.tracks:
@@ -57,9 +118,18 @@ class TracksCollection:
         return False
 
     def remove_artist_tracks(self, artist: Artist) -> None:
-        for track in list(self.tracks):
+        if self.sorted_tracks is None:
+            for track in list(self.tracks):
+                if track.artist == artist:
+                    self.tracks.remove(track)
+            return
+        sorted_tracks = []
+        for track in self.sorted_tracks:
             if track.artist == artist:
                 self.tracks.remove(track)
+            else:
+                sorted_tracks.append(track)
+        self.sorted_tracks = sorted_tracks
 
     def __contains__(self, item: Track) -> bool:
         return item in self.tracks
@@ -82,6 +152,60 @@ class TracksCollection:
         return self.tracks == other.tracks
 
 
+class IndexedTracksCollection(TracksCollection):
+
+    def __init__(self):
+        super().__init__()
+        self.tracks_list = []
+        self.tracks_positions = {}
+        self.artists_tracks = {}
+
+    def add_track(self, track: Track) -> "IndexedTracksCollection":
+        if track not in self.tracks_positions:
+            self.tracks.add(track)
+            self.tracks_positions[track] = len(self.tracks_list)
+            self.tracks_list.append(track)
+            self.artists_tracks.setdefault(track.artist, set()).add(track)
+        return self
+
+    def add_tracks(self, tracks: TracksCollection) -> "IndexedTracksCollection":
+        """
+        Adds the tracks in track ID order, so random picks don't depend on the set iteration order.
+        """
+        for track in sorted(tracks.get_tracks(), key=lambda track: track.id):
+            self.add_track(track)
+        return self
+
+    def get_random_track(self, rng: Optional[random.Random] = None) -> Track:
+        """
+        :raises EmptyTracksCollectionError
+        """
+        if not self:
+            raise EmptyTracksCollectionError
+        return self.tracks_list[(rng or random).randint(0, len(self.tracks_list) - 1)]
+
+    def get_track_ids(self) -> [str]:
+        """
+        Returns the track IDs in the index order, i.e. in the order the tracks were added unless some were removed.
+        """
+        return [track.id for track in self.tracks_list]
+
+    def contains_artist_track(self, artist: Artist) -> bool:
+        return artist in self.artists_tracks
+
+    def remove_artist_tracks(self, artist: Artist) -> None:
+        for track in sorted(self.artists_tracks.pop(artist, set()), key=lambda track: track.id):
+            self._remove_track(track)
+
+    def _remove_track(self, track: Track) -> None:
+        position = self.tracks_positions.pop(track)
+        last_track = self.tracks_list.pop()
+        if position < len(self.tracks_list):
+            self.tracks_list[position] = last_track
+            self.tracks_positions[last_track] = position
+        self.tracks.remove(track)
+
+
 class Playlist(TracksCollection):
 
     def __init__(self, playlist_id: str, name: str):
@@ -99,54 +223,125 @@ class Playlist(TracksCollection):
         return self.id == other.id
 
 
+@dataclass(frozen=True)
+class PlaylistSnapshot:
+    id: str
+    snapshot_id: Optional[str]
+
+
+@dataclass(frozen=True)
+class LikedTrack:
+    track: Track
+    added_at: str
+
+
+class RecentlyPlayedTracks(TracksCollection):
+
+    def __init__(self, cursor: Optional[int] = None):
+        super().__init__()
+        self.cursor = cursor
+
+    def get_cursor(self) -> Optional[int]:
+        return self.cursor
+
+
 class SpotifyAccessTokenProvider:
 
+    EXPIRATION_MARGIN = 60
+    DEFAULT_EXPIRES_IN = 3600
     RESPONSE_SCHEMA = {
         "type": "object",
         "properties": {
             "access_token": {
                 "type": "string"
+            },
+            "expires_in": {
+                "type": "integer"
             }
         },
         "required": [
             "access_token"
         ]
     }
+    RESPONSE_VALIDATOR = compile_schema(RESPONSE_SCHEMA)
 
-    def __init__(self, credentials_config: AccountCredentialsConfig):
+    def __init__(self, credentials_config: AccountCredentialsConfig,
+                 access_token_cache: Optional[AccessTokenCache] = None):
         self.credentials_config = credentials_config
+        self.access_token_cache = access_token_cache
         self.access_token = None
+        self.lock = Lock()
 
     def get_access_token(self) -> str:
         """
         :raises SpotifyAccessTokenProviderException
         """
-        if not self.access_token:
-            try:
-                new_tokens = SpotifyOAuth(
-                    client_id=self.credentials_config.client_id,
-                    client_secret=self.credentials_config.client_secret,
-                    redirect_uri="localhost"
-                ).refresh_access_token(
-                    refresh_token=self.credentials_config.refresh_token
-                )
-                self._validate_response_data(new_tokens)
-                self.access_token = new_tokens["access_token"]
-            except SpotifyOauthError as e:
-                raise SpotifyAccessTokenRequestError(str(e))
-        return self.access_token
+        self.lock.acquire()
+        try:
+            if not self._is_valid(self.access_token):
+                self.access_token = self._get_cached_access_token()
+            if not self._is_valid(self.access_token):
+                self.access_token = self._refresh_access_token()
+                if self.access_token_cache:
+                    self.access_token_cache.save(self.credentials_config, self.access_token)
+            return self.access_token.value
+        finally:
+            self.lock.release()
+
+    def _is_valid(self, access_token: Optional[AccessToken]) -> bool:
+        return access_token is not None and access_token.is_valid(self.EXPIRATION_MARGIN)
+
+    def _get_cached_access_token(self) -> Optional[AccessToken]:
+        if not self.access_token_cache:
+            return None
+        return self.access_token_cache.get(self.credentials_config)
+
+    def _refresh_access_token(self) -> AccessToken:
+        try:
+            new_tokens = SpotifyOAuth(
+                client_id=self.credentials_config.client_id,
+                client_secret=self.credentials_config.client_secret,
+                redirect_uri="localhost"
+            ).refresh_access_token(
+                refresh_token=self.credentials_config.refresh_token
+            )
+        except SpotifyOauthError as e:
+            raise SpotifyAccessTokenRequestError(str(e))
+        self._validate_response_data(new_tokens)
+        return AccessToken(
+            value=new_tokens["access_token"],
+            expires_at=time.time() + new_tokens.get("expires_in", self.DEFAULT_EXPIRES_IN)
+        )
 
     def _validate_response_data(self, response_data: dict):
-        try:
-            jsonschema.validate(response_data, self.RESPONSE_SCHEMA)
-        except jsonschema.ValidationError:
+        if not self.RESPONSE_VALIDATOR.is_valid(response_data):
             raise SpotifyAccessTokenResponseDataError(response_data)
 
 
-class SpotifyClient:
+class RelatedArtistsProvider(ABC):
+
+    @abstractmethod
+    def get_related_artists(self, artist_id: str) -> [Artist]:
+        pass
+
+    @abstractmethod
+    def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
+        pass
+
+
+class SpotifyClient(RelatedArtistsProvider):
 
     GET_USER_PLAYLIST_LIMIT = 50
     GET_USER_LIKED_SONGS_LIMIT = 50
+    GET_RECENTLY_PLAYED_LIMIT = 50
+    GET_PLAYLIST_ITEMS_LIMIT = 100
+    PLAYLIST_WRITE_ITEMS_LIMIT = 100
+    PLAYLIST_PAGES_WORKERS_COUNT = 4
+    PLAYLIST_TRACKS_FIELDS = "total,items(track(name,id,artists))"
+    RELATED_ARTISTS_CACHE_TTL = 7 * 24 * 3600
+    ARTIST_TOP_TRACKS_CACHE_TTL = 24 * 3600
+    DEFAULT_POOL_SIZE = 10
+    CONNECTION_RETRIES = 3
     USER_PLAYLIST_IDS_SCHEMA = {
         "type": "object",
         "properties": {
@@ -155,7 +350,8 @@ class SpotifyClient:
                 "items": {
                     "type": "object",
                     "properties": {
-                        "id": {"type": "string"}
+                        "id": {"type": "string"},
+                        "snapshot_id": {"type": "string"}
                     },
                     "required": ["id"]
                 }
@@ -200,12 +396,31 @@ class SpotifyClient:
         },
         "required": ["items"]
     }
+    RECENTLY_PLAYED_CURSORS_SCHEMA = {
+        "type": ["object", "null"],
+        "properties": {
+            "after": {"type": "string", "pattern": "^[0-9]+$"}
+        },
+        "required": ["after"]
+    }
+    RECENTLY_PLAYED_TRACKS_SCHEMA = dict(
+        TRACKS_SCHEMA,
+        properties=dict(TRACKS_SCHEMA["properties"], cursors=RECENTLY_PLAYED_CURSORS_SCHEMA)
+    )
+    PLAYLIST_ITEMS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "total": {"type": "integer"},
+            "items": TRACKS_SCHEMA["properties"]["items"]
+        },
+        "required": ["total", "items"]
+    }
     PLAYLIST_SCHEMA = {
         "type": "object",
         "properties": {
             "id": {"type": "string"},
             "name": {"type": "string"},
-            "tracks": TRACKS_SCHEMA
+            "tracks": PLAYLIST_ITEMS_SCHEMA
         },
         "required": ["id", "name", "tracks"]
     }
@@ -237,32 +452,146 @@ class SpotifyClient:
                 "items": {
                     "type": "object",
                     "properties": {
+                        "added_at": {"type": "string"},
                         "track": TRACK_SCHEMA
                     },
+                    "required": ["added_at", "track"]
+                }
+            }
+        },
+        "required": ["items"]
+    }
+    TRUSTED_ARTIST_SCHEMA = {
+        "type": "object",
+        "required": ["id", "name"]
+    }
+    TRUSTED_TRACK_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "artists": {
+                "type": "array",
+                "items": [TRUSTED_ARTIST_SCHEMA],
+                "minItems": 1
+            }
+        },
+        "required": ["id", "name", "artists"]
+    }
+    TRUSTED_TRACKS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "track": TRUSTED_TRACK_SCHEMA
+                    },
                     "required": ["track"]
                 }
             }
         },
         "required": ["items"]
     }
-
-    def __init__(self, access_token_provider: SpotifyAccessTokenProvider):
+    TRUSTED_USER_LIKED_TRACKS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "items": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "track": TRUSTED_TRACK_SCHEMA
+                    },
+                    "required": ["added_at", "track"]
+                }
+            }
+        },
+        "required": ["items"]
+    }
+    TRUSTED_PLAYLIST_ITEMS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "items": TRUSTED_TRACKS_SCHEMA["properties"]["items"]
+        },
+        "required": ["total", "items"]
+    }
+    TRUSTED_PLAYLIST_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "tracks": TRUSTED_PLAYLIST_ITEMS_SCHEMA
+        },
+        "required": ["id", "name", "tracks"]
+    }
+    TRUSTED_ARTIST_TOP_TRACKS_SCHEMA = {
+        "type": "object",
+        "properties": {
+            "tracks": {
+                "type": "array",
+                "items": TRUSTED_TRACK_SCHEMA
+            }
+        },
+        "required": ["tracks"]
+    }
+    RESPONSE_SCHEMAS = {
+        "current_user_playlists": USER_PLAYLIST_IDS_SCHEMA,
+        "playlist": PLAYLIST_SCHEMA,
+        "playlist_items": PLAYLIST_ITEMS_SCHEMA,
+        "recently_played_tracks": RECENTLY_PLAYED_TRACKS_SCHEMA,
+        "artist_related_artists": RELATED_ARTISTS_SCHEMA,
+        "artist_top_tracks": ARTIST_TOP_TRACKS_SCHEMA,
+        "current_user_saved_tracks": USER_LIKED_TRACKS_SCHEMA
+    }
+    TRUSTED_RESPONSE_SCHEMAS = dict(
+        RESPONSE_SCHEMAS,
+        playlist=TRUSTED_PLAYLIST_SCHEMA,
+        playlist_items=TRUSTED_PLAYLIST_ITEMS_SCHEMA,
+        recently_played_tracks=dict(
+            TRUSTED_TRACKS_SCHEMA,
+            properties=dict(TRUSTED_TRACKS_SCHEMA["properties"], cursors=RECENTLY_PLAYED_CURSORS_SCHEMA)
+        ),
+        artist_top_tracks=TRUSTED_ARTIST_TOP_TRACKS_SCHEMA,
+        current_user_saved_tracks=TRUSTED_USER_LIKED_TRACKS_SCHEMA
+    )
+    RESPONSE_VALIDATORS = compile_schemas(RESPONSE_SCHEMAS)
+    TRUSTED_RESPONSE_VALIDATORS = compile_schemas(TRUSTED_RESPONSE_SCHEMAS)
+
+    def __init__(self, access_token_provider: SpotifyAccessTokenProvider,
+                 response_cache: Optional[ResponseCache] = None,
+                 pool_size: int = DEFAULT_POOL_SIZE,
+                 trusted_responses: bool = False,
+                 request_scheduler: Optional[SpotifyRequestScheduler] = None):
         self.access_token_provider = access_token_provider
+        self.response_cache = response_cache
+        self.request_scheduler = request_scheduler or SpotifyRequestScheduler()
+        self.pool_size = pool_size
+        self.spotify_client = None
+        self.spotify_client_access_token = None
+        self.spotify_client_lock = Lock()
+        self.response_validators = self.TRUSTED_RESPONSE_VALIDATORS if trusted_responses else self.RESPONSE_VALIDATORS
+        self.artists: Dict[str, Artist] = {}
 
     def get_user_playlist_ids(self) -> Iterator[str]:
+        for playlist_snapshot in self.get_user_playlist_snapshots():
+            yield playlist_snapshot.id
+
+    def get_user_playlist_snapshots(self) -> Iterator[PlaylistSnapshot]:
         request_name = "current_user_playlists"
         limit = self.GET_USER_PLAYLIST_LIMIT
         offset = 0
         try:
             while True:
-                response_data = self._get_spotify_client().current_user_playlists(limit=limit, offset=offset)
+                response_data = self._request(
+                    lambda spotify: spotify.current_user_playlists(limit=limit, offset=offset)
+                )
                 self._validate_response_data(
                     request_name=request_name,
-                    response_data=response_data,
-                    schema=self.USER_PLAYLIST_IDS_SCHEMA
+                    response_data=response_data
                 )
                 for item in response_data["items"]:
-                    yield item["id"]
+                    yield PlaylistSnapshot(
+                        id=item["id"],
+                        snapshot_id=item.get("snapshot_id")
+                    )
                 if len(response_data["items"]) < limit:
                     break
                 offset += limit
@@ -272,29 +601,102 @@ class SpotifyClient:
     def get_playlist(self, playlist_id: str) -> Playlist:
         request_name = "playlist"
         try:
-            response_data = self._get_spotify_client().playlist(
-                playlist_id=playlist_id,
-                fields=["id, name, tracks.items(track(name, id, artists))"]
+            response_data = self._request(
+                lambda spotify: spotify.playlist(
+                    playlist_id=playlist_id,
+                    fields=f"id,name,tracks({self.PLAYLIST_TRACKS_FIELDS})"
+                )
             )
             self._validate_response_data(
                 request_name=request_name,
-                response_data=response_data,
-                schema=self.PLAYLIST_SCHEMA
+                response_data=response_data
             )
-            return self._create_playlist_from_response(response_data)
         except SpotifyException as e:
             raise SpotifyClientRequestError(request_name, str(e))
+        playlist = Playlist(
+            playlist_id=response_data["id"],
+            name=response_data["name"]
+        )
+        for track in self._get_playlist_tracks(playlist_id, response_data["tracks"]):
+            playlist.add_track(track)
+        return playlist
 
-    def get_recently_played_tracks(self) -> TracksCollection:
-        request_name = "recently_played_tracks"
+    def get_playlist_tracks(self, playlist_id: str) -> Iterator[Track]:
+        """
+        Yields the playlist tracks as their pages arrive, the pages following the first one are fetched concurrently.
+        """
+        yield from self._get_playlist_tracks(
+            playlist_id,
+            self._get_playlist_items_page(playlist_id, offset=0)
+        )
+
+    def _get_playlist_tracks(self, playlist_id: str, first_page: dict) -> Iterator[Track]:
+        for item in first_page["items"]:
+            yield self._create_track_from_response(item["track"])
+        offsets = range(self.GET_PLAYLIST_ITEMS_LIMIT, first_page["total"], self.GET_PLAYLIST_ITEMS_LIMIT)
+        if not offsets:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.PLAYLIST_PAGES_WORKERS_COUNT, len(offsets))) as executor:
+            futures = [
+                executor.submit(self._get_playlist_items_page, playlist_id, offset)
+                for offset in offsets
+            ]
+            try:
+                for future in as_completed(futures):
+                    for item in future.result()["items"]:
+                        yield self._create_track_from_response(item["track"])
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def _get_playlist_items_page(self, playlist_id: str, offset: int) -> dict:
+        request_name = "playlist_items"
         try:
-            response_data = self._get_spotify_client().current_user_recently_played()
+            response_data = self._request(
+                lambda spotify: spotify.playlist_items(
+                    playlist_id=playlist_id,
+                    fields=self.PLAYLIST_TRACKS_FIELDS,
+                    limit=self.GET_PLAYLIST_ITEMS_LIMIT,
+                    offset=offset,
+                    additional_types=("track",)
+                )
+            )
             self._validate_response_data(
                 request_name=request_name,
-                response_data=response_data,
-                schema=self.TRACKS_SCHEMA
+                response_data=response_data
             )
-            return self._create_tracks_from_response(response_data["items"])
+            return response_data
+        except SpotifyException as e:
+            raise SpotifyClientRequestError(request_name, str(e))
+
+    def get_recently_played_tracks(self, after: Optional[int] = None) -> RecentlyPlayedTracks:
+        """
+        Returns the tracks played after the given cursor (Unix timestamp in milliseconds), along with the cursor
+        of the most recent play.
+        """
+        request_name = "recently_played_tracks"
+        limit = self.GET_RECENTLY_PLAYED_LIMIT
+        recently_played_tracks = RecentlyPlayedTracks(cursor=after)
+        try:
+            while True:
+                response_data = self._request(
+                    lambda spotify: spotify.current_user_recently_played(
+                        limit=limit,
+                        after=recently_played_tracks.get_cursor()
+                    )
+                )
+                self._validate_response_data(
+                    request_name=request_name,
+                    response_data=response_data
+                )
+                recently_played_tracks.add_tracks(
+                    self._create_tracks_from_response(response_data["items"])
+                )
+                if not response_data.get("cursors"):
+                    return recently_played_tracks
+                recently_played_tracks.cursor = int(response_data["cursors"]["after"])
+                if len(response_data["items"]) < limit:
+                    return recently_played_tracks
         except SpotifyException as e:
             raise SpotifyClientRequestError(request_name, str(e))
 
@@ -302,11 +704,11 @@ class SpotifyClient:
         request_name = "artist_related_artists"
         try:
             related_artists = []
-            response_data = self._get_spotify_client().artist_related_artists(artist_id=artist_id)
-            self._validate_response_data(
+            response_data = self._get_cached_response_data(
                 request_name=request_name,
-                response_data=response_data,
-                schema=self.RELATED_ARTISTS_SCHEMA
+                request_key=artist_id,
+                ttl=self.RELATED_ARTISTS_CACHE_TTL,
+                request=lambda spotify: spotify.artist_related_artists(artist_id=artist_id)
             )
             for artist_data in response_data["artists"]:
                 related_artists.append(
@@ -319,11 +721,11 @@ class SpotifyClient:
     def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
         request_name = "artist_top_tracks"
         try:
-            response_data = self._get_spotify_client().artist_top_tracks(artist_id=artist_id)
-            self._validate_response_data(
+            response_data = self._get_cached_response_data(
                 request_name=request_name,
-                response_data=response_data,
-                schema=self.ARTIST_TOP_TRACKS_SCHEMA
+                request_key=artist_id,
+                ttl=self.ARTIST_TOP_TRACKS_CACHE_TTL,
+                request=lambda spotify: spotify.artist_top_tracks(artist_id=artist_id)
             )
             top_tracks = TracksCollection()
             for track_data in response_data["tracks"]:
@@ -334,63 +736,157 @@ class SpotifyClient:
         except SpotifyException as e:
             raise SpotifyClientRequestError(request_name, str(e))
 
-    def replace_playlist_tracks(self, playlist_id: str, new_track_ids: [str]):
+    def get_playlist_track_ids(self, playlist_id: str) -> [str]:
+        """
+        Returns the playlist track IDs in the playlist order.
+        """
+        first_page = self._get_playlist_items_page(playlist_id, offset=0)
+        pages = [first_page]
+        offsets = range(self.GET_PLAYLIST_ITEMS_LIMIT, first_page["total"], self.GET_PLAYLIST_ITEMS_LIMIT)
+        if offsets:
+            with ThreadPoolExecutor(max_workers=min(self.PLAYLIST_PAGES_WORKERS_COUNT, len(offsets))) as executor:
+                pages.extend(
+                    executor.map(lambda offset: self._get_playlist_items_page(playlist_id, offset), offsets)
+                )
+        return [item["track"]["id"] for page in pages for item in page["items"]]
+
+    def replace_playlist_tracks(self, playlist_id: str, new_track_ids: [str]) -> bool:
+        """
+        Replaces the playlist tracks in chunks of at most 100 items: the first chunk replaces the current tracks,
+        the others are appended. Appends failing with a server error are not retried, as they may have been applied.
+        Nothing is written when the playlist already has the same tracks in the same order.
+        Returns whether the playlist has been written.
+        """
+        if self.get_playlist_track_ids(playlist_id) == list(new_track_ids):
+            return False
+        chunks = [
+            new_track_ids[offset:offset + self.PLAYLIST_WRITE_ITEMS_LIMIT]
+            for offset in range(0, len(new_track_ids), self.PLAYLIST_WRITE_ITEMS_LIMIT)
+        ] or [[]]
         try:
-            self._get_spotify_client().playlist_replace_items(
-                playlist_id=playlist_id,
-                items=new_track_ids
+            self._request(
+                lambda spotify: spotify.playlist_replace_items(
+                    playlist_id=playlist_id,
+                    items=chunks[0]
+                ),
+                priority=SpotifyRequestScheduler.WRITE_PRIORITY
             )
         except SpotifyException as e:
             raise SpotifyClientRequestError("playlist_replace_items", str(e))
+        for chunk in chunks[1:]:
+            try:
+                self._request(
+                    lambda spotify: spotify.playlist_add_items(
+                        playlist_id=playlist_id,
+                        items=chunk
+                    ),
+                    priority=SpotifyRequestScheduler.WRITE_PRIORITY,
+                    retry_server_errors=False
+                )
+            except SpotifyException as e:
+                raise SpotifyClientRequestError("playlist_add_items", str(e))
+        return True
 
     def get_user_liked_tracks(self) -> TracksCollection:
+        liked_tracks = TracksCollection()
+        for liked_track in self.get_user_liked_track_items():
+            liked_tracks.add_track(liked_track.track)
+        return liked_tracks
+
+    def get_user_liked_track_items(self) -> Iterator[LikedTrack]:
+        """
+        Yields liked tracks page by page, most recently added first.
+        """
         request_name = "current_user_saved_tracks"
         limit = self.GET_USER_LIKED_SONGS_LIMIT
         offset = 0
-        liked_tracks = TracksCollection()
-        spotify_client = self._get_spotify_client()
         try:
             while True:
-                response_data = spotify_client.current_user_saved_tracks(limit=limit, offset=offset)
+                response_data = self._request(
+                    lambda spotify: spotify.current_user_saved_tracks(limit=limit, offset=offset)
+                )
                 self._validate_response_data(
                     request_name=request_name,
-                    response_data=response_data,
-                    schema=self.USER_LIKED_TRACKS_SCHEMA
+                    response_data=response_data
                 )
                 items = response_data["items"]
                 for item in items:
-                    liked_tracks.add_track(
-                        self._create_track_from_response(item["track"])
+                    yield LikedTrack(
+                        track=self._create_track_from_response(item["track"]),
+                        added_at=item["added_at"]
                     )
                 if len(items) < limit:
-                    return liked_tracks
+                    return
                 offset += limit
         except SpotifyException as e:
             raise SpotifyClientRequestError(request_name, str(e))
 
-    def _get_spotify_client(self) -> Spotify:
-        return Spotify(
-            auth=self.access_token_provider.get_access_token()
+    def _get_cached_response_data(self, request_name: str, request_key: str, ttl: int,
+                                  request: Callable[[Spotify], object]) -> object:
+        cache_key = f"{request_name}:{request_key}"
+        if self.response_cache:
+            response_data = self.response_cache.get(cache_key)
+            if response_data is not None:
+                return response_data
+        response_data = self._request(request)
+        self._validate_response_data(
+            request_name=request_name,
+            response_data=response_data
+        )
+        if self.response_cache:
+            self.response_cache.set(cache_key, response_data, ttl)
+        return response_data
+
+    def _request(self, request: Callable[[Spotify], object],
+                 priority: int = SpotifyRequestScheduler.READ_PRIORITY,
+                 retry_server_errors: bool = True) -> object:
+        return self.request_scheduler.execute(
+            lambda: request(self._get_spotify_client()),
+            priority=priority,
+            retry_server_errors=retry_server_errors
         )
 
-    @staticmethod
-    def _validate_response_data(request_name: str, response_data: object, schema: dict):
+    def _get_spotify_client(self) -> Spotify:
+        access_token = self.access_token_provider.get_access_token()
+        self.spotify_client_lock.acquire()
         try:
-            jsonschema.validate(response_data, schema)
-        except jsonschema.ValidationError:
-            raise SpotifyClientResponseDataError(request_name, response_data)
-
-    def _create_playlist_from_response(self, response: dict) -> Playlist:
-        playlist = Playlist(
-            playlist_id=response["id"],
-            name=response["name"]
+            if self.spotify_client is None:
+                self.spotify_client = self._create_spotify_client(access_token)
+            elif self.spotify_client_access_token != access_token:
+                self.spotify_client.set_auth(access_token)
+            self.spotify_client_access_token = access_token
+            return self.spotify_client
+        finally:
+            self.spotify_client_lock.release()
+
+    def _create_spotify_client(self, access_token: str) -> Spotify:
+        return Spotify(
+            auth=access_token,
+            requests_session=self._create_session()
         )
-        playlist.add_tracks(
-            self._create_tracks_from_response(
-                response["tracks"]["items"]
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_size,
+            pool_maxsize=self.pool_size,
+            max_retries=urllib3.Retry(
+                total=self.CONNECTION_RETRIES,
+                connect=None,
+                read=False,
+                status=0,
+                respect_retry_after_header=False,
+                allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+                backoff_factor=0.3
             )
         )
-        return playlist
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def _validate_response_data(self, request_name: str, response_data: object):
+        if not self.response_validators[request_name].is_valid(response_data):
+            raise SpotifyClientResponseDataError(request_name, response_data)
 
     def _create_tracks_from_response(self, response: [dict]) -> TracksCollection:
         tracks = TracksCollection()
@@ -407,12 +903,20 @@ class SpotifyClient:
             artist=self._create_artist_from_response(response["artists"][0])
         )
 
-    @staticmethod
-    def _create_artist_from_response(response: dict) -> Artist:
-        return Artist(
-            id=response["id"],
-            name=response["name"]
-        )
+    def _create_artist_from_response(self, response: dict) -> Artist:
+        """
+        Artists are interned by ID, so all tracks of an artist share one Artist object.
+        """
+        artist = self.artists.get(response["id"])
+        if artist is None:
+            artist = self.artists.setdefault(
+                response["id"],
+                Artist(
+                    id=response["id"],
+                    name=response["name"]
+                )
+            )
+        return artist
 
 
 class TracksCollectionException(Exception):
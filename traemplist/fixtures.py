@@ -0,0 +1,215 @@
+import json
+import os
+from collections import Counter
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+
+from spotipy.client import Spotify
+
+from traemplist.cache import ResponseCache
+from traemplist.client import SpotifyClient, SpotifyAccessTokenProvider
+from traemplist.scheduler import SpotifyRequestScheduler
+
+
+class SpotifyResponseFixtures:
+    """
+    Spotify API responses keyed by request method, path and parameters, stored as a JSON file.
+    Request payloads are not part of the key, so replaying write requests does not depend on the written items.
+    Counts the served requests by endpoint, e.g. "GET artists/{id}/top-tracks".
+    """
+
+    ID_PARENT_SEGMENTS = {"albums", "artists", "playlists", "tracks", "users"}
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.responses: Dict[str, object] = {}
+        self.requests_counts = Counter()
+        self.lock = Lock()
+
+    def load(self) -> "SpotifyResponseFixtures":
+        """
+        :raises SpotifyResponseFixturesException
+        """
+        try:
+            with open(self.file_path) as fixtures_file:
+                self.responses = json.load(fixtures_file)
+        except FileNotFoundError:
+            raise FixturesFileNotFoundError(self.file_path)
+        except json.JSONDecodeError:
+            raise InvalidFixturesFileError(self.file_path)
+        return self
+
+    def save(self) -> None:
+        self.lock.acquire()
+        try:
+            fixtures_dir_path = os.path.dirname(os.path.abspath(self.file_path))
+            with NamedTemporaryFile("w", dir=fixtures_dir_path, delete=False) as fixtures_file:
+                json.dump(self.responses, fixtures_file, sort_keys=True)
+            os.replace(fixtures_file.name, self.file_path)
+        finally:
+            self.lock.release()
+
+    def get(self, method: str, url: str, params: dict) -> object:
+        """
+        :raises SpotifyResponseFixturesException
+        """
+        key = self._get_key(method, url, params)
+        self.lock.acquire()
+        try:
+            if key not in self.responses:
+                raise FixtureNotFoundError(key)
+            self._count_request(method, url)
+            return self.responses[key]
+        finally:
+            self.lock.release()
+
+    def set(self, method: str, url: str, params: dict, response: object) -> None:
+        key = self._get_key(method, url, params)
+        self.lock.acquire()
+        try:
+            self.responses[key] = response
+            self._count_request(method, url)
+        finally:
+            self.lock.release()
+
+    def get_requests_count(self) -> int:
+        return sum(self.requests_counts.values())
+
+    def get_requests_counts(self) -> Dict[str, int]:
+        return dict(self.requests_counts)
+
+    def reset_requests_counts(self) -> None:
+        self.lock.acquire()
+        try:
+            self.requests_counts = Counter()
+        finally:
+            self.lock.release()
+
+    def _count_request(self, method: str, url: str) -> None:
+        segments = self._get_path(url).split("/")
+        endpoint_segments = segments[:1] + [
+            "{id}" if previous_segment in self.ID_PARENT_SEGMENTS else segment
+            for previous_segment, segment in zip(segments, segments[1:])
+        ]
+        self.requests_counts[f"{method} {'/'.join(endpoint_segments)}"] += 1
+
+    @classmethod
+    def _get_key(cls, method: str, url: str, params: dict) -> str:
+        return f"{method} {cls._get_path(url)} {json.dumps(params, sort_keys=True)}"
+
+    @staticmethod
+    def _get_path(url: str) -> str:
+        path = urlsplit(url).path if url.startswith("http") else url
+        return path[len("/v1/"):] if path.startswith("/v1/") else path
+
+
+class _RecordingSpotify(Spotify):
+
+    NOT_SENT_WRITE_RESPONSE = {"snapshot_id": "not_sent"}
+
+    def __init__(self, fixtures: SpotifyResponseFixtures, send_write_requests: bool, **kwargs):
+        super().__init__(**kwargs)
+        self.fixtures = fixtures
+        self.send_write_requests = send_write_requests
+
+    def _internal_call(self, method, url, payload, params):
+        if method != "GET" and not self.send_write_requests:
+            response = self.NOT_SENT_WRITE_RESPONSE
+        else:
+            response = super()._internal_call(method, url, payload, dict(params))
+        self.fixtures.set(method, url, params, response)
+        return response
+
+
+class _ReplayingSpotify(Spotify):
+
+    def __init__(self, fixtures: SpotifyResponseFixtures):
+        super().__init__(auth="replay")
+        self.fixtures = fixtures
+
+    def _internal_call(self, method, url, payload, params):
+        return self.fixtures.get(method, url, params)
+
+
+class RecordingSpotifyClient(SpotifyClient):
+    """
+    SpotifyClient which stores every Spotify API response into the fixtures. Call fixtures.save() once done.
+    Without send_write_requests, write requests are recorded with a placeholder response but not sent to Spotify.
+    """
+
+    def __init__(self, access_token_provider: SpotifyAccessTokenProvider,
+                 fixtures: SpotifyResponseFixtures,
+                 response_cache: Optional[ResponseCache] = None,
+                 request_scheduler: Optional[SpotifyRequestScheduler] = None,
+                 send_write_requests: bool = True):
+        super().__init__(
+            access_token_provider=access_token_provider,
+            response_cache=response_cache,
+            request_scheduler=request_scheduler
+        )
+        self.fixtures = fixtures
+        self.send_write_requests = send_write_requests
+
+    def _create_spotify_client(self, access_token: str) -> Spotify:
+        return _RecordingSpotify(
+            self.fixtures,
+            self.send_write_requests,
+            auth=access_token,
+            requests_session=self._create_session()
+        )
+
+
+class ReplayingSpotifyClient(SpotifyClient):
+    """
+    SpotifyClient answering from the recorded fixtures only, without access tokens, network or request throttling.
+    Requests missing from the fixtures raise FixtureNotFoundError.
+    """
+
+    def __init__(self, fixtures: SpotifyResponseFixtures):
+        super().__init__(
+            access_token_provider=None,
+            request_scheduler=SpotifyRequestScheduler(rate=10 ** 9, burst=10 ** 9)
+        )
+        self.fixtures = fixtures
+
+    def _get_spotify_client(self) -> Spotify:
+        self.spotify_client_lock.acquire()
+        try:
+            if self.spotify_client is None:
+                self.spotify_client = _ReplayingSpotify(self.fixtures)
+            return self.spotify_client
+        finally:
+            self.spotify_client_lock.release()
+
+
+class SpotifyResponseFixturesException(Exception):
+    pass
+
+
+class FixturesFileNotFoundError(SpotifyResponseFixturesException):
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def __str__(self) -> str:
+        return f"Fixtures file {self.file_path} not found"
+
+
+class InvalidFixturesFileError(SpotifyResponseFixturesException):
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+
+    def __str__(self) -> str:
+        return f"Fixtures file {self.file_path} is not a valid JSON"
+
+
+class FixtureNotFoundError(SpotifyResponseFixturesException):
+
+    def __init__(self, key: str):
+        self.key = key
+
+    def __str__(self) -> str:
+        return f"No recorded response for {self.key}"
@@ -1,15 +1,45 @@
 import random
-from traemplist.client import SpotifyClient, TracksCollection, Artist, Track
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Set, Optional, Dict, List, Callable, Tuple, Iterable
+from concurrent.futures import ThreadPoolExecutor, Future
+from traemplist.client import RelatedArtistsProvider, TracksCollection, IndexedTracksCollection, Artist, Track
 from traemplist.repository import TracksRepository
 from traemplist.logger import Logger
 
 
-class TraemplistGenerator:
+@dataclass
+class GenerationMetrics:
+    related_artists_calls_count: int = 0
+    top_tracks_calls_count: int = 0
+    accepted_tracks_count: int = 0
 
-    def __init__(self, client: SpotifyClient, history: TracksRepository, logger: Logger):
+    def get_calls_count(self) -> int:
+        return self.related_artists_calls_count + self.top_tracks_calls_count
+
+    def get_calls_per_accepted_track(self) -> Optional[float]:
+        if not self.accepted_tracks_count:
+            return None
+        return self.get_calls_count() / self.accepted_tracks_count
+
+
+class GenerationStrategy(ABC):
+    """
+    Base of the traemplist generation engines. Counts the related artists provider calls and the accepted tracks
+    of the last generation. All random choices are drawn from rng, so a seeded random.Random makes the generation
+    reproducible for the same input and provider responses.
+    """
+
+    def __init__(self, client: RelatedArtistsProvider, history: TracksRepository, logger: Logger,
+                 rng: Optional[random.Random] = None):
         self.client = client
         self.history = history
         self.logger = logger
+        self.rng = rng or random.Random()
+        self.metrics = GenerationMetrics()
+        self.metrics_lock = Lock()
 
     def generate(self, input_tracks_collection: TracksCollection, size: int) -> TracksCollection:
         """
@@ -17,35 +47,228 @@ class TraemplistGenerator:
         """
         if size < 0:
             raise InvalidTraemplistSizeError
-        traemplist = TracksCollection()
+        self.metrics = GenerationMetrics()
+        traemplist = self._generate(input_tracks_collection, size)
+        calls_per_accepted_track = self.metrics.get_calls_per_accepted_track()
+        self.logger.log_info(
+            f"Generation metrics: {self.metrics.related_artists_calls_count} related artists calls, "
+            f"{self.metrics.top_tracks_calls_count} top tracks calls, "
+            f"{self.metrics.accepted_tracks_count} accepted tracks"
+            + (f" ({calls_per_accepted_track:.1f} calls per accepted track)" if calls_per_accepted_track else "")
+        )
+        return traemplist
+
+    def get_metrics(self) -> GenerationMetrics:
+        return self.metrics
+
+    @abstractmethod
+    def _generate(self, input_tracks_collection: TracksCollection, size: int) -> TracksCollection:
+        pass
+
+    def _get_related_artists(self, artist: Artist) -> [Artist]:
+        related_artists = self.client.get_related_artists(artist_id=artist.id)
+        self.metrics_lock.acquire()
+        try:
+            self.metrics.related_artists_calls_count += 1
+        finally:
+            self.metrics_lock.release()
+        return related_artists
+
+    def _get_artist_top_tracks(self, artist: Artist) -> TracksCollection:
+        top_tracks = self.client.get_artist_top_tracks(artist_id=artist.id)
+        self.metrics_lock.acquire()
+        try:
+            self.metrics.top_tracks_calls_count += 1
+        finally:
+            self.metrics_lock.release()
+        return top_tracks
+
+    def _accept_track(self, track: Track, traemplist: TracksCollection) -> None:
+        self.logger.log_info(f"'{track.artist.name} - {track.name}' seems like a good choice, adding")
+        traemplist.add_track(track)
+        self.metrics.accepted_tracks_count += 1
+
+
+class _StartArtistsPrefetcher:
+    """
+    Loads the related artists' tracks of the next randomly sampled start artists in the background. Prefetched
+    start artists are kept until they are picked, or until their tracks leave the input tracks collection.
+    """
+
+    SAMPLING_ATTEMPTS_PER_ARTIST = 3
+
+    def __init__(self, load_related_artists_tracks: Callable[[Artist], TracksCollection], prefetch_count: int,
+                 rng: random.Random):
+        self.load_related_artists_tracks = load_related_artists_tracks
+        self.prefetch_count = prefetch_count
+        self.rng = rng
+        self.executor = ThreadPoolExecutor(max_workers=prefetch_count) if prefetch_count else None
+        self.prefetched: "OrderedDict[str, Tuple[Track, Future]]" = OrderedDict()
+
+    def pick_start_track(self, input_tracks_collection: TracksCollection) -> Track:
+        while self.prefetched:
+            artist_id, (track, future) = next(iter(self.prefetched.items()))
+            if input_tracks_collection.contains_artist_track(track.artist):
+                return track
+            del self.prefetched[artist_id]
+            future.cancel()
+        return input_tracks_collection.get_random_track(self.rng)
+
+    def prefetch(self, input_tracks_collection: TracksCollection, start_artist: Artist) -> None:
+        attempts_count = self.prefetch_count * self.SAMPLING_ATTEMPTS_PER_ARTIST
+        while len(self.prefetched) - (start_artist.id in self.prefetched) < self.prefetch_count and attempts_count > 0:
+            attempts_count -= 1
+            track = input_tracks_collection.get_random_track(self.rng)
+            if track.artist.id != start_artist.id and track.artist.id not in self.prefetched:
+                self.prefetched[track.artist.id] = (
+                    track,
+                    self.executor.submit(self.load_related_artists_tracks, track.artist)
+                )
+
+    def get_related_artists_tracks(self, artist: Artist) -> TracksCollection:
+        prefetched = self.prefetched.pop(artist.id, None)
+        if prefetched is None:
+            return self.load_related_artists_tracks(artist)
+        return prefetched[1].result()
+
+    def close(self) -> None:
+        for _, future in self.prefetched.values():
+            future.cancel()
+        self.prefetched = OrderedDict()
+        if self.executor:
+            self.executor.shutdown()
+
+
+class _CandidateReservoir:
+    """
+    Unheard tracks screened by earlier iterations but not accepted, keyed by artist id.
+    """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.tracks: Dict[str, List[Track]] = {}
+
+    def add_tracks(self, tracks: Iterable[Track]) -> None:
+        for track in tracks:
+            self.tracks.setdefault(track.artist.id, []).append(track)
+
+    def remove_artist(self, artist: Artist) -> None:
+        self.tracks.pop(artist.id, None)
+
+    def artists_count(self) -> int:
+        return len(self.tracks)
+
+    def pop_random_track(self) -> Optional[Track]:
+        if not self.tracks:
+            return None
+        return self.rng.choice(self.tracks.pop(self.rng.choice(sorted(self.tracks))))
+
+
+class TraemplistGenerator(GenerationStrategy):
+    """
+    Picks a random input track, adds one unheard track of its artist's related artists and drops the artist.
+    With a positive prefetch_count, the next start artists are sampled ahead and their related artists' tracks
+    are loaded in the background while the current start artist is evaluated.
+    With use_candidate_reservoir, the unheard tracks of the other related artists are kept in a reservoir. Once
+    MAX_UNPRODUCTIVE_ITERATIONS_COUNT iterations in a row add no track, or once the input is exhausted, the network
+    iterations stop and the remaining slots are filled from the reservoir. While the iterations keep adding tracks
+    they go on, so the traemplist spreads over as many start artists as without the reservoir.
+    """
+
+    MAX_UNPRODUCTIVE_ITERATIONS_COUNT = 5
+
+    def __init__(self, client: RelatedArtistsProvider, history: TracksRepository, logger: Logger,
+                 workers_count: int = 1, prefetch_count: int = 0, use_candidate_reservoir: bool = False,
+                 rng: Optional[random.Random] = None):
+        """
+        :raises TraemplistGeneratorException
+        """
+        if workers_count < 1:
+            raise InvalidWorkersCountError
+        if prefetch_count < 0:
+            raise InvalidPrefetchCountError
+        super().__init__(client, history, logger, rng)
+        self.workers_count = workers_count
+        self.prefetch_count = prefetch_count
+        self.use_candidate_reservoir = use_candidate_reservoir
+
+    def _generate(self, input_tracks_collection: TracksCollection, size: int) -> TracksCollection:
+        prefetcher = _StartArtistsPrefetcher(self._get_related_artists_tracks, self.prefetch_count, self.rng)
+        try:
+            return self._generate_with_prefetcher(input_tracks_collection, size, prefetcher)
+        finally:
+            prefetcher.close()
+
+    def _generate_with_prefetcher(self, input_tracks_collection: TracksCollection, size: int,
+                                  prefetcher: _StartArtistsPrefetcher) -> TracksCollection:
+        traemplist = IndexedTracksCollection()
+        reservoir = _CandidateReservoir(self.rng) if self.use_candidate_reservoir else None
+        unproductive_iterations_count = 0
         while True:
             if not input_tracks_collection:
                 self.logger.log_info("Input tracks collection is empty - generating done")
-                return traemplist
-            start_track = input_tracks_collection.get_random_track()
+                break
+            if reservoir is not None and self._are_iterations_unproductive(unproductive_iterations_count):
+                break
+            start_track = prefetcher.pick_start_track(input_tracks_collection)
+            prefetcher.prefetch(input_tracks_collection, start_track.artist)
             self.logger.log_info(f"Randomly picked track: '{start_track.artist.name} - {start_track.name}'")
             self.logger.log_info("Loading top related artists' tracks")
-            related_artists_tracks = list(self._get_related_artists_tracks(start_track.artist).get_tracks())
-            random.shuffle(related_artists_tracks)
+            related_artists_tracks = sorted(
+                prefetcher.get_related_artists_tracks(start_track.artist).get_tracks(),
+                key=lambda track: track.id
+            )
+            self.rng.shuffle(related_artists_tracks)
+            unheard_track_ids = set(self.history.filter_unheard([track.id for track in related_artists_tracks]))
+            accepted_track = None
             for track in related_artists_tracks:
-                if self._is_traemplist_candidate(track, traemplist):
-                    self.logger.log_info(f"'{track.artist.name} - {track.name}' seems like a good choice, adding")
-                    traemplist.add_track(track)
-                    if len(traemplist) >= size:
-                        return traemplist
+                if self._is_traemplist_candidate(track, traemplist, unheard_track_ids):
+                    self._accept_track(track, traemplist)
+                    accepted_track = track
                     break
+            if reservoir is not None:
+                reservoir.add_tracks(
+                    track for track in related_artists_tracks
+                    if track.id in unheard_track_ids and not traemplist.contains_artist_track(track.artist)
+                )
+                if accepted_track is not None:
+                    reservoir.remove_artist(accepted_track.artist)
+            if len(traemplist) >= size:
+                return traemplist
+            unproductive_iterations_count = 0 if accepted_track is not None else unproductive_iterations_count + 1
             input_tracks_collection.remove_artist_tracks(start_track.artist)
+        if reservoir is not None:
+            self._fill_from_reservoir(reservoir, traemplist, size)
+        return traemplist
+
+    def _are_iterations_unproductive(self, unproductive_iterations_count: int) -> bool:
+        if unproductive_iterations_count >= self.MAX_UNPRODUCTIVE_ITERATIONS_COUNT:
+            self.logger.log_info("Network iterations stopped finding new tracks - network iterations done")
+            return True
+        return False
+
+    def _fill_from_reservoir(self, reservoir: _CandidateReservoir, traemplist: TracksCollection, size: int) -> None:
+        self.logger.log_info(f"Filling remaining slots from {reservoir.artists_count()} reservoir artists")
+        while len(traemplist) < size:
+            track = reservoir.pop_random_track()
+            if track is None:
+                return
+            self._accept_track(track, traemplist)
 
     def _get_related_artists_tracks(self, artist: Artist) -> TracksCollection:
         related_artists_tracks = TracksCollection()
-        for related_artist in self.client.get_related_artists(artist_id=artist.id):
-            related_artists_tracks.add_tracks(
-                self.client.get_artist_top_tracks(artist_id=related_artist.id)
-            )
+        for top_tracks in self._get_artists_top_tracks(self._get_related_artists(artist)):
+            related_artists_tracks.add_tracks(top_tracks)
         return related_artists_tracks
 
-    def _is_traemplist_candidate(self, track: Track, traemplist: TracksCollection) -> bool:
-        if self.history.contains_track(track.id):
+    def _get_artists_top_tracks(self, artists: [Artist]) -> [TracksCollection]:
+        if self.workers_count == 1 or len(artists) < 2:
+            return [self._get_artist_top_tracks(artist) for artist in artists]
+        with ThreadPoolExecutor(max_workers=min(self.workers_count, len(artists))) as executor:
+            return list(executor.map(self._get_artist_top_tracks, artists))
+
+    def _is_traemplist_candidate(self, track: Track, traemplist: TracksCollection, unheard_track_ids: Set[str]) -> bool:
+        if track.id not in unheard_track_ids:
             self.logger.log_info(f"You've already heard '{track.artist.name} - {track.name}', skipping")
             return False
         if traemplist.contains_artist_track(track.artist):
@@ -54,6 +277,112 @@ class TraemplistGenerator:
         return True
 
 
+class RandomWalkTraemplistGenerator(GenerationStrategy):
+    """
+    Samples candidate artists by random walks with restart over the related artists graph: every walk starts
+    at a random input artist and follows up to walk_length related artists hops, picking closer related artists
+    (earlier in the related artists list) more often, and stopping early with the restart probability.
+    The top tracks of the walks' end artists are screened in batches. Every artist is loaded at most once per
+    generation and the generation stops after max_calls_per_track provider calls per requested track,
+    which keeps the calls per accepted track bounded.
+    """
+
+    DEFAULT_WALK_LENGTH = 3
+    DEFAULT_RESTART_PROBABILITY = 0.3
+    DEFAULT_WALKS_PER_BATCH = 10
+    DEFAULT_MAX_CALLS_PER_TRACK = 20
+    MAX_UNPRODUCTIVE_BATCHES_COUNT = 5
+
+    def __init__(self, client: RelatedArtistsProvider, history: TracksRepository, logger: Logger,
+                 walk_length: int = DEFAULT_WALK_LENGTH,
+                 restart_probability: float = DEFAULT_RESTART_PROBABILITY,
+                 walks_per_batch: int = DEFAULT_WALKS_PER_BATCH,
+                 max_calls_per_track: int = DEFAULT_MAX_CALLS_PER_TRACK,
+                 rng: Optional[random.Random] = None):
+        """
+        :raises TraemplistGeneratorException
+        """
+        if walk_length < 1 or walks_per_batch < 1 or max_calls_per_track < 1 or not 0 <= restart_probability < 1:
+            raise InvalidRandomWalkParametersError
+        super().__init__(client, history, logger, rng)
+        self.walk_length = walk_length
+        self.restart_probability = restart_probability
+        self.walks_per_batch = walks_per_batch
+        self.max_calls_per_track = max_calls_per_track
+        self.related_artists: Dict[str, List[Artist]] = {}
+        self.top_tracks: Dict[str, List[Track]] = {}
+
+    def _generate(self, input_tracks_collection: TracksCollection, size: int) -> TracksCollection:
+        traemplist = IndexedTracksCollection()
+        self.related_artists = {}
+        self.top_tracks = {}
+        start_artists = sorted(
+            {track.artist.id: track.artist for track in input_tracks_collection.get_tracks()}.values(),
+            key=lambda artist: artist.id
+        )
+        if not start_artists:
+            self.logger.log_info("Input tracks collection is empty - generating done")
+            return traemplist
+        max_calls_count = self.max_calls_per_track * max(size, 1)
+        unproductive_batches_count = 0
+        while unproductive_batches_count < self.MAX_UNPRODUCTIVE_BATCHES_COUNT:
+            if self.metrics.get_calls_count() >= max_calls_count:
+                self.logger.log_info("Provider calls limit reached - generating done")
+                return traemplist
+            candidates = self._get_candidates_batch(start_artists, traemplist)
+            unheard_track_ids = set(self.history.filter_unheard([track.id for track in candidates]))
+            accepted_tracks_count = len(traemplist)
+            for track in candidates:
+                if track.id in unheard_track_ids and track not in input_tracks_collection \
+                        and not traemplist.contains_artist_track(track.artist):
+                    self._accept_track(track, traemplist)
+                    if len(traemplist) >= size:
+                        return traemplist
+            if len(traemplist) > accepted_tracks_count:
+                unproductive_batches_count = 0
+            else:
+                unproductive_batches_count += 1
+        self.logger.log_info("Random walks stopped finding new tracks - generating done")
+        return traemplist
+
+    def _get_candidates_batch(self, start_artists: [Artist], traemplist: TracksCollection) -> [Track]:
+        candidates = []
+        for _ in range(self.walks_per_batch):
+            artist = self._walk(self.rng.choice(start_artists))
+            if artist is not None and not traemplist.contains_artist_track(artist):
+                top_tracks = self._get_cached_artist_top_tracks(artist)
+                if top_tracks:
+                    candidates.append(self.rng.choice(top_tracks))
+        return candidates
+
+    def _walk(self, start_artist: Artist) -> Optional[Artist]:
+        artist = start_artist
+        for hop in range(self.walk_length):
+            if hop > 0 and self.rng.random() < self.restart_probability:
+                break
+            related_artists = self._get_cached_related_artists(artist)
+            if not related_artists:
+                break
+            artist = self.rng.choices(
+                related_artists,
+                weights=[1 / (position + 1) for position in range(len(related_artists))]
+            )[0]
+        return artist if artist.id != start_artist.id else None
+
+    def _get_cached_related_artists(self, artist: Artist) -> [Artist]:
+        if artist.id not in self.related_artists:
+            self.related_artists[artist.id] = self._get_related_artists(artist)
+        return self.related_artists[artist.id]
+
+    def _get_cached_artist_top_tracks(self, artist: Artist) -> [Track]:
+        if artist.id not in self.top_tracks:
+            self.top_tracks[artist.id] = sorted(
+                self._get_artist_top_tracks(artist).get_tracks(),
+                key=lambda track: track.id
+            )
+        return self.top_tracks[artist.id]
+
+
 class TraemplistGeneratorException(Exception):
     pass
 
@@ -62,3 +391,22 @@ class InvalidTraemplistSizeError(TraemplistGeneratorException):
 
     def __str__(self) -> str:
         return "Traemplist size must be a positive integer"
+
+
+class InvalidWorkersCountError(TraemplistGeneratorException):
+
+    def __str__(self) -> str:
+        return "Workers count must be a positive integer"
+
+
+class InvalidPrefetchCountError(TraemplistGeneratorException):
+
+    def __str__(self) -> str:
+        return "Prefetch count must be a non-negative integer"
+
+
+class InvalidRandomWalkParametersError(TraemplistGeneratorException):
+
+    def __str__(self) -> str:
+        return "Walk length, walks per batch and max calls per track must be positive integers " \
+               "and restart probability must be in [0, 1)"
@@ -0,0 +1,379 @@
+import json
+import sqlite3
+import time
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, Dict, Callable, TypeVar, Tuple, List
+
+from traemplist.client import RelatedArtistsProvider, TracksCollection, Artist, Track
+from traemplist.logger import Logger
+from traemplist.sqlite import SqLiteConnections
+
+T = TypeVar("T")
+
+
+class ArtistGraph(RelatedArtistsProvider):
+    """
+    Local artist similarity graph: related artists adjacency lists and top tracks per artist.
+    Artists which haven't been crawled have no related artists and no top tracks.
+    """
+
+    @abstractmethod
+    def save_related_artists(self, artist: Artist, related_artists: [Artist]) -> None:
+        pass
+
+    @abstractmethod
+    def save_artist_top_tracks(self, artist: Artist, top_tracks: TracksCollection) -> None:
+        pass
+
+    @abstractmethod
+    def get_related_artists_updated_at(self, artist_id: str) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def get_artist_top_tracks_updated_at(self, artist_id: str) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def artists_count(self) -> int:
+        pass
+
+
+class SqLiteArtistGraph(ArtistGraph):
+
+    def __init__(self, db_file_path: str):
+        self.db_file_path = db_file_path
+        self.lock = Lock()
+        self.connections = SqLiteConnections(db_file_path)
+        self._init_tables()
+
+    def get_related_artists(self, artist_id: str) -> [Artist]:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return [
+                Artist(id=row[0], name=row[1])
+                for row in cursor.execute(
+                    """
+                    SELECT artists.id, artists.name FROM related_artists
+                    JOIN artists ON artists.id = related_artists.related_artist_id
+                    WHERE related_artists.artist_id = ?
+                    ORDER BY related_artists.position
+                    """,
+                    (artist_id,)
+                )
+            ]
+
+    def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "SELECT top_tracks FROM artists WHERE id = ?",
+                (artist_id,)
+            ).fetchone()
+        top_tracks = TracksCollection()
+        if row is None or row[0] is None:
+            return top_tracks
+        artists = {}
+        for track_id, track_name, track_artist_id, track_artist_name in json.loads(row[0]):
+            top_tracks.add_track(
+                Track(
+                    id=track_id,
+                    name=track_name,
+                    artist=artists.setdefault(track_artist_id, Artist(id=track_artist_id, name=track_artist_name))
+                )
+            )
+        return top_tracks
+
+    def save_related_artists(self, artist: Artist, related_artists: [Artist]) -> None:
+        self.lock.acquire()
+        try:
+            with self._get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.executemany(
+                    """
+                    INSERT INTO artists(id, name) VALUES (?, ?)
+                    ON CONFLICT(id) DO UPDATE SET name = excluded.name
+                    """,
+                    [(saved_artist.id, saved_artist.name) for saved_artist in [artist] + related_artists]
+                )
+                cursor.execute("DELETE FROM related_artists WHERE artist_id = ?", (artist.id,))
+                cursor.executemany(
+                    "INSERT INTO related_artists(artist_id, position, related_artist_id) VALUES (?, ?, ?)",
+                    [
+                        (artist.id, position, related_artist.id)
+                        for position, related_artist in enumerate(related_artists)
+                    ]
+                )
+                cursor.execute(
+                    "UPDATE artists SET related_updated_at = ? WHERE id = ?",
+                    (time.time(), artist.id)
+                )
+        finally:
+            self.lock.release()
+
+    def save_artist_top_tracks(self, artist: Artist, top_tracks: TracksCollection) -> None:
+        self.lock.acquire()
+        try:
+            with self._get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    INSERT INTO artists(id, name, top_tracks, top_tracks_updated_at) VALUES (?, ?, ?, ?)
+                    ON CONFLICT(id) DO UPDATE SET
+                        name = excluded.name,
+                        top_tracks = excluded.top_tracks,
+                        top_tracks_updated_at = excluded.top_tracks_updated_at
+                    """,
+                    (
+                        artist.id,
+                        artist.name,
+                        json.dumps([
+                            [track.id, track.name, track.artist.id, track.artist.name]
+                            for track in top_tracks.get_tracks()
+                        ]),
+                        time.time()
+                    )
+                )
+        finally:
+            self.lock.release()
+
+    def get_related_artists_updated_at(self, artist_id: str) -> Optional[float]:
+        return self._get_artist_column(artist_id, "related_updated_at")
+
+    def get_artist_top_tracks_updated_at(self, artist_id: str) -> Optional[float]:
+        return self._get_artist_column(artist_id, "top_tracks_updated_at")
+
+    def artists_count(self) -> int:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return cursor.execute("SELECT COUNT(*) FROM artists").fetchone()[0]
+
+    def close(self) -> None:
+        self.connections.close()
+
+    def _get_artist_column(self, artist_id: str, column: str) -> Optional[object]:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                f"SELECT {column} FROM artists WHERE id = ?",
+                (artist_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def _init_tables(self):
+        self.lock.acquire()
+        try:
+            with self._get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS artists (
+                        id TEXT PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        related_updated_at REAL,
+                        top_tracks TEXT,
+                        top_tracks_updated_at REAL
+                    )
+                    """
+                )
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS related_artists (
+                        artist_id TEXT NOT NULL,
+                        position INTEGER NOT NULL,
+                        related_artist_id TEXT NOT NULL,
+                        PRIMARY KEY (artist_id, position)
+                    )
+                    """
+                )
+        finally:
+            self.lock.release()
+
+    def _get_connection(self) -> sqlite3.Connection:
+        return self.connections.get()
+
+
+class InMemoryArtistGraph(ArtistGraph):
+
+    def __init__(self):
+        self.artists: Dict[str, Artist] = {}
+        self.related_artist_ids: Dict[str, [str]] = {}
+        self.related_updated_at: Dict[str, float] = {}
+        self.top_tracks: Dict[str, TracksCollection] = {}
+        self.top_tracks_updated_at: Dict[str, float] = {}
+        self.lock = Lock()
+
+    def get_related_artists(self, artist_id: str) -> [Artist]:
+        self.lock.acquire()
+        try:
+            return [
+                self.artists[related_artist_id]
+                for related_artist_id in self.related_artist_ids.get(artist_id, [])
+            ]
+        finally:
+            self.lock.release()
+
+    def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
+        self.lock.acquire()
+        try:
+            return TracksCollection().add_tracks(self.top_tracks.get(artist_id, TracksCollection()))
+        finally:
+            self.lock.release()
+
+    def save_related_artists(self, artist: Artist, related_artists: [Artist]) -> None:
+        self.lock.acquire()
+        try:
+            for saved_artist in [artist] + related_artists:
+                self.artists[saved_artist.id] = saved_artist
+            self.related_artist_ids[artist.id] = [related_artist.id for related_artist in related_artists]
+            self.related_updated_at[artist.id] = time.time()
+        finally:
+            self.lock.release()
+
+    def save_artist_top_tracks(self, artist: Artist, top_tracks: TracksCollection) -> None:
+        self.lock.acquire()
+        try:
+            self.artists[artist.id] = artist
+            self.top_tracks[artist.id] = TracksCollection().add_tracks(top_tracks)
+            self.top_tracks_updated_at[artist.id] = time.time()
+        finally:
+            self.lock.release()
+
+    def get_related_artists_updated_at(self, artist_id: str) -> Optional[float]:
+        return self.related_updated_at.get(artist_id)
+
+    def get_artist_top_tracks_updated_at(self, artist_id: str) -> Optional[float]:
+        return self.top_tracks_updated_at.get(artist_id)
+
+    def artists_count(self) -> int:
+        self.lock.acquire()
+        try:
+            return len(self.artists)
+        finally:
+            self.lock.release()
+
+
+class ArtistGraphFallbackProvider(RelatedArtistsProvider):
+    """
+    Answers from the artist graph, falling back to the client for the artists whose related artists or top tracks
+    haven't been crawled (e.g. a new account or artists liked since the last crawl).
+    """
+
+    def __init__(self, graph: ArtistGraph, client: RelatedArtistsProvider):
+        self.graph = graph
+        self.client = client
+
+    def get_related_artists(self, artist_id: str) -> [Artist]:
+        if self.graph.get_related_artists_updated_at(artist_id) is None:
+            return self.client.get_related_artists(artist_id=artist_id)
+        return self.graph.get_related_artists(artist_id)
+
+    def get_artist_top_tracks(self, artist_id: str) -> TracksCollection:
+        if self.graph.get_artist_top_tracks_updated_at(artist_id) is None:
+            return self.client.get_artist_top_tracks(artist_id=artist_id)
+        return self.graph.get_artist_top_tracks(artist_id)
+
+
+@dataclass(frozen=True)
+class ArtistGraphCrawlResult:
+    related_artists_fetched_count: int
+    top_tracks_fetched_count: int
+
+
+class ArtistGraphCrawler:
+    """
+    Fills the artist graph breadth first from the start artists: every crawled level fetches the related artists
+    of its artists and the top tracks of those related artists, which is what the generator walks through.
+    Nodes fetched within max_age seconds are not fetched again.
+    """
+
+    DEFAULT_MAX_AGE = 30 * 24 * 3600
+
+    def __init__(self, client: RelatedArtistsProvider, graph: ArtistGraph, logger: Logger,
+                 workers_count: int = 1, max_age: int = DEFAULT_MAX_AGE):
+        """
+        :raises ArtistGraphException
+        """
+        if workers_count < 1:
+            raise InvalidCrawlWorkersCountError
+        self.client = client
+        self.graph = graph
+        self.logger = logger
+        self.workers_count = workers_count
+        self.max_age = max_age
+
+    def crawl(self, start_artists: [Artist], depth: int) -> ArtistGraphCrawlResult:
+        """
+        :raises ArtistGraphException
+        """
+        if depth < 1:
+            raise InvalidCrawlDepthError
+        related_artists_fetched_count = 0
+        top_tracks_fetched_count = 0
+        visited_artist_ids = set()
+        level_artists = []
+        for artist in start_artists:
+            if artist.id not in visited_artist_ids:
+                visited_artist_ids.add(artist.id)
+                level_artists.append(artist)
+        for level in range(depth):
+            self.logger.log_info(f"Crawling level {level + 1}: {len(level_artists)} artists")
+            related_artists = {}
+            for is_fetched, artist_related_artists in self._map(self._crawl_related_artists, level_artists):
+                related_artists_fetched_count += is_fetched
+                for related_artist in artist_related_artists:
+                    related_artists[related_artist.id] = related_artist
+            top_tracks_fetched_count += sum(self._map(self._crawl_artist_top_tracks, list(related_artists.values())))
+            level_artists = []
+            for related_artist in related_artists.values():
+                if related_artist.id not in visited_artist_ids:
+                    visited_artist_ids.add(related_artist.id)
+                    level_artists.append(related_artist)
+        self.logger.log_info(
+            f"Artist graph crawled ({related_artists_fetched_count} related artists and "
+            f"{top_tracks_fetched_count} top tracks lists fetched, {self.graph.artists_count()} artists in graph)"
+        )
+        return ArtistGraphCrawlResult(
+            related_artists_fetched_count=related_artists_fetched_count,
+            top_tracks_fetched_count=top_tracks_fetched_count
+        )
+
+    def _crawl_related_artists(self, artist: Artist) -> Tuple[bool, List[Artist]]:
+        if self._is_fresh(self.graph.get_related_artists_updated_at(artist.id)):
+            return False, self.graph.get_related_artists(artist.id)
+        related_artists = self.client.get_related_artists(artist_id=artist.id)
+        self.graph.save_related_artists(artist, related_artists)
+        return True, related_artists
+
+    def _crawl_artist_top_tracks(self, artist: Artist) -> bool:
+        if self._is_fresh(self.graph.get_artist_top_tracks_updated_at(artist.id)):
+            return False
+        self.graph.save_artist_top_tracks(artist, self.client.get_artist_top_tracks(artist_id=artist.id))
+        return True
+
+    def _is_fresh(self, updated_at: Optional[float]) -> bool:
+        return updated_at is not None and time.time() - updated_at < self.max_age
+
+    def _map(self, function: Callable[[Artist], T], artists: [Artist]) -> [T]:
+        if self.workers_count == 1 or len(artists) < 2:
+            return [function(artist) for artist in artists]
+        with ThreadPoolExecutor(max_workers=min(self.workers_count, len(artists))) as executor:
+            return list(executor.map(function, artists))
+
+
+class ArtistGraphException(Exception):
+    pass
+
+
+class InvalidCrawlDepthError(ArtistGraphException):
+
+    def __str__(self) -> str:
+        return "Crawl depth must be a positive integer"
+
+
+class InvalidCrawlWorkersCountError(ArtistGraphException):
+
+    def __str__(self) -> str:
+        return "Crawl workers count must be a positive integer"
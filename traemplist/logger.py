@@ -20,3 +20,23 @@ class StandardOutputLogger(Logger):
 
     def log_error(self, message: str):
         print(message, file=sys.stderr, flush=True)
+
+
+class BufferedLogger(Logger):
+
+    def __init__(self):
+        self.messages = []
+
+    def log_info(self, message: str):
+        self.messages.append((False, message))
+
+    def log_error(self, message: str):
+        self.messages.append((True, message))
+
+    def flush(self, logger: Logger, prefix: str = "") -> None:
+        for is_error, message in self.messages:
+            if is_error:
+                logger.log_error(f"{prefix}{message}")
+            else:
+                logger.log_info(f"{prefix}{message}")
+        self.messages = []
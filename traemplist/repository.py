@@ -1,7 +1,11 @@
 import sqlite3
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from itertools import islice
 from threading import Lock
+from typing import Iterable, Optional
+
+from traemplist.sqlite import SqLiteConnections
 
 
 @dataclass(frozen=True)
@@ -9,68 +13,269 @@ class TrackRecord:
     id: str
 
 
+@dataclass(frozen=True)
+class LikedTrackRecord:
+    id: str
+    name: str
+    artist_id: str
+    artist_name: str
+    added_at: str
+
+
+@dataclass(frozen=True)
+class SaveTracksResult:
+    inserted_count: int
+    existing_count: int
+
+
 class TracksRepository(ABC):
 
     @abstractmethod
-    def save_tracks(self, tracks: [TrackRecord]) -> None:
+    def save_tracks(self, tracks: Iterable[TrackRecord]) -> SaveTracksResult:
         pass
 
     @abstractmethod
     def contains_track(self, track_id: str) -> bool:
         pass
 
+    @abstractmethod
+    def filter_unheard(self, track_ids: [str]) -> [str]:
+        pass
+
     @abstractmethod
     def tracks_total_count(self) -> int:
         pass
 
+    @abstractmethod
+    def get_recently_played_cursor(self) -> Optional[int]:
+        pass
+
+    @abstractmethod
+    def save_recently_played_cursor(self, cursor: int) -> None:
+        pass
+
+    @abstractmethod
+    def get_playlist_snapshot_id(self, playlist_id: str) -> Optional[str]:
+        pass
+
+    @abstractmethod
+    def save_playlist_snapshot_id(self, playlist_id: str, snapshot_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_liked_tracks(self) -> [LikedTrackRecord]:
+        """
+        Returns the liked tracks mirror, most recently added first.
+        """
+        pass
+
+    @abstractmethod
+    def contains_liked_track(self, track_id: str, added_at: str) -> bool:
+        pass
+
+    @abstractmethod
+    def save_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
+        pass
+
+    @abstractmethod
+    def replace_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
+        pass
+
+    @abstractmethod
+    def get_liked_tracks_reconciled_at(self) -> Optional[float]:
+        pass
+
+    @abstractmethod
+    def save_liked_tracks_reconciled_at(self, reconciled_at: float) -> None:
+        pass
+
 
 class SqLiteTracksRepository(TracksRepository):
 
+    QUERY_PARAMETERS_LIMIT = 500
+    RECENTLY_PLAYED_CURSOR_KEY = "recently_played_cursor"
+    LIKED_TRACKS_RECONCILED_AT_KEY = "liked_tracks_reconciled_at"
+    SAVE_TRACKS_CHUNK_SIZE = 10000
+    CACHE_SIZE_KIB = 16384
+
     def __init__(self, db_file_path: str):
         self.db_file_path = db_file_path
         self.lock = Lock()
-        self._init_tracks_table()
+        self.connections = SqLiteConnections(db_file_path, cache_size_kib=self.CACHE_SIZE_KIB)
+        self._init_tables()
+
+    def save_tracks(self, tracks: Iterable[TrackRecord]) -> SaveTracksResult:
+        tracks_iterator = iter(tracks)
+        inserted_count = 0
+        saved_count = 0
+        self.lock.acquire()
+        try:
+            connection = self._get_connection()
+            with connection:
+                cursor = connection.cursor()
+                while True:
+                    chunk = [(track.id,) for track in islice(tracks_iterator, self.SAVE_TRACKS_CHUNK_SIZE)]
+                    if not chunk:
+                        break
+                    total_changes = connection.total_changes
+                    cursor.executemany(
+                        "INSERT INTO tracks(id) VALUES (?) ON CONFLICT(id) DO NOTHING",
+                        chunk
+                    )
+                    inserted_count += connection.total_changes - total_changes
+                    saved_count += len(chunk)
+        finally:
+            self.lock.release()
+        return SaveTracksResult(
+            inserted_count=inserted_count,
+            existing_count=saved_count - inserted_count
+        )
+
+    def contains_track(self, track_id: str) -> bool:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return cursor.execute(
+                "SELECT COUNT(*) FROM tracks WHERE id = ?",
+                (track_id,)
+            ).fetchone()[0] > 0
+
+    def filter_unheard(self, track_ids: [str]) -> [str]:
+        heard_track_ids = set()
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            for offset in range(0, len(track_ids), self.QUERY_PARAMETERS_LIMIT):
+                chunk = track_ids[offset:offset + self.QUERY_PARAMETERS_LIMIT]
+                placeholders = ",".join("?" * len(chunk))
+                for row in cursor.execute(f"SELECT id FROM tracks WHERE id IN ({placeholders})", chunk):
+                    heard_track_ids.add(row[0])
+        return [track_id for track_id in track_ids if track_id not in heard_track_ids]
+
+    def tracks_total_count(self) -> int:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return cursor.execute(
+                "SELECT COUNT(*) FROM tracks"
+            ).fetchone()[0]
+
+    def get_recently_played_cursor(self) -> Optional[int]:
+        cursor = self._get_sync_state(self.RECENTLY_PLAYED_CURSOR_KEY)
+        return int(cursor) if cursor is not None else None
+
+    def save_recently_played_cursor(self, cursor: int) -> None:
+        self._save_sync_state(self.RECENTLY_PLAYED_CURSOR_KEY, str(cursor))
 
-    def save_tracks(self, tracks: [TrackRecord]) -> None:
-        if not tracks:
-            return
+    def get_playlist_snapshot_id(self, playlist_id: str) -> Optional[str]:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "SELECT snapshot_id FROM playlist_snapshots WHERE playlist_id = ?",
+                (playlist_id,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def save_playlist_snapshot_id(self, playlist_id: str, snapshot_id: str) -> None:
         self.lock.acquire()
         try:
             with self._get_connection() as connection:
                 cursor = connection.cursor()
-                values = ",".join([f"('{track.id}')" for track in tracks])
                 cursor.execute(
-                    f"""
-                    INSERT INTO tracks(id) VALUES {values}
-                    ON CONFLICT(id) DO NOTHING
                     """
+                    INSERT INTO playlist_snapshots(playlist_id, snapshot_id) VALUES (?, ?)
+                    ON CONFLICT(playlist_id) DO UPDATE SET snapshot_id = excluded.snapshot_id
+                    """,
+                    (playlist_id, snapshot_id)
                 )
         finally:
             self.lock.release()
 
-    def contains_track(self, track_id: str) -> bool:
+    def get_liked_tracks(self) -> [LikedTrackRecord]:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return [
+                LikedTrackRecord(*row)
+                for row in cursor.execute(
+                    """
+                    SELECT id, name, artist_id, artist_name, added_at FROM liked_tracks
+                    ORDER BY added_at DESC, rowid
+                    """
+                )
+            ]
+
+    def contains_liked_track(self, track_id: str, added_at: str) -> bool:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            return cursor.execute(
+                "SELECT COUNT(*) FROM liked_tracks WHERE id = ? AND added_at = ?",
+                (track_id, added_at)
+            ).fetchone()[0] > 0
+
+    def save_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
+        self.lock.acquire()
+        try:
+            with self._get_connection() as connection:
+                self._insert_liked_tracks(connection.cursor(), tracks)
+        finally:
+            self.lock.release()
+
+    def replace_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
         self.lock.acquire()
         try:
             with self._get_connection() as connection:
                 cursor = connection.cursor()
-                return cursor.execute(
-                    f"SELECT COUNT(*) FROM tracks WHERE id = '{track_id}'"
-                ).fetchone()[0] > 0
+                cursor.execute("DELETE FROM liked_tracks")
+                self._insert_liked_tracks(cursor, tracks)
         finally:
             self.lock.release()
 
-    def tracks_total_count(self) -> int:
+    def get_liked_tracks_reconciled_at(self) -> Optional[float]:
+        reconciled_at = self._get_sync_state(self.LIKED_TRACKS_RECONCILED_AT_KEY)
+        return float(reconciled_at) if reconciled_at is not None else None
+
+    def save_liked_tracks_reconciled_at(self, reconciled_at: float) -> None:
+        self._save_sync_state(self.LIKED_TRACKS_RECONCILED_AT_KEY, str(reconciled_at))
+
+    def close(self) -> None:
+        self.connections.close()
+
+    @staticmethod
+    def _insert_liked_tracks(cursor: sqlite3.Cursor, tracks: Iterable[LikedTrackRecord]) -> None:
+        cursor.executemany(
+            """
+            INSERT INTO liked_tracks(id, name, artist_id, artist_name, added_at) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(id) DO UPDATE SET
+                name = excluded.name,
+                artist_id = excluded.artist_id,
+                artist_name = excluded.artist_name,
+                added_at = excluded.added_at
+            """,
+            ((track.id, track.name, track.artist_id, track.artist_name, track.added_at) for track in tracks)
+        )
+
+    def _get_sync_state(self, key: str) -> Optional[str]:
+        with self._get_connection() as connection:
+            cursor = connection.cursor()
+            row = cursor.execute(
+                "SELECT value FROM sync_state WHERE key = ?",
+                (key,)
+            ).fetchone()
+            return row[0] if row else None
+
+    def _save_sync_state(self, key: str, value: str) -> None:
         self.lock.acquire()
         try:
             with self._get_connection() as connection:
                 cursor = connection.cursor()
-                return cursor.execute(
-                    f"SELECT COUNT(*) FROM tracks"
-                ).fetchone()[0]
+                cursor.execute(
+                    """
+                    INSERT INTO sync_state(key, value) VALUES (?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                    """,
+                    (key, value)
+                )
         finally:
             self.lock.release()
 
-    def _init_tracks_table(self):
+    def _init_tables(self):
         self.lock.acquire()
         try:
             with self._get_connection() as connection:
@@ -82,29 +287,70 @@ class SqLiteTracksRepository(TracksRepository):
                     )
                     """
                 )
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS sync_state (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL
+                    )
+                    """
+                )
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS playlist_snapshots (
+                        playlist_id TEXT PRIMARY KEY,
+                        snapshot_id TEXT NOT NULL
+                    )
+                    """
+                )
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS liked_tracks (
+                        id TEXT PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        artist_id TEXT NOT NULL,
+                        artist_name TEXT NOT NULL,
+                        added_at TEXT NOT NULL
+                    )
+                    """
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS liked_tracks_added_at ON liked_tracks(added_at)"
+                )
         finally:
             self.lock.release()
 
-    def _get_connection(self):
-        return sqlite3.connect(self.db_file_path)
+    def _get_connection(self) -> sqlite3.Connection:
+        return self.connections.get()
 
 
 class InMemoryTracksRepository(TracksRepository):
 
     def __init__(self):
-        self.tracks = []
+        self.tracks = {}
+        self.recently_played_cursor = None
+        self.playlist_snapshot_ids = {}
+        self.liked_tracks = {}
+        self.liked_tracks_reconciled_at = None
         self.lock = Lock()
 
-    def save_tracks(self, tracks: [TrackRecord]) -> None:
-        if not tracks:
-            return
+    def save_tracks(self, tracks: Iterable[TrackRecord]) -> SaveTracksResult:
+        inserted_count = 0
+        existing_count = 0
         self.lock.acquire()
         try:
             for track in tracks:
-                if not self._contains_track(track.id, use_lock=False):
-                    self.tracks.append(track)
+                if self._contains_track(track.id, use_lock=False):
+                    existing_count += 1
+                else:
+                    self.tracks[track.id] = track
+                    inserted_count += 1
         finally:
             self.lock.release()
+        return SaveTracksResult(
+            inserted_count=inserted_count,
+            existing_count=existing_count
+        )
 
     def contains_track(self, track_id: str) -> bool:
         return self._contains_track(track_id, use_lock=True)
@@ -113,14 +359,18 @@ class InMemoryTracksRepository(TracksRepository):
         if use_lock:
             self.lock.acquire()
         try:
-            for track in self.tracks:
-                if track.id == track_id:
-                    return True
-            return False
+            return track_id in self.tracks
         finally:
             if use_lock:
                 self.lock.release()
 
+    def filter_unheard(self, track_ids: [str]) -> [str]:
+        self.lock.acquire()
+        try:
+            return [track_id for track_id in track_ids if track_id not in self.tracks]
+        finally:
+            self.lock.release()
+
     def tracks_total_count(self) -> int:
         self.lock.acquire()
         try:
@@ -128,6 +378,54 @@ class InMemoryTracksRepository(TracksRepository):
         finally:
             self.lock.release()
 
+    def get_recently_played_cursor(self) -> Optional[int]:
+        return self.recently_played_cursor
+
+    def save_recently_played_cursor(self, cursor: int) -> None:
+        self.recently_played_cursor = cursor
+
+    def get_playlist_snapshot_id(self, playlist_id: str) -> Optional[str]:
+        return self.playlist_snapshot_ids.get(playlist_id)
+
+    def save_playlist_snapshot_id(self, playlist_id: str, snapshot_id: str) -> None:
+        self.playlist_snapshot_ids[playlist_id] = snapshot_id
+
+    def get_liked_tracks(self) -> [LikedTrackRecord]:
+        self.lock.acquire()
+        try:
+            return sorted(self.liked_tracks.values(), key=lambda track: track.added_at, reverse=True)
+        finally:
+            self.lock.release()
+
+    def contains_liked_track(self, track_id: str, added_at: str) -> bool:
+        self.lock.acquire()
+        try:
+            liked_track = self.liked_tracks.get(track_id)
+            return liked_track is not None and liked_track.added_at == added_at
+        finally:
+            self.lock.release()
+
+    def save_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
+        self.lock.acquire()
+        try:
+            for track in tracks:
+                self.liked_tracks[track.id] = track
+        finally:
+            self.lock.release()
+
+    def replace_liked_tracks(self, tracks: Iterable[LikedTrackRecord]) -> None:
+        self.lock.acquire()
+        try:
+            self.liked_tracks = {track.id: track for track in tracks}
+        finally:
+            self.lock.release()
+
+    def get_liked_tracks_reconciled_at(self) -> Optional[float]:
+        return self.liked_tracks_reconciled_at
+
+    def save_liked_tracks_reconciled_at(self, reconciled_at: float) -> None:
+        self.liked_tracks_reconciled_at = reconciled_at
+
 
 class TracksRepositoryException(Exception):
     pass
@@ -0,0 +1,74 @@
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from threading import Lock
+from typing import Callable, Optional
+from traemplist.config import Config, TraemplistConfig
+from traemplist.logger import Logger, BufferedLogger
+
+
+@dataclass(frozen=True)
+class AccountRunResult:
+    client_id: str
+    error: Optional[Exception]
+
+    def is_failed(self) -> bool:
+        return self.error is not None
+
+
+class AccountsRunner:
+
+    def __init__(self, config: Config, logger: Logger, concurrency: int = 1):
+        """
+        :raises AccountsRunnerException
+        """
+        if concurrency < 1:
+            raise InvalidConcurrencyError
+        self.config = config
+        self.logger = logger
+        self.concurrency = concurrency
+        self.logger_lock = Lock()
+
+    def run(self, account_job: Callable[[TraemplistConfig, Logger], None]) -> [AccountRunResult]:
+        """
+        Runs the job for every configured account, each with its own logger whose messages are flushed
+        at once when the account is done. Failed accounts don't stop the other ones.
+        """
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            results = list(executor.map(
+                lambda traemplist_config: self._run_account(traemplist_config, account_job),
+                self.config.get_traemplist_configs()
+            ))
+        failed_client_ids = [result.client_id for result in results if result.is_failed()]
+        if failed_client_ids:
+            self.logger.log_error(f"Failed accounts: {', '.join(failed_client_ids)}")
+        else:
+            self.logger.log_info(f"All {len(results)} accounts have been processed")
+        return results
+
+    def _run_account(self, traemplist_config: TraemplistConfig,
+                     account_job: Callable[[TraemplistConfig, Logger], None]) -> AccountRunResult:
+        client_id = traemplist_config.account.credentials.client_id
+        account_logger = BufferedLogger()
+        error = None
+        try:
+            account_job(traemplist_config, account_logger)
+        except Exception as e:
+            account_logger.log_error(f"Account has failed: {e}\n{traceback.format_exc()}")
+            error = e
+        self.logger_lock.acquire()
+        try:
+            account_logger.flush(self.logger, prefix=f"[{client_id}] ")
+        finally:
+            self.logger_lock.release()
+        return AccountRunResult(client_id=client_id, error=error)
+
+
+class AccountsRunnerException(Exception):
+    pass
+
+
+class InvalidConcurrencyError(AccountsRunnerException):
+
+    def __str__(self) -> str:
+        return "Concurrency must be a positive integer"
@@ -0,0 +1,130 @@
+import heapq
+import random
+import time
+from itertools import count
+from threading import Condition
+from typing import Callable, TypeVar
+from spotipy.client import SpotifyException
+
+T = TypeVar("T")
+
+
+class SpotifyRequestScheduler:
+    """
+    Lets requests through at a limited rate (token bucket), highest priority first, and retries the throttled
+    and failed ones. A 429 response pauses all requests for its Retry-After time. Server errors are retried only
+    with retry_server_errors, since a non-idempotent request may have been applied before the error.
+    """
+
+    WRITE_PRIORITY = 0
+    READ_PRIORITY = 1
+    THROTTLED_STATUS_CODE = 429
+    SERVER_ERROR_STATUS_CODES = (500, 502, 503, 504)
+    DEFAULT_RETRY_AFTER = 1
+
+    def __init__(self, rate: float = 50, burst: int = 50, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 30):
+        """
+        :raises SpotifyRequestSchedulerException
+        """
+        if rate <= 0 or burst < 1:
+            raise InvalidRateError
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiting_requests = []
+        self.requests_sequence = count()
+        self.throttled_count = 0
+        self.retries_count = 0
+        self.condition = Condition()
+
+    def execute(self, request: Callable[[], T], priority: int = READ_PRIORITY,
+                retry_server_errors: bool = True) -> T:
+        attempt = 0
+        while True:
+            self._acquire(priority)
+            try:
+                return request()
+            except SpotifyException as e:
+                if not self._is_retried(e, retry_server_errors) or attempt >= self.max_retries:
+                    raise
+                self._handle_retry(e, attempt)
+                attempt += 1
+
+    def get_queue_depth(self) -> int:
+        with self.condition:
+            return len(self.waiting_requests)
+
+    def get_throttled_count(self) -> int:
+        with self.condition:
+            return self.throttled_count
+
+    def get_retries_count(self) -> int:
+        with self.condition:
+            return self.retries_count
+
+    def _acquire(self, priority: int) -> None:
+        ticket = (priority, next(self.requests_sequence))
+        with self.condition:
+            heapq.heappush(self.waiting_requests, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    timeout = None
+                    if self.waiting_requests[0] == ticket:
+                        if now < self.blocked_until:
+                            timeout = self.blocked_until - now
+                        elif self.tokens >= 1:
+                            self.tokens -= 1
+                            return
+                        else:
+                            timeout = (1 - self.tokens) / self.rate
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting_requests.remove(ticket)
+                heapq.heapify(self.waiting_requests)
+                self.condition.notify_all()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def _is_retried(self, error: SpotifyException, retry_server_errors: bool) -> bool:
+        if error.http_status == self.THROTTLED_STATUS_CODE:
+            return True
+        return retry_server_errors and error.http_status in self.SERVER_ERROR_STATUS_CODES
+
+    def _handle_retry(self, error: SpotifyException, attempt: int) -> None:
+        if error.http_status == self.THROTTLED_STATUS_CODE:
+            retry_after = self._get_retry_after(error)
+            with self.condition:
+                self.throttled_count += 1
+                self.retries_count += 1
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+                self.condition.notify_all()
+        else:
+            with self.condition:
+                self.retries_count += 1
+            time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt)))
+
+    def _get_retry_after(self, error: SpotifyException) -> float:
+        try:
+            return float(error.headers.get("Retry-After", self.DEFAULT_RETRY_AFTER))
+        except (TypeError, ValueError):
+            return self.DEFAULT_RETRY_AFTER
+
+
+class SpotifyRequestSchedulerException(Exception):
+    pass
+
+
+class InvalidRateError(SpotifyRequestSchedulerException):
+
+    def __str__(self) -> str:
+        return "Rate must be a positive number and burst a positive integer"
@@ -1,8 +1,14 @@
+import time
+from functools import partial
+from typing import Optional
 from traemplist.config import Config, TraemplistConfig
-from traemplist.client import SpotifyClient, TracksCollection
-from traemplist.repository import TracksRepository, TrackRecord
-from traemplist.generator import TraemplistGenerator
+from traemplist.client import SpotifyClient, TracksCollection, IndexedTracksCollection, PlaylistSnapshot, Track, \
+    Artist, LikedTrack
+from traemplist.repository import TracksRepository, TrackRecord, LikedTrackRecord, SaveTracksResult
+from traemplist.generator import GenerationStrategy
+from traemplist.graph import ArtistGraphCrawler
 from traemplist.logger import Logger
+from traemplist.writer import TracksWriter
 
 
 class TracksHistoryService:
@@ -14,28 +20,54 @@ class TracksHistoryService:
 
     def save_recently_played_tracks(self):
         self.logger.log_info(f"Current tracks history size: {self._tracks_total_count()}")
-        self.logger.log_info("Saving recently played tracks")
-        self.repository.save_tracks(
-            self._tracks_to_track_records(
-                self.client.get_recently_played_tracks()
-            )
+        cursor = self.repository.get_recently_played_cursor()
+        self.logger.log_info(f"Saving tracks played after {cursor}" if cursor else "Saving recently played tracks")
+        recently_played_tracks = self.client.get_recently_played_tracks(after=cursor)
+        save_result = self.repository.save_tracks(
+            self._tracks_to_track_records(recently_played_tracks)
+        )
+        if recently_played_tracks.get_cursor() is not None:
+            self.repository.save_recently_played_cursor(recently_played_tracks.get_cursor())
+        self.logger.log_info(
+            f"Recently played tracks saved ({save_result.inserted_count} new, "
+            f"{save_result.existing_count} already in history)"
         )
-        self.logger.log_info("Recently played tracks saved")
         self.logger.log_info(f"Current tracks history size: {self._tracks_total_count()}")
 
     def save_all_user_playlists_tracks(self):
         self.logger.log_info(f"Current tracks history size: {self._tracks_total_count()}")
         self.logger.log_info("Going through user playlists")
-        for playlist_id in self.client.get_user_playlist_ids():
-            self.logger.log_info(f"- saving tracks from playlist {playlist_id}")
-            self.repository.save_tracks(
-                self._tracks_to_track_records(
-                    self.client.get_playlist(playlist_id)
+        refreshed_playlists_count = 0
+        skipped_playlists_count = 0
+        with TracksWriter(self.repository) as tracks_writer:
+            for playlist_snapshot in self.client.get_user_playlist_snapshots():
+                if self._is_playlist_unchanged(playlist_snapshot):
+                    skipped_playlists_count += 1
+                    continue
+                self.logger.log_info(f"- saving tracks from playlist {playlist_snapshot.id}")
+                tracks_writer.write(
+                    (TrackRecord(id=track.id) for track in self.client.get_playlist_tracks(playlist_snapshot.id)),
+                    on_written=partial(self._on_playlist_tracks_written, playlist_snapshot)
                 )
-            )
-        self.logger.log_info("User playlist' tracks have been saved to history")
+                refreshed_playlists_count += 1
+        self.logger.log_info(
+            f"User playlist' tracks have been saved to history ({refreshed_playlists_count} playlists refreshed, "
+            f"{skipped_playlists_count} unchanged playlists skipped)"
+        )
         self.logger.log_info(f"Current tracks history size: {self._tracks_total_count()}")
 
+    def _on_playlist_tracks_written(self, playlist_snapshot: PlaylistSnapshot, save_result: SaveTracksResult):
+        self.logger.log_info(
+            f"- playlist {playlist_snapshot.id}: {save_result.inserted_count} new tracks, "
+            f"{save_result.existing_count} already in history"
+        )
+        if playlist_snapshot.snapshot_id is not None:
+            self.repository.save_playlist_snapshot_id(playlist_snapshot.id, playlist_snapshot.snapshot_id)
+
+    def _is_playlist_unchanged(self, playlist_snapshot: PlaylistSnapshot) -> bool:
+        return playlist_snapshot.snapshot_id is not None \
+            and self.repository.get_playlist_snapshot_id(playlist_snapshot.id) == playlist_snapshot.snapshot_id
+
     @staticmethod
     def _tracks_to_track_records(tracks: TracksCollection) -> [TrackRecord]:
         return [TrackRecord(id=track.id) for track in tracks.get_tracks()]
@@ -44,16 +76,79 @@ class TracksHistoryService:
         return self.repository.tracks_total_count()
 
 
+class LikedTracksService:
+    """
+    Keeps a local mirror of the user's liked tracks. Only the newly liked tracks are fetched on every sync,
+    a full reconcile (which also drops the unliked tracks) runs once per reconcile interval.
+    """
+
+    RECONCILE_INTERVAL = 7 * 24 * 3600
+
+    def __init__(self, client: SpotifyClient, repository: TracksRepository, logger: Logger,
+                 reconcile_interval: int = RECONCILE_INTERVAL):
+        self.client = client
+        self.repository = repository
+        self.logger = logger
+        self.reconcile_interval = reconcile_interval
+
+    def get_liked_tracks(self) -> TracksCollection:
+        self.sync_liked_tracks()
+        liked_tracks = TracksCollection()
+        for record in self.repository.get_liked_tracks():
+            liked_tracks.add_track(
+                Track(
+                    id=record.id,
+                    name=record.name,
+                    artist=Artist(id=record.artist_id, name=record.artist_name)
+                )
+            )
+        return liked_tracks
+
+    def sync_liked_tracks(self):
+        reconciled_at = self.repository.get_liked_tracks_reconciled_at()
+        if reconciled_at is None or time.time() - reconciled_at >= self.reconcile_interval:
+            self._reconcile_liked_tracks()
+            return
+        new_liked_tracks = []
+        for liked_track in self.client.get_user_liked_track_items():
+            if self.repository.contains_liked_track(liked_track.track.id, liked_track.added_at):
+                break
+            new_liked_tracks.append(self._liked_track_to_record(liked_track))
+        self.repository.save_liked_tracks(new_liked_tracks)
+        self.logger.log_info(f"Liked tracks mirror synced ({len(new_liked_tracks)} new liked tracks)")
+
+    def _reconcile_liked_tracks(self):
+        reconciled_at = time.time()
+        liked_tracks = [
+            self._liked_track_to_record(liked_track) for liked_track in self.client.get_user_liked_track_items()
+        ]
+        self.repository.replace_liked_tracks(liked_tracks)
+        self.repository.save_liked_tracks_reconciled_at(reconciled_at)
+        self.logger.log_info(f"Liked tracks mirror reconciled ({len(liked_tracks)} liked tracks)")
+
+    @staticmethod
+    def _liked_track_to_record(liked_track: LikedTrack) -> LikedTrackRecord:
+        return LikedTrackRecord(
+            id=liked_track.track.id,
+            name=liked_track.track.name,
+            artist_id=liked_track.track.artist.id,
+            artist_name=liked_track.track.artist.name,
+            added_at=liked_track.added_at
+        )
+
+
 class TraemplistGeneratorService:
 
     def __init__(self, config: TraemplistConfig,
                  client: SpotifyClient,
-                 generator: TraemplistGenerator,
-                 logger: Logger):
+                 generator: GenerationStrategy,
+                 logger: Logger,
+                 liked_tracks_service: Optional[LikedTracksService] = None):
         self.config = config
         self.client = client
         self.generator = generator
         self.logger = logger
+        self.liked_tracks_service = liked_tracks_service
 
     def generate_and_save_traemplist(self):
         self.logger.log_info(f"Generating traemplist for account {self.config.account.credentials.client_id}")
@@ -61,22 +156,52 @@ class TraemplistGeneratorService:
             input_tracks_collection=self._get_input_tracks(),
             size=self.config.traemplist_songs_count
         )
+        if not traemplist:
+            self.logger.log_error("Generated traemplist is empty, upload skipped")
+            return
         self.logger.log_info("Traemplist successfully generated. Uploading ..")
-        self.client.replace_playlist_tracks(
+        is_uploaded = self.client.replace_playlist_tracks(
             playlist_id=self.config.traemplist_id,
-            new_track_ids=[track.id for track in traemplist.get_tracks()]
+            new_track_ids=traemplist.get_track_ids()
         )
-        self.logger.log_info("Traemplist uploaded")
+        self.logger.log_info("Traemplist uploaded" if is_uploaded else "Traemplist unchanged, upload skipped")
 
     def _get_input_tracks(self) -> TracksCollection:
-        input_tracks = TracksCollection()
-        for playlist in self.config.account.playlists:
-            if playlist.id == Config.LIKED_SONGS_PLAYLIST_ID:
-                input_tracks.add_tracks(
-                    self.client.get_user_liked_tracks()
-                )
-            else:
-                input_tracks.add_tracks(
-                    self.client.get_playlist(playlist.id)
-                )
-        return input_tracks
+        return _get_input_tracks(self.config, self.client, self.liked_tracks_service)
+
+
+class ArtistGraphService:
+
+    def __init__(self, config: TraemplistConfig,
+                 client: SpotifyClient,
+                 crawler: ArtistGraphCrawler,
+                 logger: Logger,
+                 liked_tracks_service: Optional[LikedTracksService] = None):
+        self.config = config
+        self.client = client
+        self.crawler = crawler
+        self.logger = logger
+        self.liked_tracks_service = liked_tracks_service
+
+    def crawl_input_artists(self, depth: int):
+        input_artists = {}
+        for track in _get_input_tracks(self.config, self.client, self.liked_tracks_service).get_tracks():
+            input_artists[track.artist.id] = track.artist
+        self.logger.log_info(f"Crawling artist graph from {len(input_artists)} input artists, depth {depth}")
+        self.crawler.crawl(list(input_artists.values()), depth=depth)
+
+
+def _get_input_tracks(config: TraemplistConfig, client: SpotifyClient,
+                      liked_tracks_service: Optional[LikedTracksService]) -> IndexedTracksCollection:
+    input_tracks = IndexedTracksCollection()
+    for playlist in config.account.playlists:
+        if playlist.id == Config.LIKED_SONGS_PLAYLIST_ID:
+            input_tracks.add_tracks(
+                liked_tracks_service.get_liked_tracks() if liked_tracks_service
+                else client.get_user_liked_tracks()
+            )
+        else:
+            input_tracks.add_tracks(
+                client.get_playlist(playlist.id)
+            )
+    return input_tracks
@@ -0,0 +1,63 @@
+import sqlite3
+from threading import Lock, local, current_thread, Thread
+from typing import Optional, List, Tuple
+
+
+class SqLiteConnections:
+    """
+    Long-lived SQLite connections, one per thread. WAL journaling lets the readers and the writer (even from other
+    processes) work without blocking each other. Connections of finished threads are closed when a new thread
+    connects, so short-lived worker threads don't leave open connections behind.
+    """
+
+    BUSY_TIMEOUT = 30
+
+    def __init__(self, db_file_path: str, cache_size_kib: Optional[int] = None):
+        self.db_file_path = db_file_path
+        self.cache_size_kib = cache_size_kib
+        self.connections: List[Tuple[Thread, sqlite3.Connection]] = []
+        self.lock = Lock()
+        self.thread_local = local()
+
+    def get(self) -> sqlite3.Connection:
+        connection = getattr(self.thread_local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.db_file_path, timeout=self.BUSY_TIMEOUT, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            if self.cache_size_kib:
+                connection.execute(f"PRAGMA cache_size = -{self.cache_size_kib}")
+            self.lock.acquire()
+            try:
+                self._close_finished_threads_connections()
+                self.connections.append((current_thread(), connection))
+                self.thread_local.connection = connection
+            finally:
+                self.lock.release()
+        return connection
+
+    def count(self) -> int:
+        self.lock.acquire()
+        try:
+            return len(self.connections)
+        finally:
+            self.lock.release()
+
+    def close(self) -> None:
+        self.lock.acquire()
+        try:
+            for _, connection in self.connections:
+                connection.close()
+            self.connections = []
+            self.thread_local = local()
+        finally:
+            self.lock.release()
+
+    def _close_finished_threads_connections(self) -> None:
+        alive_connections = []
+        for thread, connection in self.connections:
+            if thread.is_alive():
+                alive_connections.append((thread, connection))
+            else:
+                connection.close()
+        self.connections = alive_connections
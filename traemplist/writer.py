@@ -0,0 +1,114 @@
+from itertools import islice
+from queue import Queue
+from threading import Thread
+from typing import Iterable, Optional, Callable
+
+from traemplist.repository import TracksRepository, TrackRecord, SaveTracksResult
+
+
+class _WriteJob:
+
+    def __init__(self, on_written: Optional[Callable[[SaveTracksResult], None]]):
+        self.on_written = on_written
+        self.inserted_count = 0
+        self.existing_count = 0
+
+    def add_result(self, save_result: SaveTracksResult) -> None:
+        self.inserted_count += save_result.inserted_count
+        self.existing_count += save_result.existing_count
+
+    def finish(self) -> None:
+        if self.on_written:
+            self.on_written(
+                SaveTracksResult(
+                    inserted_count=self.inserted_count,
+                    existing_count=self.existing_count
+                )
+            )
+
+
+class TracksWriter:
+    """
+    Saves track records to the repository from a single writer thread. The records are consumed lazily in batches
+    which go through a bounded queue, so fetching the next tracks overlaps with writing the previous ones and only
+    a few batches are held in memory at once.
+    """
+
+    DEFAULT_BATCH_SIZE = 1000
+    DEFAULT_QUEUE_SIZE = 8
+
+    def __init__(self, repository: TracksRepository,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        :raises TracksWriterException
+        """
+        if batch_size < 1 or queue_size < 1:
+            raise InvalidBufferSizeError
+        self.repository = repository
+        self.batch_size = batch_size
+        self.queue = Queue(maxsize=queue_size)
+        self.error = None
+        self.thread = Thread(target=self._write_batches, daemon=True)
+        self.thread.start()
+
+    def write(self, tracks: Iterable[TrackRecord],
+              on_written: Optional[Callable[[SaveTracksResult], None]] = None) -> None:
+        """
+        Queues the tracks for writing, on_written is called from the writer thread once all of them are saved.
+        Blocks while the queue is full.
+        """
+        job = _WriteJob(on_written)
+        tracks_iterator = iter(tracks)
+        while True:
+            self._raise_error()
+            batch = list(islice(tracks_iterator, self.batch_size))
+            if not batch:
+                break
+            self.queue.put((job, batch))
+        self.queue.put((job, None))
+
+    def close(self) -> None:
+        """
+        Waits until all queued tracks are written, re-raises the writer thread error if any.
+        """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        self._raise_error()
+
+    def __enter__(self) -> "TracksWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _write_batches(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            if self.error is not None:
+                continue
+            job, batch = item
+            try:
+                if batch is None:
+                    job.finish()
+                else:
+                    job.add_result(self.repository.save_tracks(batch))
+            except Exception as e:
+                self.error = e
+
+    def _raise_error(self) -> None:
+        if self.error is not None:
+            raise self.error
+
+
+class TracksWriterException(Exception):
+    pass
+
+
+class InvalidBufferSizeError(TracksWriterException):
+
+    def __str__(self) -> str:
+        return "Batch size and queue size must be positive integers"